@@ -0,0 +1,113 @@
+"""
+Runs the animations of animated tiles, like keys and gems.
+
+Tiles with the same animation share one clock, so the cost of
+animating doesn't grow with the number of tiles, and only
+the tiles near the camera have their texture changed.
+"""
+
+from typing import Dict, Iterable, List, Tuple
+import arcade
+
+# The size of the grid cells used to find the tiles on screen.
+ANIMATION_CELL_SIZE = 512
+
+# How far past the edges of the screen tiles are still animated.
+ANIMATION_MARGIN = 128
+
+
+class AnimationClock():
+    """
+    Keeps the current frame of one animation, for every tile that uses it.
+    Works the same way as `arcade.AnimatedTimeBasedSprite`.
+    """
+
+    frames: List[arcade.AnimationKeyframe] = None
+    frame_index: int = 0
+    # Time passed in the current frame, in seconds.
+    time_counter: float = 0.0
+
+    def __init__(self, frames: List[arcade.AnimationKeyframe]) -> None:
+        self.frames = frames
+
+    @property
+    def texture(self) -> arcade.Texture:
+        """The texture of the current frame."""
+        return self.frames[self.frame_index].texture
+
+    def update(self, delta_time: float):
+        """Move the animation on by the time passed."""
+        self.time_counter += delta_time
+        while (self.time_counter >
+               self.frames[self.frame_index].duration / 1000.0):
+            self.time_counter -= (self.frames[self.frame_index].duration
+                                  / 1000.0)
+            self.frame_index += 1
+            if self.frame_index >= len(self.frames):
+                self.frame_index = 0
+
+
+def get_animation_key(sprite: arcade.AnimatedTimeBasedSprite
+                      ) -> Tuple[Tuple[str, int], ...]:
+    """Get a key that is the same for sprites with the same animation."""
+    return tuple((frame.texture.name, frame.duration)
+                 for frame in sprite.frames)
+
+
+class AnimationScheduler():
+    """
+    Animates a set of animated tiles from shared clocks.
+    The tiles are kept in a grid, so only the ones on
+    screen need to be looked at each frame.
+    """
+
+    cell_size: float = ANIMATION_CELL_SIZE
+    # One clock for each different animation.
+    clocks: Dict[Tuple[Tuple[str, int], ...], AnimationClock] = None
+    # The animated tiles in each grid cell, with the clock they use.
+    cells: Dict[Tuple[int, int],
+                List[Tuple[arcade.Sprite, AnimationClock]]] = None
+
+    def __init__(self, sprites: Iterable[arcade.Sprite],
+                 cell_size: float = ANIMATION_CELL_SIZE) -> None:
+        self.cell_size = cell_size
+        self.clocks = {}
+        self.cells = {}
+
+        for sprite in sprites:
+            # Only tiles with an animation are animated.
+            if not getattr(sprite, "frames", None):
+                continue
+
+            key = get_animation_key(sprite)
+            clock = self.clocks.get(key)
+            if clock is None:
+                clock = self.clocks[key] = AnimationClock(sprite.frames)
+
+            cell = (int(sprite.center_x // cell_size),
+                    int(sprite.center_y // cell_size))
+            self.cells.setdefault(cell, []).append((sprite, clock))
+
+    def update(self, delta_time: float, camera: arcade.Camera,
+               margin: float = ANIMATION_MARGIN):
+        """
+        Move every animation on by the time passed, and show the
+        current frame on the tiles the camera can see.
+        """
+        for clock in self.clocks.values():
+            clock.update(delta_time)
+
+        cell_size = self.cell_size
+        first_column = int((camera.position.x - margin) // cell_size)
+        last_column = int((camera.position.x + camera.viewport_width +
+                           margin) // cell_size)
+        first_row = int((camera.position.y - margin) // cell_size)
+        last_row = int((camera.position.y + camera.viewport_height +
+                        margin) // cell_size)
+
+        for column in range(first_column, last_column + 1):
+            for row in range(first_row, last_row + 1):
+                for sprite, clock in self.cells.get((column, row), ()):
+                    # Setting the same texture again does nothing,
+                    # so only the tiles that change frame are updated.
+                    sprite.texture = clock.texture
@@ -0,0 +1,121 @@
+"""
+Loads the sounds and images the game needs to start on a pool of threads.
+
+Decoding audio and images doesn't need OpenGL, so it is spread over
+several threads. Only the finished sounds and textures are used on
+the main thread, where the texture atlases are made.
+"""
+
+from typing import Dict, List, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from os import listdir
+from os.path import join
+import arcade
+
+from level_compiler import get_compiled_path, read_package_images
+from textures import ANIMATIONS_FOLDER
+
+# How many threads decode assets at the same time.
+ASSET_LOADER_THREADS = 4
+
+# The sound effects the game uses by their name, with their file
+# and whether they are streamed instead of decoded up front.
+# The music is streamed by the music player instead.
+SOUND_MANIFEST: Dict[str, Tuple[str, bool]] = {
+    # Key pickup sound
+    'keys_on_surface': (
+        'assets/Audio/keys_on_surface_zapsplat.mp3', False),
+
+    # These sound effects are played when walking on surfaces.
+    'grass_surface': (
+        'assets/Audio/footsteps-in-grass-moderate-A-fesliyanstudios.mp3',
+        False),
+    'stone_surface': (
+        'assets/Audio/'
+        'dress-shoes-on-Concrete-Floor-fast-pace-FesliyanStudios.mp3',
+        False),
+}
+
+
+def get_animation_images(file_extension=".png") -> List[str]:
+    """
+    Get the file of every frame of every player animation,
+    named the same way as `textures` loads them.
+    """
+    return [
+        join(ANIMATIONS_FOLDER, animation_folder, file_name)
+        for animation_folder in sorted(listdir(ANIMATIONS_FOLDER))
+        for file_name in sorted(listdir(join(ANIMATIONS_FOLDER,
+                                             animation_folder)))
+        if file_name.endswith(file_extension)
+    ]
+
+
+def get_level_images(map_path: str) -> List[str]:
+    """
+    Get the image files a level's tiles are cut from, if it has
+    been compiled. Otherwise they are decoded as the map is read.
+    """
+    return read_package_images(get_compiled_path(map_path))
+
+
+def decode_image(file_name: str, mirrored: bool,
+                 hit_box_algorithm: str) -> List[arcade.Texture]:
+    """
+    Decode an image into arcade's texture cache,
+    along with a mirrored copy if asked for.
+    """
+    if mirrored:
+        return arcade.load_texture_pair(file_name, hit_box_algorithm)
+    return [arcade.load_texture(file_name,
+                                hit_box_algorithm=hit_box_algorithm)]
+
+
+class AssetLoader():
+    """
+    Decodes sounds and images on a pool of threads.
+    Start them loading with `load_sounds()` and `load_images()`,
+    then wait for them with `get_sounds()` and `wait()`.
+    """
+
+    executor: ThreadPoolExecutor = None
+    sounds: Dict[str, "Future[arcade.Sound]"] = None
+    images: List["Future[List[arcade.Texture]]"] = None
+
+    def __init__(self, threads: int = None) -> None:
+        """threads: How many threads to use, ASSET_LOADER_THREADS if None."""
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads or ASSET_LOADER_THREADS,
+            thread_name_prefix="asset_loader"
+        )
+        self.sounds = {}
+        self.images = []
+
+    def load_sounds(self, manifest: Dict[str, Tuple[str, bool]]):
+        """Start decoding the sounds in a manifest."""
+        for name, (file_name, streaming) in manifest.items():
+            self.sounds[name] = self.executor.submit(
+                arcade.load_sound, file_name, streaming)
+
+    def load_images(self, file_names: List[str], mirrored: bool = False,
+                    hit_box_algorithm: str = "Simple"):
+        """
+        Start decoding images into arcade's texture cache, so loading
+        them with the same arguments on the main thread is quick.
+
+        mirrored: Also load flipped copies, like `load_texture_pair()`.
+        """
+        for file_name in file_names:
+            self.images.append(self.executor.submit(
+                decode_image, file_name, mirrored, hit_box_algorithm))
+
+    def get_sounds(self) -> Dict[str, arcade.Sound]:
+        """Wait for the sounds to load, and get them by their name."""
+        return {name: future.result() for name, future in self.sounds.items()}
+
+    def wait(self):
+        """Wait for everything to finish loading, and stop the threads."""
+        for future in self.images:
+            # Raises any error from loading the image.
+            future.result()
+        self.executor.shutdown()
@@ -0,0 +1,99 @@
+"""
+Plays the sound effects for Burial Bandit from a pool of voices.
+
+Each sound effect gets a few pyglet players, made once when the game
+opens and reused every time it plays, so playing a sound never makes
+a new player or audio driver voice while the game is running.
+"""
+
+from typing import Dict, List
+import arcade
+from pyglet.media import Player
+
+# How many of each sound effect can play at the same time.
+# Sounds not listed here get one voice.
+SOUND_VOICES: Dict[str, int] = {
+    # Keys can be picked up one right after another.
+    'keys_on_surface': 2,
+    # The footsteps loop, and only one plays at a time.
+    'grass_surface': 1,
+    'stone_surface': 1,
+}
+
+
+class Voice(Player):
+    """
+    A player that keeps its sound queued when it ends,
+    so it can be played again from the start.
+    """
+
+    def __init__(self, sound: arcade.Sound) -> None:
+        super().__init__()
+        self.queue(sound.source)
+        # Starting the voice once makes its audio driver voice,
+        # so it is ready when the sound is first played.
+        self.volume = 0
+        self.play()
+        self.stop()
+
+    def start(self, volume: float = 1.0, loop: bool = False):
+        """Play the sound from the start."""
+        self.pause()
+        self.seek(0.0)
+        self.volume = volume
+        self.loop = loop
+        self.play()
+
+    def stop(self):
+        """Stop the sound and go back to its start."""
+        self.pause()
+        self.seek(0.0)
+
+    def on_eos(self):
+        """
+        Go back to the start when the sound ends, instead of
+        letting pyglet throw the sound and the driver voice away.
+        """
+        if self.loop:
+            super().on_eos()
+        else:
+            self.stop()
+
+
+class VoicePool():
+    """
+    The voices for every sound effect. When all of a sound's
+    voices are playing, the one that started first is reused.
+    """
+
+    # The voices of each sound effect by its name,
+    # from the one started longest ago to the newest.
+    voices: Dict[str, List[Voice]] = None
+
+    def __init__(self, sounds: Dict[str, arcade.Sound],
+                 voice_counts: Dict[str, int] = None) -> None:
+        """
+        sounds: The decoded sound effects by their name.
+        voice_counts: How many voices each sound gets, SOUND_VOICES if None.
+        """
+        voice_counts = voice_counts or SOUND_VOICES
+        self.voices = {
+            name: [Voice(sound) for _ in range(voice_counts.get(name, 1))]
+            for name, sound in sounds.items()
+        }
+
+    def play(self, name: str, volume: float = 1.0,
+             loop: bool = False) -> Voice:
+        """Play a sound effect on a free voice, and return the voice."""
+        voices = self.voices[name]
+        for voice in voices:
+            if not voice.playing:
+                break
+        else:
+            voice = voices[0]
+        # Move the voice to the end, as it is now the newest.
+        voices.remove(voice)
+        voices.append(voice)
+
+        voice.start(volume, loop)
+        return voice
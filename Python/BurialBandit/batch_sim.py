@@ -0,0 +1,616 @@
+"""
+Steps many players through one level at the same time,
+for playtesting a level automatically before it ships.
+
+The level is loaded once, and the players are kept as numpy arrays
+of their position, speed, lives, keys and checkpoint, so every
+player is moved by the same few array operations each tick. They use
+the game's speeds and gravity and collide with the grids of the grid
+physics engine. At the end each one has an outcome: if and when it
+finished the level, how often it died and where, and if it fell out.
+
+Players move in exactly the same steps as the grid physics engine,
+but trigger tiles like keys and spikes are checked with the rectangles
+around their hit boxes, so they can be touched a little earlier than
+in the game. Use replays with the simulation when a whole run has to
+match the game exactly.
+
+Run it from the BurialBandit folder with
+`python batch_sim.py [level index] [agents] [ticks] [csv file]`.
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional
+import csv
+import sys
+import time
+import numpy as np
+
+from grid_physics import BoxGrid, get_layer_boxes
+from replay import INPUT_FIELDS, Replay
+from simulation import (
+    GameSimulation,
+    GRAVITY,
+    PLAYER_MOVEMENT_SPEED,
+    PLAYER_JUMP_SPEED,
+    PLAYER_JUMP_GROUND_DISTANCE,
+    PLAYER_INITIAL_LIVES,
+    PLAYER_X_STOP_BUFFER,
+    CHECKPOINT_TRIGGER_DISTANCE,
+    LAYER_NAME_CHECKPOINTS,
+    LAYER_NAME_DONT_TOUCH,
+    LAYER_NAME_NEXT_LEVEL,
+    LAYER_NAME_PICKUPS,
+)
+
+# How many players are run, and for how many ticks, by default.
+BATCH_AGENTS = 1000
+BATCH_TICKS = 3600
+
+# How likely a random player is to press or let go of a key each tick.
+RANDOM_KEY_CHANGE_CHANCE = 0.05
+BATCH_SEED = 0
+
+# The bits of the keys in packed inputs, the same as in replays.
+LEFT_BIT = 1 << INPUT_FIELDS.index("left_pressed")
+RIGHT_BIT = 1 << INPUT_FIELDS.index("right_pressed")
+UP_BIT = 1 << INPUT_FIELDS.index("up_pressed")
+DOWN_BIT = 1 << INPUT_FIELDS.index("down_pressed")
+KEY_BITS = np.array([LEFT_BIT, RIGHT_BIT, UP_BIT, DOWN_BIT], dtype=np.uint8)
+ALL_KEY_BITS = LEFT_BIT | RIGHT_BIT | UP_BIT | DOWN_BIT
+
+# The outcome of each player that is saved, in order.
+OUTCOME_FIELDS = [
+    "finished_tick",
+    "fell_out_tick",
+    "deaths",
+    "restarts",
+    "lives",
+    "keys_picked_up",
+    "checkpoint_index",
+    "last_progress_tick",
+    "max_x",
+    "center_x",
+    "center_y",
+    "last_death_x",
+    "last_death_y",
+]
+
+
+def random_inputs(agents: int, ticks: int, seed: int = BATCH_SEED,
+                  change_chance: float = RANDOM_KEY_CHANGE_CHANCE
+                  ) -> Iterator[np.ndarray]:
+    """
+    Make the packed inputs of players pressing and letting go of
+    random keys, one array for each tick with one entry per player.
+    """
+    rng = np.random.default_rng(seed)
+    bits = np.zeros(agents, dtype=np.uint8)
+    for _ in range(ticks):
+        changes = rng.random(agents) < change_chance
+        keys = KEY_BITS[rng.integers(0, len(KEY_BITS), agents)]
+        bits = bits ^ np.where(changes, keys, 0).astype(np.uint8)
+        yield bits
+
+
+def replay_inputs(replays: List[Replay], ticks: int
+                  ) -> Iterator[np.ndarray]:
+    """
+    Get the packed inputs of recorded replays, one array
+    for each tick with one entry per replay.
+    """
+    inputs = np.zeros((ticks, len(replays)), dtype=np.uint8)
+    for agent, replay in enumerate(replays):
+        for tick, bits in replay.inputs:
+            inputs[tick:, agent] = bits & ALL_KEY_BITS
+    yield from inputs
+
+
+class BatchSimulation():
+    """
+    Runs many players on one level at once. Each player has its own
+    position, speed, lives, keys and checkpoint, but they don't
+    touch each other. Give the inputs of every player each tick
+    to `run()`, then read `get_outcomes()`.
+    """
+
+    level_index: int = 0
+    tick: int = 0
+
+    # THE LEVEL
+    # Shared by every player, loaded once.
+    level_simulation: GameSimulation = None
+    deadly_grid: Optional[BoxGrid] = None
+    next_level_grid: Optional[BoxGrid] = None
+    # The rectangles of the keys, one row each.
+    pickup_boxes: np.ndarray = None
+    keys_to_pick_up: int = 0
+    # The positions of the checkpoints, one row each.
+    checkpoints: np.ndarray = None
+    map_width_px: float = 0
+    # The edges of the player's hit box from their center.
+    box_offsets: np.ndarray = None
+
+    # THE PLAYERS
+    # One entry for each player.
+    center_x: np.ndarray = None
+    center_y: np.ndarray = None
+    change_x: np.ndarray = None
+    change_y: np.ndarray = None
+    input_bits: np.ndarray = None
+    jump_needs_reset: np.ndarray = None
+    lives: np.ndarray = None
+    checkpoint_index: np.ndarray = None
+    # Which keys each player has picked up, one column per key.
+    keys_picked_up: np.ndarray = None
+
+    # OUTCOMES
+    # The tick each player finished or fell out on, -1 if they didn't.
+    finished_tick: np.ndarray = None
+    fell_out_tick: np.ndarray = None
+    deaths: np.ndarray = None
+    # How many times each player ran out of lives.
+    restarts: np.ndarray = None
+    # The last tick each player got a key or reached a checkpoint.
+    last_progress_tick: np.ndarray = None
+    max_x: np.ndarray = None
+    last_death_x: np.ndarray = None
+    last_death_y: np.ndarray = None
+
+    def __init__(self, level_index: int, agents: int) -> None:
+        self.level_index = level_index
+        self.load_level()
+
+        self.center_x = np.zeros(agents)
+        self.center_y = np.zeros(agents)
+        self.change_x = np.zeros(agents)
+        self.change_y = np.zeros(agents)
+        self.input_bits = np.zeros(agents, dtype=np.uint8)
+        self.jump_needs_reset = np.zeros(agents, dtype=bool)
+        self.lives = np.zeros(agents, dtype=np.int64)
+        self.checkpoint_index = np.zeros(agents, dtype=np.int64)
+        self.keys_picked_up = np.zeros((agents, len(self.pickup_boxes)),
+                                       dtype=bool)
+
+        self.finished_tick = np.full(agents, -1, dtype=np.int64)
+        self.fell_out_tick = np.full(agents, -1, dtype=np.int64)
+        self.deaths = np.zeros(agents, dtype=np.int64)
+        self.restarts = np.zeros(agents, dtype=np.int64)
+        self.last_progress_tick = np.zeros(agents, dtype=np.int64)
+        self.max_x = np.zeros(agents)
+        self.last_death_x = np.full(agents, np.nan)
+        self.last_death_y = np.full(agents, np.nan)
+
+        self.reset_agents(np.arange(agents))
+        self.max_x[:] = self.center_x
+
+    def load_level(self):
+        """
+        Load the level with a headless simulation, and take the
+        grids, triggers and checkpoints every player shares from it.
+        """
+        simulation = GameSimulation()
+        simulation.use_grid_physics = True
+        simulation.boot()
+        simulation.current_level_index = self.level_index
+        simulation.reset_level()
+        self.level_simulation = simulation
+
+        layers = simulation.scene.name_mapping
+        grid_size = simulation.get_grid_size()
+        for layer_name, attribute in ((LAYER_NAME_DONT_TOUCH, "deadly_grid"),
+                                      (LAYER_NAME_NEXT_LEVEL,
+                                       "next_level_grid")):
+            if layer_name in layers:
+                grid = BoxGrid(*grid_size)
+                grid.add_boxes(get_layer_boxes(layers[layer_name]))
+                setattr(self, attribute, grid)
+
+        self.pickup_boxes = np.array(
+            get_layer_boxes(layers[LAYER_NAME_PICKUPS]),
+            dtype=np.float64).reshape(-1, 4)
+        self.keys_to_pick_up = simulation.keys_to_pick_up
+        self.checkpoints = np.array(
+            [tiled_object.shape for tiled_object in
+             simulation.tile_map.object_lists[LAYER_NAME_CHECKPOINTS]],
+            dtype=np.float64)
+        self.map_width_px = simulation.map_width_px
+        self.box_offsets = np.array(
+            simulation.physics_engine.get_player_box(0.0, 0.0))
+
+    def get_boxes(self, x: np.ndarray, y: np.ndarray) -> List[np.ndarray]:
+        """Get the edges of the players' hit boxes if they were at x, y."""
+        left, bottom, right, top = self.box_offsets
+        return [x + left, y + bottom, x + right, y + top]
+
+    def collides(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Check which players would be in a solid cell at x, y."""
+        return self.level_simulation.solid_grid.overlaps_all(
+            *self.get_boxes(x, y))
+
+    def is_on_ladder(self, agents: np.ndarray) -> np.ndarray:
+        """Check which of the players are touching a ladder."""
+        return self.level_simulation.ladder_grid.overlaps_all(
+            *self.get_boxes(self.center_x[agents], self.center_y[agents]))
+
+    def reset_agents(self, agents: np.ndarray):
+        """Start the players over from the start of the level."""
+        self.center_x[agents] = self.checkpoints[0, 0]
+        self.center_y[agents] = self.checkpoints[0, 1]
+        self.change_x[agents] = 0
+        self.change_y[agents] = 0
+        # The keys are let go, like the inputs of a restarted level.
+        self.input_bits[agents] = 0
+        self.jump_needs_reset[agents] = False
+        self.lives[agents] = PLAYER_INITIAL_LIVES
+        self.checkpoint_index[agents] = 0
+        self.keys_picked_up[agents] = False
+
+    def process_inputs(self, bits: np.ndarray):
+        """
+        Change the players' movement for the keys that changed,
+        the same way as `GameSimulation.process_keychange()`.
+        """
+        changed = ((bits & ALL_KEY_BITS) != self.input_bits) & (
+            (self.finished_tick < 0) & (self.fell_out_tick < 0))
+        agents = np.nonzero(changed)[0]
+        if len(agents) == 0:
+            return
+        new_bits = bits[agents] & ALL_KEY_BITS
+
+        # Letting go of jump lets the player jump again.
+        released_up = ((self.input_bits[agents] & UP_BIT) != 0) & (
+            (new_bits & UP_BIT) == 0)
+        self.jump_needs_reset[agents[released_up]] = False
+        self.input_bits[agents] = new_bits
+
+        left = (new_bits & LEFT_BIT) != 0
+        right = (new_bits & RIGHT_BIT) != 0
+        up = (new_bits & UP_BIT) != 0
+        down = (new_bits & DOWN_BIT) != 0
+        on_ladder = self.is_on_ladder(agents)
+        change_y = self.change_y[agents]
+
+        # Process jumping and moving up/down ladders.
+        can_jump = self.collides(
+            self.center_x[agents],
+            self.center_y[agents] - PLAYER_JUMP_GROUND_DISTANCE)
+        jump = (up & ~down & ~on_ladder & can_jump &
+                ~self.jump_needs_reset[agents])
+        change_y[up & ~down & on_ladder] = PLAYER_MOVEMENT_SPEED
+        change_y[jump] = PLAYER_JUMP_SPEED
+        self.jump_needs_reset[agents[jump]] = True
+        change_y[down & ~up & on_ladder] = -PLAYER_MOVEMENT_SPEED
+        # Stop on ladders when both or neither are pressed.
+        change_y[on_ladder & (up == down)] = 0
+        self.change_y[agents] = change_y
+
+        # Walking left and right.
+        self.change_x[agents] = PLAYER_MOVEMENT_SPEED * (
+            (right & ~left).astype(np.float64) -
+            (left & ~right).astype(np.float64))
+
+    def step(self):
+        """Move every player that is still playing on by one tick."""
+        self.tick += 1
+        agents = np.nonzero((self.finished_tick < 0) &
+                            (self.fell_out_tick < 0))[0]
+        if len(agents) == 0:
+            return
+        self.stop_at_ends(agents)
+        self.move(agents)
+        self.check_for_deadly(agents)
+        self.check_for_pickups(agents)
+        self.check_for_next_level(agents)
+        self.update_checkpoints(agents)
+
+        # Players entirely under the map will never come back.
+        fell_out = self.center_y[agents] + self.box_offsets[3] < 0
+        self.fell_out_tick[agents[fell_out]] = self.tick
+        self.max_x[agents] = np.maximum(self.max_x[agents],
+                                        self.center_x[agents])
+
+    def stop_at_ends(self, agents: np.ndarray):
+        """Stop the players walking off the ends of the level."""
+        bits = self.input_bits[agents]
+        anticipated_x = self.center_x[agents] + self.change_x[agents]
+        left = (bits & LEFT_BIT) != 0
+        right = (bits & RIGHT_BIT) != 0
+        stopped = ((left & (anticipated_x <= PLAYER_X_STOP_BUFFER)) |
+                   (right & (anticipated_x >= self.map_width_px -
+                             PLAYER_X_STOP_BUFFER)))
+        self.change_x[agents[stopped]] = 0
+
+    def move(self, agents: np.ndarray):
+        """
+        Add gravity and move the players, up and down first and then
+        across, with the same steps as the grid physics engine.
+        """
+        x = self.center_x[agents]
+        y = self.center_y[agents]
+        change_x = self.change_x[agents]
+        change_y = self.change_y[agents]
+        bottom = self.box_offsets[1]
+
+        # Add gravity if we aren't on a ladder
+        change_y -= np.where(self.is_on_ladder(agents), 0.0, GRAVITY)
+
+        # Start from somewhere clear if a player is in a solid cell.
+        stuck = np.nonzero(self.collides(x, y))[0]
+        if len(stuck):
+            x[stuck], y[stuck] = self.move_out(x[stuck], y[stuck])
+        original_y = y.copy()
+
+        # MOVE UP AND DOWN
+        y += change_y
+        hit = self.collides(x, y)
+        # Drop back down out of the ceiling a pixel at a time.
+        in_ceiling = hit & (change_y > 0)
+        while in_ceiling.any():
+            y[in_ceiling] -= 1
+            in_ceiling[in_ceiling] = self.collides(x[in_ceiling],
+                                                   y[in_ceiling])
+        # Rise out of the floor in quarter pixels,
+        # until the bottom is above every tile it landed in.
+        in_floor = np.nonzero(hit & (change_y < 0))[0]
+        if len(in_floor):
+            floor_top = self.get_floor_tops(x[in_floor], y[in_floor])
+            feet = y[in_floor] + bottom
+            y[in_floor] += np.maximum(
+                np.ceil((floor_top - feet) / 0.25), 0) * 0.25
+        change_y[hit] = 0.0
+        y = np.round(y, 2)
+
+        # MOVE ACROSS
+        walking = np.nonzero(change_x != 0)[0]
+        if len(walking):
+            x[walking], y[walking] = self.move_across(
+                x[walking], original_y[walking], y[walking],
+                change_x[walking])
+
+        self.center_x[agents] = x
+        self.center_y[agents] = y
+        self.change_y[agents] = change_y
+
+    def move_out(self, x: np.ndarray, y: np.ndarray):
+        """
+        Find somewhere near each x, y the player isn't in a solid
+        cell, trying the same places as `GridPhysicsEngine.move_out()`.
+        """
+        x = x.copy()
+        y = y.copy()
+        stuck = np.ones(len(x), dtype=bool)
+        vary = 1
+        while stuck.any():
+            for step_x, step_y in ((0, 1), (0, -1), (1, 0), (-1, 0),
+                                   (1, 1), (1, -1), (-1, 1), (-1, -1)):
+                trying = np.nonzero(stuck)[0]
+                try_x = x[trying] + step_x * vary
+                try_y = y[trying] + step_y * vary
+                clear = ~self.collides(try_x, try_y)
+                x[trying[clear]] = try_x[clear]
+                y[trying[clear]] = try_y[clear]
+                stuck[trying[clear]] = False
+            vary *= 2
+        return x, y
+
+    def get_floor_tops(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """
+        Get the top of the highest row of solid cells
+        each player's hit box is in at x, y.
+        """
+        solid_grid = self.level_simulation.solid_grid
+        left, bottom, right, top = self.get_boxes(x, y)
+        first_rows = np.maximum(
+            np.floor(bottom / solid_grid.cell_height).astype(np.int64), 0)
+        last_rows = np.minimum(
+            np.ceil(top / solid_grid.cell_height).astype(np.int64),
+            solid_grid.rows) - 1
+
+        # Look down each row from the top of the hit box, checking a
+        # thin strip through the middle of the row across the box.
+        floor_rows = np.full(len(x), -1, dtype=np.int64)
+        for row_offset in range(int((last_rows - first_rows).max()) + 1):
+            looking = np.nonzero((floor_rows < 0) &
+                                 (last_rows - row_offset >= first_rows))[0]
+            rows = last_rows[looking] - row_offset
+            middles = (rows + 0.5) * solid_grid.cell_height
+            solid = solid_grid.overlaps_all(
+                left[looking], middles - 0.25,
+                right[looking], middles + 0.25)
+            floor_rows[looking[solid]] = rows[solid]
+        return (floor_rows + 1) * solid_grid.cell_height
+
+    def move_across(self, x: np.ndarray, original_y: np.ndarray,
+                    y: np.ndarray, change_x: np.ndarray):
+        """
+        Search for the furthest each player can walk, stepping up onto
+        anything the move would have hit if they can, with the same
+        search as `GridPhysicsEngine.move_player()`.
+
+        original_y: Where each player was before moving up and down.
+        y: Where each player is after moving up and down.
+        """
+        direction = np.sign(change_x)
+        cur_x_change = np.abs(change_x)
+        upper_bound = cur_x_change.copy()
+        lower_bound = np.zeros(len(x))
+        cur_y_change = np.zeros(len(x))
+        # The height the search is trying at, which it keeps
+        # after failing to ramp up, the same as arcade does.
+        try_y = y.copy()
+        searching = np.ones(len(x), dtype=bool)
+
+        while searching.any():
+            agents = np.nonzero(searching)[0]
+            try_x = x[agents] + cur_x_change[agents] * direction[agents]
+            hit = self.collides(try_x, try_y[agents])
+
+            # Can we ramp up and not collide?
+            ramps = agents[hit]
+            ramp_x = try_x[hit]
+            cur_y_change[ramps] = cur_x_change[ramps]
+            try_y[ramps] = original_y[ramps] + cur_y_change[ramps]
+            blocked = self.collides(ramp_x, try_y[ramps])
+            cur_y_change[ramps[blocked]] = 0
+
+            # Find the lowest step up that is clear.
+            ramped = ramps[~blocked]
+            ramped_x = ramp_x[~blocked]
+            climbing = np.ones(len(ramped), dtype=bool)
+            while True:
+                climbing &= cur_y_change[ramped] > 0
+                if not climbing.any():
+                    break
+                lowering = ramped[climbing]
+                cur_y_change[lowering] -= 1
+                try_y[lowering] = y[lowering] + cur_y_change[lowering]
+                climbing[climbing] = ~self.collides(ramped_x[climbing],
+                                                    try_y[lowering])
+            cur_y_change[ramped] += 1
+            searching[ramped] = False
+
+            # Search lower when blocked, and higher when clear.
+            blocked = ramps[blocked]
+            upper_bound[blocked] = cur_x_change[blocked] - 1
+            clear = agents[~hit]
+            lower_bound[clear] = cur_x_change[clear]
+            moved = np.concatenate((blocked, clear))
+            found = upper_bound[moved] - lower_bound[moved] <= 0
+            searching[moved[found]] = False
+            cur_x_change[blocked[found[:len(blocked)]]] = (
+                lower_bound[blocked[found[:len(blocked)]]])
+            middles = upper_bound + lower_bound
+            still_blocked = blocked[~found[:len(blocked)]]
+            cur_x_change[still_blocked] = middles[still_blocked] // 2
+            still_clear = clear[~found[len(blocked):]]
+            cur_x_change[still_clear] = (middles[still_clear] // 2 +
+                                         middles[still_clear] % 2)
+
+        return x + cur_x_change * direction, y + cur_y_change
+
+    def check_for_deadly(self, agents: np.ndarray):
+        """
+        Take a life from the players touching something deadly,
+        sending them back to their checkpoint, or restarting them
+        when they run out of lives.
+        """
+        if self.deadly_grid is None:
+            return
+        hit = agents[self.deadly_grid.overlaps_all(
+            *self.get_boxes(self.center_x[agents], self.center_y[agents]))]
+        if len(hit) == 0:
+            return
+
+        self.deaths[hit] += 1
+        self.last_death_x[hit] = self.center_x[hit]
+        self.last_death_y[hit] = self.center_y[hit]
+        self.lives[hit] -= 1
+
+        respawned = hit[self.lives[hit] > 0]
+        checkpoints = self.checkpoints[self.checkpoint_index[respawned]]
+        self.change_x[respawned] = 0
+        self.change_y[respawned] = 0
+        self.center_x[respawned] = checkpoints[:, 0]
+        self.center_y[respawned] = checkpoints[:, 1]
+
+        restarted = hit[self.lives[hit] <= 0]
+        self.restarts[restarted] += 1
+        self.reset_agents(restarted)
+
+    def check_for_pickups(self, agents: np.ndarray):
+        """Pick up the keys the players are touching."""
+        if len(self.pickup_boxes) == 0:
+            return
+        left, bottom, right, top = self.get_boxes(self.center_x[agents],
+                                                  self.center_y[agents])
+        keys = self.pickup_boxes
+        touching = ((left[:, None] < keys[None, :, 2]) &
+                    (keys[None, :, 0] < right[:, None]) &
+                    (bottom[:, None] < keys[None, :, 3]) &
+                    (keys[None, :, 1] < top[:, None]))
+        new_keys = touching & ~self.keys_picked_up[agents]
+        self.keys_picked_up[agents] |= touching
+        self.last_progress_tick[agents[new_keys.any(axis=1)]] = self.tick
+
+    def check_for_next_level(self, agents: np.ndarray):
+        """Finish the players at the end with every key."""
+        if self.next_level_grid is None:
+            return
+        at_end = self.next_level_grid.overlaps_all(
+            *self.get_boxes(self.center_x[agents], self.center_y[agents]))
+        has_keys = (self.keys_picked_up[agents].sum(axis=1) >=
+                    self.keys_to_pick_up)
+        self.finished_tick[agents[at_end & has_keys]] = self.tick
+
+    def update_checkpoints(self, agents: np.ndarray):
+        """
+        Move the players' checkpoints on to the furthest progressed
+        one in reach, like `GameSimulation.update_checkpoints()`.
+        """
+        distances = np.hypot(
+            self.center_x[agents, None] - self.checkpoints[None, :, 0],
+            self.center_y[agents, None] - self.checkpoints[None, :, 1])
+        indexes = np.arange(len(self.checkpoints))
+        in_reach = ((distances <= CHECKPOINT_TRIGGER_DISTANCE) &
+                    (indexes[None, :] >
+                     self.checkpoint_index[agents, None]))
+        reached = np.where(in_reach, indexes[None, :], -1).max(axis=1)
+        progressed = reached >= 0
+        self.checkpoint_index[agents[progressed]] = reached[progressed]
+        self.last_progress_tick[agents[progressed]] = self.tick
+
+    def run(self, inputs: Iterable[np.ndarray]):
+        """Step the players once for each tick of packed inputs."""
+        for bits in inputs:
+            self.process_inputs(bits)
+            self.step()
+
+    def get_outcomes(self) -> Dict[str, np.ndarray]:
+        """Get the outcome of every player, by the name of the outcome."""
+        outcomes = {name: getattr(self, name) for name in OUTCOME_FIELDS
+                    if name != "keys_picked_up"}
+        outcomes["keys_picked_up"] = self.keys_picked_up.sum(axis=1)
+        return {name: outcomes[name] for name in OUTCOME_FIELDS}
+
+    def save_csv(self, file_path: str):
+        """Save the outcomes to a CSV file, one row per player."""
+        outcomes = self.get_outcomes()
+        with open(file_path, "w", newline="") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["agent"] + OUTCOME_FIELDS)
+            for agent in range(len(self.center_x)):
+                writer.writerow([agent] + [outcomes[name][agent].item()
+                                           for name in OUTCOME_FIELDS])
+
+    def print_summary(self):
+        """Print how many players finished, died and fell out."""
+        agents = len(self.center_x)
+        finished = self.finished_tick >= 0
+        print(f"{agents} players, {self.tick} ticks: "
+              f"{finished.sum()} finished, "
+              f"{(self.fell_out_tick >= 0).sum()} fell out, "
+              f"{(self.deaths > 0).sum()} died at least once, "
+              f"{(self.restarts > 0).sum()} ran out of lives")
+        if finished.any():
+            print(f"  Fastest finish on tick "
+                  f"{self.finished_tick[finished].min()}")
+        print(f"  Furthest checkpoint reached: "
+              f"{self.checkpoint_index.max()} of "
+              f"{len(self.checkpoints) - 1}")
+
+
+if __name__ == "__main__":
+    batch_level = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+    batch_agents = int(sys.argv[2]) if len(sys.argv) > 2 else BATCH_AGENTS
+    batch_ticks = int(sys.argv[3]) if len(sys.argv) > 3 else BATCH_TICKS
+
+    batch = BatchSimulation(batch_level, batch_agents)
+    start_time = time.perf_counter()
+    batch.run(random_inputs(batch_agents, batch_ticks))
+    run_time = time.perf_counter() - start_time
+    print(f"Ran in {run_time:.2f} s, "
+          f"{batch_agents * batch_ticks / run_time:.0f} player ticks "
+          f"per second")
+    batch.print_summary()
+    if len(sys.argv) > 4:
+        batch.save_csv(sys.argv[4])
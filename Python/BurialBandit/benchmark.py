@@ -0,0 +1,180 @@
+"""
+Times parts of Burial Bandit to help find what is slowing the game down.
+
+Run it from the BurialBandit folder with `python benchmark.py`.
+"""
+
+import gc
+import os
+import time
+import timeit
+import tracemalloc
+import arcade
+import numpy as np
+
+import assets
+import game
+import level_cache
+import level_compiler
+import simulation
+import textures
+
+# How many times each timed piece of code is run.
+RESET_REPEATS = 100
+LOAD_REPEATS = 5
+
+# How many times wider than the last level the streaming test map is.
+STREAM_TEST_REPEATS = 20
+
+
+def benchmark_startup(window: game.TheGame):
+    """
+    Time how long it takes from loading the assets to the first frame
+    being drawn, loading them on one thread and then on the pool.
+    The files are in the OS's cache after the first run,
+    so this compares decoding them rather than reading the disk.
+    """
+    print("startup")
+    for threads in (1, assets.ASSET_LOADER_THREADS):
+        # Forget everything loaded before, so it is decoded again.
+        arcade.cleanup_texture_cache()
+        textures.image_sequences.clear()
+        textures.animation_atlas = None
+        assets.ASSET_LOADER_THREADS = threads
+        window.current_level_index = simulation.MAP_START_INDEX
+
+        start_time = time.perf_counter()
+        window.boot()
+        window.reset_level()
+        window.on_draw()
+        window.ctx.finish()
+        first_frame = time.perf_counter() - start_time
+
+        print(f"  {threads} asset loading threads: "
+              f"first frame after {first_frame * 1000:.0f} ms")
+
+
+def benchmark_reset_level(window: game.TheGame):
+    """
+    Time how long it takes to restart each level,
+    like when the player runs out of lives.
+    """
+    print("reset_level()")
+    for level_index, map_name in enumerate(simulation.LEVELS):
+        window.current_level_index = level_index
+
+        # The first load reads the map file, the rest use the cache.
+        first_load = timeit.timeit(window.reset_level, number=1)
+        restart = timeit.timeit(window.reset_level, number=RESET_REPEATS)
+
+        print(f"  {map_name}: first load {first_load * 1000:.1f} ms, "
+              f"restart {restart / RESET_REPEATS * 1000:.2f} ms")
+
+
+def benchmark_level_loading():
+    """
+    Time loading each level from its map file and
+    from its compiled package, without the cache.
+    """
+    print("level loading")
+    for level_index, map_name in enumerate(simulation.LEVELS):
+        scale = simulation.MAP_SCALE[level_index]
+        from_map = timeit.timeit(
+            lambda: arcade.load_tilemap(map_name, scale),
+            number=LOAD_REPEATS) / LOAD_REPEATS
+
+        package_path = level_compiler.get_compiled_path(map_name)
+        if level_compiler.load_compiled_level(package_path,
+                                              map_name) is None:
+            print(f"  {map_name}: map file {from_map * 1000:.1f} ms, "
+                  f"no up to date package")
+            continue
+        from_package = timeit.timeit(
+            lambda: level_compiler.CompiledTileMap(
+                level_compiler.CompiledLevelData(package_path), scale),
+            number=LOAD_REPEATS) / LOAD_REPEATS
+
+        print(f"  {map_name}: map file {from_map * 1000:.1f} ms, "
+              f"package {from_package * 1000:.1f} ms")
+
+
+def make_wide_package(map_name: str, repeats: int, package_path: str):
+    """
+    Make a level package with the map's tile layers repeated
+    side by side, to test levels much wider than the real ones.
+    """
+    header, arrays = level_compiler.read_package(
+        level_compiler.get_compiled_path(map_name))
+    header = {**header, "width": header["width"] * repeats}
+    del header["arrays"]
+    arrays = {
+        name: np.tile(array, (1, repeats)) if name.startswith("tiles/")
+        else array
+        for name, array in arrays.items()
+    }
+    level_compiler.write_package(package_path, header, arrays)
+
+
+def benchmark_streaming(streamed: bool):
+    """
+    Time loading a very wide level and walking across it,
+    and measure the memory its sprites use.
+    """
+    map_name = simulation.LEVELS[-1]
+    scale = simulation.MAP_SCALE[-1]
+    # Next to the map, as the package's image paths are relative to it.
+    package_path = os.path.join(os.path.dirname(map_name), "wide.bbl")
+    make_wide_package(map_name, STREAM_TEST_REPEATS, package_path)
+
+    level_cache.STREAM_MIN_COLUMNS = 0 if streamed else 10 ** 9
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    level = level_cache.LevelCache().make_level_from_package(
+        level_compiler.CompiledLevelData(package_path), scale,
+        {simulation.LAYER_NAME_PLATFORMS: {"use_spatial_hash": True}},
+        [simulation.LAYER_NAME_SOUND], simulation.TRIGGER_LAYERS)
+    load_time = time.perf_counter() - start_time
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    def get_stream_areas(x: float):
+        return ([(x - simulation.STREAM_NEEDED_DISTANCE, 0,
+                  x + simulation.STREAM_NEEDED_DISTANCE, distance)],
+                [(x - distance, 0, x + distance, distance * 2)])
+
+    # Walk across the level at the player's top speed,
+    # loading the start all at once like `reset_level()`.
+    distance = simulation.STREAM_WANTED_DISTANCE
+    level_width = level.tile_map.width * level.tile_map.tile_width * scale
+    level.update_streaming(*get_stream_areas(0), max_chunks=None)
+    worst_step = 0
+    start_time = time.perf_counter()
+    for x in range(0, int(level_width), simulation.PLAYER_MOVEMENT_SPEED):
+        step_start = time.perf_counter()
+        level.update_streaming(*get_stream_areas(x))
+        worst_step = max(worst_step, time.perf_counter() - step_start)
+    walk_time = time.perf_counter() - start_time
+    columns = level.tile_map.width
+
+    # The level's arrays are mapped from the package, and Windows
+    # can't delete a file that is still mapped, so let go of it first.
+    del level
+    gc.collect()
+    os.remove(package_path)
+
+    print(f"  {columns} columns, "
+          f"{'streamed' if streamed else 'all sprites'}: "
+          f"load {load_time:.2f} s, {memory / 1e6:.1f} MB, "
+          f"walk {walk_time:.2f} s, worst step {worst_step * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    benchmark_window = game.TheGame()
+    # This also boots the window for the other benchmarks.
+    benchmark_startup(benchmark_window)
+    benchmark_reset_level(benchmark_window)
+    benchmark_level_loading()
+    print("streaming")
+    benchmark_streaming(streamed=True)
+    benchmark_streaming(streamed=False)
+    arcade.close_window()
@@ -2,9 +2,13 @@
 The camera system for Burial Bandit.
 """
 
+import math
 import arcade
+from pyglet.math import Mat4, Vec2, Vec3
 
 MOVE_SPEED = .1
+# The time the camera moves MOVE_SPEED of the way to the player in.
+MOVE_SPEED_TIME = 1 / 60
 
 
 class GameCamera(arcade.Camera):
@@ -15,10 +19,18 @@ class GameCamera(arcade.Camera):
 
     def camera_to_player(self,
                          player_sprite: arcade.Sprite,
-                         move_speed: float = MOVE_SPEED):
+                         move_speed: float = MOVE_SPEED,
+                         delta_time: float = None):
         """
         Moves the camera to follow the provided player character.
+
+        delta_time: The time since the camera last moved. If given,
+        the move speed is for MOVE_SPEED_TIME instead of each move,
+        so the camera follows at the same speed at any frame rate.
         """
+        if delta_time is not None:
+            move_speed = 1 - (1 - move_speed) ** (delta_time /
+                                                  MOVE_SPEED_TIME)
         screen_center_x = player_sprite.center_x - (self.viewport_width / 2)
         screen_center_y = player_sprite.center_y - (
             self.viewport_height / 2
@@ -32,3 +44,52 @@ class GameCamera(arcade.Camera):
         player_centered = screen_center_x, screen_center_y
 
         self.move_to(player_centered, move_speed)
+
+    def update(self):
+        """
+        Update the camera's view like `arcade.Camera.update()`,
+        but without moving the shake, as `update_shake()` moves it
+        once per step of the game rules instead of once per frame,
+        so it shakes for the same time at any frame rate.
+        """
+        self.position = self.position.lerp(self.goal_position,
+                                           self.move_speed)
+
+        # The view is the camera's position plus the shake.
+        shaken_position = self.position + self.shake_offset
+        view_position = Vec3(
+            shaken_position[0] / ((self.viewport_width * self.scale) / 2),
+            shaken_position[1] / ((self.viewport_height * self.scale) / 2),
+            0
+        )
+        self.view_matrix = ~(Mat4.from_translation(view_position) @
+                             Mat4().scale((self.scale, self.scale,
+                                           self.scale)))
+        self.combined_matrix = self.projection_matrix @ self.view_matrix
+
+    def update_shake(self):
+        """
+        Move the camera shake on by one step of the game rules,
+        the same way arcade moves it each frame.
+        """
+        # Move the offset by the shake velocity.
+        self.shake_offset += self.shake_velocity
+        offset_x, offset_y = self.shake_offset
+        velocity_x, velocity_y = self.shake_velocity
+
+        # Pull the offset back towards the middle.
+        angle = math.atan2(offset_x, offset_y)
+        distance = math.hypot(offset_x, offset_y)
+        velocity = math.hypot(velocity_x, velocity_y)
+        reverse_speed = min(self.shake_speed, distance)
+        opposite_angle = angle + math.pi
+        opposite_vector = Vec2(math.sin(opposite_angle) * reverse_speed,
+                               math.cos(opposite_angle) * reverse_speed)
+
+        # Stop shaking when it has nearly stopped.
+        if velocity < self.shake_speed and distance < self.shake_speed:
+            self.shake_velocity = Vec2(0, 0)
+            self.shake_offset = Vec2(0, 0)
+
+        self.shake_velocity += opposite_vector
+        self.shake_velocity *= Vec2(self.shake_damping, self.shake_damping)
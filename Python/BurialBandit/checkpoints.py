@@ -0,0 +1,69 @@
+"""
+Finds the checkpoints near the player without
+having to check every checkpoint in the level.
+"""
+
+from typing import Dict, List, Optional, Tuple
+from math import floor
+import arcade
+
+
+class CheckpointIndex():
+    """
+    Sorts a level's checkpoints into a grid of square cells
+    as big as the trigger distance, so only the cells around
+    the player need to be looked at to find one in reach.
+    """
+
+    trigger_distance: float = 0
+    # Each cell holds its (index, location) pairs,
+    # with the furthest progressed checkpoint first.
+    cells: Dict[Tuple[int, int], List[Tuple[int, arcade.Point]]] = None
+
+    def __init__(self, checkpoints: List[arcade.TiledObject],
+                 trigger_distance: float) -> None:
+        self.trigger_distance = trigger_distance
+        self.cells = {}
+
+        for checkpoint_index, tiled_object in enumerate(checkpoints):
+            checkpoint_location: arcade.Point = tiled_object.shape
+            cell = self.get_cell(checkpoint_location[0],
+                                 checkpoint_location[1])
+            self.cells.setdefault(cell, []).append(
+                (checkpoint_index, checkpoint_location))
+
+        for cell_checkpoints in self.cells.values():
+            cell_checkpoints.sort(reverse=True)
+
+    def get_cell(self, x: float, y: float) -> Tuple[int, int]:
+        """Gets the grid cell that a position is in."""
+        return (floor(x / self.trigger_distance),
+                floor(y / self.trigger_distance))
+
+    def find(self, x: float, y: float, after_index: int
+             ) -> Optional[Tuple[int, arcade.Point]]:
+        """
+        Find the furthest progressed checkpoint within the trigger
+        distance of the position that has a higher index than
+        `after_index`, or None if there isn't one.
+        """
+        cell_x, cell_y = self.get_cell(x, y)
+        found = None
+
+        # Anything in reach has to be in this cell or the ones next to it.
+        for near_x in range(cell_x - 1, cell_x + 2):
+            for near_y in range(cell_y - 1, cell_y + 2):
+                for checkpoint_index, checkpoint_location in self.cells.get(
+                        (near_x, near_y), ()):
+                    # The rest of the cell has already been passed.
+                    if checkpoint_index <= after_index:
+                        break
+
+                    if arcade.get_distance(
+                        x, y, checkpoint_location[0], checkpoint_location[1]
+                    ) <= self.trigger_distance:
+                        found = (checkpoint_index, checkpoint_location)
+                        after_index = checkpoint_index
+                        break
+
+        return found
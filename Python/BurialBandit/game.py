@@ -1,489 +1,501 @@
-from typing import Dict
+from typing import Dict, List, Tuple
+import contextlib
+import ctypes
+import sys
 import arcade
 import arcade.gl
+import pyglet
 
 # Internal modules
-import player
 import camera
-from inputs import Inputs
+import textures
 from end_sequence import EndSequence
+from music import MusicPlayer
+from audio import VoicePool
+from replay import ReplayRecorder
+from profiler import FrameProfiler
+from hud import Hud
+from renderer import LevelChunks, CHUNK_SIZE_TILES, draw_scene
+from level_cache import CachedLevel
+from tile_streaming import Area
+from animation import AnimationScheduler
+from timestep import FixedTimestep
+from assets import (
+    AssetLoader,
+    SOUND_MANIFEST,
+    get_animation_images,
+    get_level_images,
+)
+from simulation import (
+    GameSimulation,
+    SIMULATION_DELTA_TIME,
+    LEVELS,
+    PLAYER_INITIAL_LIVES,
+    FINAL_MAP_INDEX,
+    MAP_SCALE,
+    LAYER_NAME_BACKGROUND,
+    LAYER_NAME_FOREGROUND,
+    LAYER_NAME_PICKUPS,
+)
 
 # App parameters
 SCREEN_WIDTH = 1000
 SCREEN_HEIGHT = 800
 SCREEN_TITLE = "Burial Bandit"
 
-# Performance logging
-PERF_LOG_FPS = False
-
-# Physics
-GRAVITY = 0.5
+# Frame rate
+# The window is drawn as often as the display shows frames, up to
+# DRAW_RATE, and the game rules run on their own fixed step of
+# SIMULATION_DELTA_TIME, however fast it draws.
+DRAW_RATE = 1 / 240
+VSYNC = True
+# The player is drawn between their last two steps, unless they
+# moved further than this in one step, like when they respawn.
+INTERPOLATION_MAX_DISTANCE = 128
+# The resolution of the Windows timer while the game runs, in
+# milliseconds, like `arcade.run()` uses. The default one of 15 ms
+# or more can drop the frame rate to 32 frames a second or so.
+WINDOWS_TIMER_RESOLUTION_MS = 10
+
+# Performance measurement
+# Times each part of the frame. Press PERF_OVERLAY_KEY to show the
+# times in game, and they are saved to PERF_CSV_PATH when it closes.
+PERF_PROFILE = False
+PERF_CSV_PATH = "frame_times.csv"
+PERF_OVERLAY_KEY = arcade.key.F3
+# How many frames pass between the overlay's text being updated.
+PERF_OVERLAY_REFRESH_FRAMES = 30
+PERF_OVERLAY_FONT_SIZE = 12
+
+# Set to a file path to record the inputs of each play
+# into a replay file, which can be run with replay.py.
+RECORD_REPLAY_PATH = None
 
 # PLAYER
 LAYER_NAME_PLAYER = "Player"
 
-# Movement speed
-PLAYER_MOVEMENT_SPEED = 7
-PLAYER_JUMP_SPEED = 13
-
-# The number of lives the player
-# has at the start of the game.
-PLAYER_INITIAL_LIVES = 3
-
-# Player size
-PLAYER_SCALING = 5
-
-# How close you need to be to a checkpoint to activate it.
-CHECKPOINT_TRIGGER_DISTANCE = 64
-
-# The number of pixels distance from the absolute ends
-# of the map that the player will be stopped at.
-PLAYER_X_STOP_BUFFER = 64
-
 # GUI
 GUI_MAIN_FONT_SIZE = 20
 
-# LEVELS
-LEVELS = [
-    'maps/1_TownLevel.tmx',
-    'maps/2_JungleLevel.tmx',
-    'maps/3_CaveLevel.tmx',
+# Draw these layers once into textures when the level is first
+# played, instead of drawing every tile each frame.
+# They must never change while the level is played.
+BAKE_STATIC_LAYERS = True
+BAKED_LAYERS = [
+    LAYER_NAME_BACKGROUND,
+    LAYER_NAME_FOREGROUND,
 ]
 
-# Map scale values by level
-MAP_SCALE = [
-    3,
-    5,
-    4,
-]
 
-# The first map that is opened (usually the start).
-MAP_START_INDEX = 0
-
-# Used to enable the End scene logic.
-FINAL_MAP_INDEX = 2
-
-# Layer Names from the tiled project
-LAYER_NAME_PLATFORMS = "Platforms"
-LAYER_NAME_PICKUPS = "Pickups"
-LAYER_NAME_FOREGROUND = "Foreground"
-LAYER_NAME_BACKGROUND = "Background"
-LAYER_NAME_DONT_TOUCH = "Don't Touch"
-LAYER_NAME_NEXT_LEVEL = "Next Level"
-LAYER_NAME_LADDERS = "Ladders"
-LAYER_NAME_CHECKPOINTS = "Checkpoints"
-LAYER_NAME_SOUND = "Sound"
-
-
-class TheGame(arcade.Window):
+class TheGame(GameSimulation, arcade.Window):
     """
     The main window class for the Burial Bandit game.
+    The game rules come from `GameSimulation`,
+    this adds the drawing, sound and keyboard.
 
     Runs the game after running the `setup()` method
-    and calling `arcade.run()`.
+    and calling `run_game()`.
     """
 
-    # Tiled map data
-    tile_map: arcade.TileMap = None
-    # The arcade scene for all data from the tiled map.
-    scene: arcade.Scene = None
-    physics_engine = None
-
-    # Holds all the sounds in the game in a dictionary.
-    sounds: Dict[str, arcade.Sound] = {}
-    # Holds the player for the background soundtrack.
-    looping_song = None
-
-    # Holds the player Sprite object
-    player_sprite: arcade.Sprite = None
+    # Holds all the sound effects in the game by their name.
+    sounds: Dict[str, arcade.Sound] = None
+    # Plays the music, and keeps playing it when levels restart.
+    music: MusicPlayer = None
+
+    # The SpriteList the player is drawn from.
+    player_list: arcade.SpriteList = None
+
+    # Runs the game rules on a fixed step at any frame rate.
+    timestep: FixedTimestep = None
+    # Where the player was before the last step,
+    # for drawing them between the last two steps.
+    previous_player_position: Tuple[float, float] = None
+    # The time since the window was last drawn.
+    time_since_draw: float = 0.0
+    # Set when a level is loaded, so the time the load took
+    # isn't played as catch-up steps on the next frame.
+    skip_next_frame_time: bool = False
+
+    # The static layers of each level split into chunks,
+    # so only the parts on screen are drawn.
+    level_chunks: Dict[CachedLevel, LevelChunks] = None
+    # The chunks for the level being played.
+    chunks: LevelChunks = None
+
+    # Animates the pickups of each level, like keys and gems.
+    level_pickup_animations: Dict[CachedLevel, AnimationScheduler] = None
+    # The pickup animations for the level being played.
+    pickup_animations: AnimationScheduler = None
 
     # Cameras
     camera: arcade.Camera = None
     gui_camera: arcade.Camera = None
 
-    # Holds the current input values
-    inputs: Inputs = None
+    # The text drawn over the game, like the lives.
+    hud: Hud = None
 
     # This object handles the unique effects
     # done in the game finale action sequence.
     end_sequence: EndSequence = None
 
-    # Level index
-    current_level_index: int = MAP_START_INDEX
+    # Records the inputs when RECORD_REPLAY_PATH is set.
+    recorder: ReplayRecorder = None
 
-    # Current checkpoint
-    player_checkpoint_pos: arcade.Point = None
-    player_checkpoint_index: int = 0
-
-    # Map width in game px
-    map_width_px = 0
-
-    # GAMEPLAY
-    # Keys
-    keys_picked_up: int = 0
-    keys_to_pick_up: int = 0
-
-    # Lives
-    lives: int = 0
+    # Shows the frame times when PERF_PROFILE is on.
+    show_profile_overlay: bool = False
+    profile_overlay_text: arcade.Text = None
+    frames_since_overlay_refresh: int = 0
 
     def __init__(self) -> None:
 
         # Create the window
         super().__init__(SCREEN_WIDTH, SCREEN_HEIGHT,
-                         SCREEN_TITLE, fullscreen=False)
+                         SCREEN_TITLE, fullscreen=False,
+                         update_rate=DRAW_RATE, vsync=VSYNC)
 
         arcade.set_background_color(arcade.csscolor.SKY_BLUE)
 
     def setup(self):
-        """Set up the game here. Call this function to restart the game."""
-        # INPUT SYSTEM
-        self.inputs = Inputs()
-
-        # MAP LOAD
-        # The path to the map file
-        map_name = LEVELS[self.current_level_index]
-
-        # Configure map layers to optimise performance.
-        layer_options = {
-            LAYER_NAME_PLATFORMS: {
-                "use_spatial_hash": True,
-            },
-            LAYER_NAME_PICKUPS: {
-                "use_spatial_hash": True,
-            },
-            LAYER_NAME_DONT_TOUCH: {
-                "use_spatial_hash": True,
-            },
-            LAYER_NAME_LADDERS: {
-                "use_spatial_hash": True,
-            },
-            LAYER_NAME_NEXT_LEVEL: {
-                "use_spatial_hash": True,
-            },
-        }
-
-        # Load tiled map
-        self.tile_map = arcade.load_tilemap(
-            map_name,
-            MAP_SCALE[self.current_level_index],
-            layer_options
-            )
-
-        # Convert Tiled map to a arcade scene with SpriteLists for each layer.
-        self.scene = arcade.Scene.from_tilemap(self.tile_map)
-
-        # Set the background color from the map file.
-        if self.tile_map.background_color:
-            arcade.set_background_color(self.tile_map.background_color)
-
-        # Get the player start location from the tiled map file.
-        # This is done by just going to the first checkpoint.
-        self.player_checkpoint_index = 0
-        self.player_checkpoint_pos = (self.tile_map.object_lists
-                                      [LAYER_NAME_CHECKPOINTS]
-                                      [self.player_checkpoint_index].shape)
-
-        self.map_width_px = (
-            self.tile_map.width *
-            self.tile_map.tile_width *
-            MAP_SCALE[self.current_level_index])
-        # END MAP LOAD
-
-        # LOAD SOUNDS
-        self.sounds = {
-            # Key pickup sound
-            'keys_on_surface': arcade.load_sound(
-                'assets/Audio/keys_on_surface_zapsplat.mp3'),
-
-            # Looping game soundtrack
-            'through_the_forest': arcade.load_sound(
-                'assets/Audio/madmakingmistery_ttf.wav', True),
-
-            # These sound effects are played when walking on surfaces.
-            'grass_surface': arcade.load_sound(
-                'assets/Audio/footsteps-in-grass-moderate-A-fesliyanstudios.mp3'),
-            'stone_surface': arcade.load_sound(
-                'assets/Audio/dress-shoes-on-Concrete-Floor-fast-pace-FesliyanStudios.mp3'),
-
-            # End sequence
-            'end_intro': arcade.load_sound(
-                'assets/Audio/EndSequence_Intro.mp3'),
-            'end_loop': arcade.load_sound(
-                'assets/Audio/EndSequence_Looping.mp3')
-        }
-
-        # Hack to prevent lag spikes when playing
-        # the sounds for the first time.
-        for sound in self.sounds.values():
-            sound.stop(sound.play(0))
-        # END LOAD SOUNDS
-
-        # CREATE PLAYER CHARACTER
-        # Create the list for the player sprites
-        self.scene.add_sprite_list(LAYER_NAME_PLAYER)
-        # Put in front of the BG so the
-        # player is not hidden incorrectly.
-        self.scene.add_sprite_list_before(LAYER_NAME_PLAYER,
-                                          LAYER_NAME_FOREGROUND)
-
-        # Make the player character object and
-        # place them at the start of the level.
-        self.player_sprite = player.PlayerCharacter(PLAYER_SCALING,
-                                                    self.sounds)
-        self.player_sprite.center_x = self.player_checkpoint_pos[0]
-        self.player_sprite.center_y = self.player_checkpoint_pos[1]
-        self.scene.add_sprite(LAYER_NAME_PLAYER, self.player_sprite)
-
-        # Create the physics engine to let the player move.
-        self.physics_engine = arcade.PhysicsEnginePlatformer(
-            self.player_sprite,
-            gravity_constant=GRAVITY,
-            walls=self.scene[LAYER_NAME_PLATFORMS],
-            ladders=self.scene[LAYER_NAME_LADDERS]
-        )
-        # END CREATE PLAYER CHARACTER
+        """
+        Set up the game here. Call this function once to start the game,
+        and `reset_level()` to restart the current level.
+        """
+        super().setup()
+
+        # Start recording once the first level is loaded.
+        if RECORD_REPLAY_PATH is not None:
+            self.recorder = ReplayRecorder()
+            self.recorder.start(self)
+
+    def on_close(self):
+        """Save the replay and frame times, if they are on, as it closes."""
+        if self.recorder is not None:
+            self.recorder.finish(self).save(RECORD_REPLAY_PATH)
+        if PERF_PROFILE:
+            self.profiler.save_csv(PERF_CSV_PATH)
+        super().on_close()
+
+    def boot(self):
+        """
+        Load everything that lasts for the whole time the game is open,
+        so it doesn't have to be done again when a level restarts.
+        """
+        # LOAD ASSETS
+        # The sounds, the player's animations and the first level's
+        # images are decoded on a pool of threads at the same time.
+        loader = AssetLoader()
+        loader.load_sounds(SOUND_MANIFEST)
+        loader.load_images(get_animation_images(), mirrored=True)
+        loader.load_images(
+            get_level_images(LEVELS[self.current_level_index]),
+            hit_box_algorithm="None")
+        self.sounds = loader.get_sounds()
+        loader.wait()
+        # END LOAD ASSETS
+
+        # The sound effects play on voices made once here, so
+        # playing one doesn't make a new player during the game.
+        if self.voices is None:
+            self.voices = VoicePool(self.sounds)
+
+        # The music is streamed from its files as it plays. It is
+        # only made once, so the music doesn't stop or play twice.
+        if self.music is None:
+            self.music = MusicPlayer()
+
+        # Make the player and physics with the sounds loaded.
+        super().boot()
+
+        self.timestep = FixedTimestep(SIMULATION_DELTA_TIME)
+
+        self.level_chunks = {}
+        self.level_pickup_animations = {}
+
+        # Create the list for the player sprites,
+        # which is added to the scene of every level.
+        # It uses an atlas with all the player's animation
+        # frames already in it, so they are never added mid-game.
+        self.player_list = arcade.SpriteList(
+            atlas=textures.get_animation_atlas())
+        self.player_list.append(self.player_sprite)
 
         # CAMERAS
         # Make the camera that will follow the player.
         self.camera = camera.GameCamera()
-        # Set it's start location to where the player is
-        # instantly, so that it doesn't drift to the start.
-        self.camera.camera_to_player(self.player_sprite, 1)
-        self.camera.update()
 
         # Static camera for the User Interface and
         # Heads Up Display elements, so they stay
         # in the same place on the screen.
         self.gui_camera = arcade.Camera()
 
+        # HUD
+        # Each piece of text is only laid out again
+        # when the value it is watching changes.
+        self.hud = Hud()
+        # Health counter in the top left of the screen.
+        self.hud.add_text(
+            lambda: self.lives,
+            lambda lives: f"Lives {lives}/{PLAYER_INITIAL_LIVES}",
+            32, self.height - 32,
+            arcade.color.ROSE_RED,
+            GUI_MAIN_FONT_SIZE,
+            anchor_y="top"
+        )
+        # Keys counter under the lives.
+        self.hud.add_text(
+            lambda: (self.keys_picked_up, self.keys_to_pick_up),
+            lambda keys: f"Keys {keys[0]}/{keys[1]}",
+            32, self.height - 64,
+            arcade.color.GOLD,
+            GUI_MAIN_FONT_SIZE,
+            anchor_y="top"
+        )
+        # Level number in the top right of the screen.
+        self.hud.add_text(
+            lambda: self.current_level_index,
+            lambda level_index: f"Level {level_index + 1}",
+            self.width - 32, self.height - 32,
+            arcade.color.WHITE,
+            GUI_MAIN_FONT_SIZE,
+            anchor_x="right",
+            anchor_y="top"
+        )
+        # END HUD
+
         # PERFORMANCE MEASUREMENT
-        # Needed to get the game framerate.
-        if PERF_LOG_FPS:
-            arcade.enable_timings()
+        if PERF_PROFILE:
+            self.profiler = FrameProfiler()
+            self.profile_overlay_text = arcade.Text(
+                "", 32, self.height - 104,
+                arcade.color.WHITE,
+                PERF_OVERLAY_FONT_SIZE,
+                width=self.width,
+                font_name=("Courier New", "Courier", "monospace"),
+                anchor_y="top",
+                multiline=True
+            )
         # END PERFORMANCE MEASUREMENT
 
-        # GAMEPLAY VALUES
-        # Set Keys picked up to none.
-        self.keys_picked_up = 0
-        # Get the number of keys placed on the pickup layer.
-        self.keys_to_pick_up = len(self.scene[LAYER_NAME_PICKUPS])
+    def reset_level(self):
+        """
+        Start the current level from the beginning,
+        along with its drawing and sound.
+        """
+        super().reset_level()
+
+        # Set the background color from the map file.
+        if self.tile_map.background_color:
+            arcade.set_background_color(self.tile_map.background_color)
+
+        # CHUNKED DRAWING
+        # Split the level's shared layers into chunks
+        # the first time it is played.
+        # The streamed layers only have the sprites near
+        # the player, so they are drawn whole instead.
+        if self.level not in self.level_chunks:
+            level_chunks = LevelChunks(
+                [sprite_list
+                 for name, sprite_list in self.level.static_layers.items()
+                 if name not in self.level.streamed_layers],
+                CHUNK_SIZE_TILES * self.tile_map.tile_width *
+                MAP_SCALE[self.current_level_index]
+            )
+            # Draw the baked layers into textures at the
+            # map's own pixel size, so nothing is lost.
+            if BAKE_STATIC_LAYERS:
+                level_chunks.bake(
+                    {name: self.level.static_layers[name]
+                     for name in BAKED_LAYERS
+                     if name in self.level.static_layers
+                     and name not in self.level.streamed_layers},
+                    MAP_SCALE[self.current_level_index]
+                )
+            self.level_chunks[self.level] = level_chunks
+        self.chunks = self.level_chunks[self.level]
+        # END CHUNKED DRAWING
+
+        # Pickups with the same animation share one clock. They are the
+        # level's original sprites, which every restart's scene uses.
+        if self.level not in self.level_pickup_animations:
+            self.level_pickup_animations[self.level] = AnimationScheduler(
+                self.level.mutable_layers.get(LAYER_NAME_PICKUPS, ()))
+        self.pickup_animations = self.level_pickup_animations[self.level]
+
+        # Put the player in front of the BG so
+        # they are not hidden incorrectly.
+        self.scene.add_sprite_list_before(LAYER_NAME_PLAYER,
+                                          LAYER_NAME_FOREGROUND,
+                                          sprite_list=self.player_list)
 
-        # Set lives to the max value
-        self.lives = PLAYER_INITIAL_LIVES
-        # END GAMEPLAY VALUES
+        # Draw the player where they start, not
+        # moving from where they were before.
+        self.previous_player_position = self.player_sprite.position
+
+        # CAMERAS
+        # Set the camera's start location to where the player is
+        # instantly, so that it doesn't drift to the start.
+        self.camera.camera_to_player(self.player_sprite, 1)
+        self.camera.update()
+
+        # Stop the end sequence from the last attempt.
+        if self.end_sequence is not None:
+            self.end_sequence.stop()
+            self.end_sequence = None
 
         # Setup end sequence for last (3rd) level.
         # The end sequence has a lot of fancy animation stuff,
-        # so it is kept seperate, with the sounds and camera shared.
+        # so it is kept seperate, with the music and camera shared.
         if self.current_level_index == FINAL_MAP_INDEX:
             self.end_sequence = EndSequence(
-                self.sounds,
-                self.camera,
-                self.scene,
-                self.player_sprite
+                self.music,
+                self.camera
             )
 
         # MUSIC
         # It plays the background music at start
         # and stops it on the final level.
-        if (self.current_level_index != FINAL_MAP_INDEX and
-                self.looping_song is None):
-            self.looping_song = (self.sounds['through_the_forest']
-                                 .play(.4, loop=True))
-        elif (self.looping_song is not None and
-                self.current_level_index == FINAL_MAP_INDEX):
-            arcade.stop_sound(self.looping_song)
+        # Music that is already playing carries on.
+        if self.current_level_index != FINAL_MAP_INDEX:
+            self.music.play('through_the_forest', volume=.4)
+        else:
+            self.music.stop()
+
+        # TIME STEP
+        # Start the level without any time saved up from the last one.
+        self.timestep.reset()
+        self.skip_next_frame_time = True
 
     def on_update(self, delta_time):
         """Movement and game logic"""
-
-        self.stop_player_at_ends()
-
-        # Move the player with the physics engine.
-        self.physics_engine.update()
-
-        # Update player animation
-        self.player_sprite.update_animation(delta_time)
-        self.player_sprite.update_sfx(self.scene[LAYER_NAME_SOUND])
-
-        # Check if the player hits something deadly.
-        self.check_for_deadly_surfaces()
-
-        # Check if the player picked up a key.
-        self.check_for_pickup_collision()
-
-        self.check_for_next_level()
-
-        self.update_checkpoints()
-
-        if self.end_sequence is not None:
-            self.end_sequence.on_update(delta_time)
+        # The time since the last frame was spent loading a level.
+        if self.skip_next_frame_time:
+            self.skip_next_frame_time = False
+            delta_time = 0.0
+        self.time_since_draw += delta_time
+
+        # Run the game rules on a fixed step, as many times as fit in
+        # the time that has passed, so the game plays at the same speed
+        # at any frame rate, and replays play back the same.
+        for _ in range(self.timestep.advance(delta_time)):
+            self.previous_player_position = self.player_sprite.position
+            self.step()
+            self.camera.update_shake()
+            # Don't catch up on the level that was just loaded.
+            if self.skip_next_frame_time:
+                break
+
+        with self.profiler.phase("sfx"):
+            self.player_sprite.update_sfx(
+                self.ground_grid.get_under(self.player_sprite))
+
+        # Animate the pickups like keys and gems that are on screen.
+        with self.profiler.phase("pickup animation"):
+            self.pickup_animations.update(delta_time, self.camera)
+
+        with self.profiler.phase("end sequence"):
+            if self.end_sequence is not None:
+                self.end_sequence.on_update(delta_time)
 
     def on_draw(self):
         """Render the screen."""
+        profiler = self.profiler
         self.clear()
 
         # DRAW GAME WORLD
-        self.camera.camera_to_player(self.player_sprite)
-        self.camera.use()
+        # Draw the player between their last two steps, putting them
+        # back where the game rules left them after the scene is drawn.
+        player_position = self.player_sprite.position
+        self.player_sprite.position = self.get_drawn_player_position()
 
-        # Animate the pickups like keys and gems.
-        self.scene[LAYER_NAME_PICKUPS].update_animation()
+        with profiler.phase("camera"):
+            self.camera.camera_to_player(self.player_sprite,
+                                         delta_time=self.time_since_draw)
+            self.camera.use()
+            self.time_since_draw = 0.0
 
         # Draw with nearest pixel sampling to get that pixelated look.
-        self.scene.draw(filter=arcade.gl.NEAREST)
+        # Only the chunks of the tile layers on screen are drawn.
+        with profiler.phase("scene draw"):
+            draw_scene(self.scene, self.chunks, self.camera,
+                       filter=arcade.gl.NEAREST)
+        self.player_sprite.position = player_position
 
         # DRAW GUI
-        self.gui_camera.use()
-
-        # Draw health counter in the top left of the screen.
-        arcade.draw_text(
-            f"Lives {self.lives}/{PLAYER_INITIAL_LIVES}",
-            32, self.height - 32,
-            arcade.color.ROSE_RED,
-            GUI_MAIN_FONT_SIZE,
-            anchor_y="top"
-        )
-
-        # Log the framerate of the game
-        # to help diagnose performance issues.
-        if PERF_LOG_FPS:
-            print(arcade.get_fps())
-
-    def check_for_deadly_surfaces(self):
-        """Check if the player hits something damaging"""
-        if arcade.check_for_collision_with_list(
-            self.player_sprite,
-            self.scene[LAYER_NAME_DONT_TOUCH]
-        ):
-            # Take a life
-            self.lives -= 1
-
-            # If the player has lives remaining.
-            if self.lives > 0:
-                # Send player back to checkpoint
-                self.player_sprite.change_x = 0
-                self.player_sprite.change_y = 0
-                self.player_sprite.center_x = self.player_checkpoint_pos[0]
-                self.player_sprite.center_y = self.player_checkpoint_pos[1]
-            # If the player is out of lives.
-            else:
-                # Restart the level.
-                self.setup()
-
-    def check_for_pickup_collision(self):
-        """Collect keys when the player walks into them."""
-
-        # See if we hit any keys
-        pickup_hit_list = arcade.check_for_collision_with_list(
-            self.player_sprite, self.scene[LAYER_NAME_PICKUPS]
-        )
-
-        if len(pickup_hit_list) > 0:
-            self.sounds['keys_on_surface'].play()
-            # Start end sequence
-            if self.current_level_index == FINAL_MAP_INDEX:
-                self.end_sequence.start()
-
-        # Loop through each key we hit (if any) and remove it
-        for pickup in pickup_hit_list:
-            # Remove the coin
-            pickup.remove_from_sprite_lists()
-            # Add to the key counter
-            self.keys_picked_up += 1
-
-    def check_for_next_level(self):
-        """When the player reaches the end of the level,
-        load the next one."""
-
-        if arcade.check_for_collision_with_list(
-            self.player_sprite,
-            self.scene[LAYER_NAME_NEXT_LEVEL]
-        ) and self.keys_picked_up >= self.keys_to_pick_up:
-            self.keys_picked_up = 0
-            self.player_sprite.stop_sfx()
-            if len(LEVELS)-1 > self.current_level_index:
-                self.current_level_index += 1
-            self.setup()
-
-    def update_checkpoints(self):
-        """
-        When the player comes within proximity of one of the
-        checkpoints and it is of a higher index then the previous
-        one they activated, that will become their new checkpoint.
-        """
-        checkpoints = self.tile_map.object_lists[LAYER_NAME_CHECKPOINTS]
-        for checkpoint_index, tiled_object in enumerate(checkpoints):
-            checkpoint_location: arcade.Shape = tiled_object.shape
-            # Checks the player is both close enough to the checkpoint
-            # and has not already obtained a further progressed checkpoint.
-            if arcade.get_distance(
-                self.player_sprite.center_x, self.player_sprite.center_y,
-                checkpoint_location[0], checkpoint_location[1]
-            ) <= CHECKPOINT_TRIGGER_DISTANCE and (
-                    checkpoint_index > self.player_checkpoint_index):
-                # Set the checkpoint location to
-                # the newly reached checkpoint.
-                self.player_checkpoint_index = checkpoint_index
-                self.player_checkpoint_pos = checkpoint_location
-
-    def stop_player_at_ends(self):
+        with profiler.phase("gui"):
+            self.gui_camera.use()
+
+            # Draw the lives, keys and level.
+            self.hud.update()
+            self.hud.draw()
+
+        # Show the frame times, only working out the
+        # percentiles every so often as it is slow.
+        if self.show_profile_overlay:
+            self.frames_since_overlay_refresh += 1
+            if (self.frames_since_overlay_refresh >=
+                    PERF_OVERLAY_REFRESH_FRAMES):
+                self.frames_since_overlay_refresh = 0
+                self.profile_overlay_text.text = "\n".join(
+                    profiler.summary())
+            self.profile_overlay_text.draw()
+
+        profiler.end_frame()
+
+    def get_drawn_player_position(self) -> Tuple[float, float]:
         """
-        Stop the player walking off the ends of the level.
-        Call this before the physics update.
+        Get where to draw the player, as far between where they were
+        before the last step and where they are now as the time is
+        between the last step and the next.
         """
-        # Where the player will be on the next
-        # physics update if the change goes ahead.
-        anticipated_position = (self.player_sprite.center_x +
-                                self.player_sprite.change_x)
-        # Stop the player at the left side of the map.
-        if (self.inputs.left_pressed and
-                anticipated_position <= PLAYER_X_STOP_BUFFER):
-            self.player_sprite.change_x = 0
-        # Stop the player on the right side of the map.
-        elif (self.inputs.right_pressed and anticipated_position >=
-              self.map_width_px - PLAYER_X_STOP_BUFFER):
-            self.player_sprite.change_x = 0
-
-    def process_keychange(self):
+        previous_x, previous_y = self.previous_player_position
+        x, y = self.player_sprite.position
+        if (abs(x - previous_x) > INTERPOLATION_MAX_DISTANCE or
+                abs(y - previous_y) > INTERPOLATION_MAX_DISTANCE):
+            return x, y
+        alpha = self.timestep.alpha
+        return (previous_x + (x - previous_x) * alpha,
+                previous_y + (y - previous_y) * alpha)
+
+    def get_stream_areas(self) -> Tuple[List[Area], List[Area]]:
         """
-        Updates the input's impact on gameplay.
+        Also stream in what the camera sees, as it can
+        be far behind the player after a respawn.
         """
-        # Process jumping and moving up/down ladders.
-        if self.inputs.up_pressed and not self.inputs.down_pressed:
-            if self.physics_engine.is_on_ladder():
-                self.player_sprite.change_y = PLAYER_MOVEMENT_SPEED
-            elif (
-                self.physics_engine.can_jump(y_distance=10)
-                and not self.inputs.jump_needs_reset
-            ):
-                self.player_sprite.change_y = PLAYER_JUMP_SPEED
-                self.inputs.jump_needs_reset = True
-                # arcade.play_sound(self.jump_sound)
-        elif self.inputs.down_pressed and not self.inputs.up_pressed:
-            if self.physics_engine.is_on_ladder():
-                self.player_sprite.change_y = -PLAYER_MOVEMENT_SPEED
-
-        # Cancel out movement on ladders when
-        # both up and down are pressed.
-        if self.physics_engine.is_on_ladder():
-            if not self.inputs.up_pressed and not self.inputs.down_pressed:
-                self.player_sprite.change_y = 0
-            elif self.inputs.up_pressed and self.inputs.down_pressed:
-                self.player_sprite.change_y = 0
-
-        # Walking laft and right.
-        if self.inputs.right_pressed and not self.inputs.left_pressed:
-            self.player_sprite.change_x = PLAYER_MOVEMENT_SPEED
-        elif self.inputs.left_pressed and not self.inputs.right_pressed:
-            self.player_sprite.change_x = -PLAYER_MOVEMENT_SPEED
-        else:
-            self.player_sprite.change_x = 0
+        needed_areas, wanted_areas = super().get_stream_areas()
+        camera_x, camera_y = self.camera.position
+        camera_area = (camera_x, camera_y,
+                       camera_x + self.camera.viewport_width,
+                       camera_y + self.camera.viewport_height)
+        return (needed_areas + [camera_area],
+                wanted_areas + [camera_area])
+
+    def check_for_pickup_collision(self,
+                                   pickup_hit_list: List[arcade.Sprite]):
+        """Collect keys, playing a sound when one is picked up."""
+        if len(pickup_hit_list) > 0:
+            self.voices.play('keys_on_surface')
+        super().check_for_pickup_collision(pickup_hit_list)
+
+    def start_end_sequence(self):
+        """Start the action sequence, with its sounds and camera shake."""
+        super().start_end_sequence()
+        self.end_sequence.start()
+
+    def finish_end_sequence(self):
+        """End the action sequence and its sounds."""
+        super().finish_end_sequence()
+        self.end_sequence.stop()
 
     # CAPTURE INPUTS
     def on_key_press(self, key, modifiers):
         """Sets input value for the pressed key."""
 
+        # Show or hide the frame times.
+        if PERF_PROFILE and key == PERF_OVERLAY_KEY:
+            self.show_profile_overlay = not self.show_profile_overlay
+            self.frames_since_overlay_refresh = PERF_OVERLAY_REFRESH_FRAMES
+            return
+
         if key == arcade.key.UP or key == arcade.key.W:
             self.inputs.up_pressed = True
         elif key == arcade.key.DOWN or key == arcade.key.S:
@@ -493,6 +505,9 @@ class TheGame(arcade.Window):
         elif key == arcade.key.RIGHT or key == arcade.key.D:
             self.inputs.right_pressed = True
 
+        if self.recorder is not None:
+            self.recorder.record(self)
+
         self.process_keychange()
 
     def on_key_release(self, key, modifiers):
@@ -508,12 +523,52 @@ class TheGame(arcade.Window):
         elif key == arcade.key.RIGHT or key == arcade.key.D:
             self.inputs.right_pressed = False
 
+        if self.recorder is not None:
+            self.recorder.record(self)
+
         self.process_keychange()
 
 
 # RUN GAME
+def run_game():
+    """
+    Run the game's window, drawing up to DRAW_RATE instead of
+    the 60 frames a second of `arcade.run()`. Like that, it makes
+    the Windows timer finer while it runs, so it can keep up.
+    """
+    if sys.platform != "win32":
+        pyglet.app.run(DRAW_RATE)
+        return
+
+    with windows_timer_resolution(WINDOWS_TIMER_RESOLUTION_MS):
+        pyglet.app.run(DRAW_RATE)
+
+
+@contextlib.contextmanager
+def windows_timer_resolution(milliseconds: int):
+    """
+    Set the resolution of the Windows timer, as near to the
+    milliseconds as it can go, until the block is done.
+    """
+    from ctypes import wintypes
+
+    class TIMECAPS(ctypes.Structure):
+        _fields_ = (("wPeriodMin", wintypes.UINT),
+                    ("wPeriodMax", wintypes.UINT))
+
+    winmm = ctypes.WinDLL("winmm")
+    caps = TIMECAPS()
+    winmm.timeGetDevCaps(ctypes.byref(caps), ctypes.sizeof(caps))
+    milliseconds = min(max(milliseconds, caps.wPeriodMin), caps.wPeriodMax)
+    winmm.timeBeginPeriod(milliseconds)
+    try:
+        yield
+    finally:
+        winmm.timeEndPeriod(milliseconds)
+
+
 # Run the game if the file is being run
 if __name__ == "__main__":
     window = TheGame()
     window.setup()
-    arcade.run()
+    run_game()
@@ -0,0 +1,400 @@
+"""
+A platformer physics engine that collides with grids of tiles.
+
+It moves the player the same way as `arcade.PhysicsEnginePlatformer`,
+with the same gravity, jumping and ladders. Instead of testing the
+player's hit box against the polygons of every nearby platform sprite,
+it looks up the cells under the player in numpy grids, made from the
+Platforms and Ladders layers once when a level loads.
+
+The player's hit box is used as the rectangle around it, and it isn't
+rotated. Platform tiles have to fill whole cells of the grid, which
+is true of every tile in the game's levels.
+"""
+
+from typing import List, Optional, Tuple
+import math
+import arcade
+import numpy as np
+
+from tile_streaming import StreamedTileLayer
+
+# The left, bottom, right and top of a rectangle in game px.
+Box = Tuple[float, float, float, float]
+
+
+def get_sprite_box(sprite: arcade.Sprite) -> Box:
+    """Get the rectangle around a sprite's hit box."""
+    points = sprite.get_adjusted_hit_box()
+    x_values = [point[0] for point in points]
+    y_values = [point[1] for point in points]
+    return min(x_values), min(y_values), max(x_values), max(y_values)
+
+
+def get_layer_boxes(sprite_list: arcade.SpriteList,
+                    streamed_layer: Optional[StreamedTileLayer] = None
+                    ) -> List[Box]:
+    """
+    Get the rectangle around every tile in a layer.
+    A streamed layer only has sprites for some of its tiles,
+    so one sprite of each kind of tile is made to find the
+    rectangle, which is then moved to each of its tiles.
+    """
+    if streamed_layer is None:
+        return [get_sprite_box(sprite) for sprite in sprite_list]
+
+    tile_ids = streamed_layer.tile_ids
+    tile_width = streamed_layer.chunk_width / streamed_layer.chunk_tiles
+    tile_height = streamed_layer.chunk_height / streamed_layer.chunk_tiles
+    rows, columns = np.nonzero(tile_ids)
+    ids = tile_ids[rows, columns]
+    boxes = []
+    for tile_id in np.unique(ids).tolist():
+        tile_rows = rows[ids == tile_id].tolist()
+        tile_columns = columns[ids == tile_id].tolist()
+        left, bottom, right, top = get_sprite_box(
+            streamed_layer.make_sprite(tile_rows[0], tile_columns[0],
+                                       tile_id))
+        # The rows go from the top down, so lower tiles have higher rows.
+        for row, column in zip(tile_rows, tile_columns):
+            offset_x = (column - tile_columns[0]) * tile_width
+            offset_y = (tile_rows[0] - row) * tile_height
+            boxes.append((left + offset_x, bottom + offset_y,
+                          right + offset_x, top + offset_y))
+    return boxes
+
+
+class TileGrid():
+    """
+    Marks the cells of a level that tiles reach into.
+    Row 0 is the bottom of the map.
+    """
+
+    # True for each cell a tile is in, indexed by [row, column].
+    cells: np.ndarray = None
+
+    # The size of the grid in cells.
+    columns: int = 0
+    rows: int = 0
+    # The size of a cell in game px.
+    cell_width: float = 0
+    cell_height: float = 0
+
+    def __init__(self, columns: int, rows: int,
+                 cell_width: float, cell_height: float) -> None:
+        self.columns = columns
+        self.rows = rows
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        self.cells = np.zeros((rows, columns), dtype=bool)
+
+    def get_cell_range(self, box: Box) -> Tuple[int, int, int, int]:
+        """
+        Get the first and last columns and rows of the cells
+        that overlap the box, kept inside the grid. Only touching
+        the edge of a cell doesn't count, the same as arcade.
+        """
+        left, bottom, right, top = box
+        return (max(math.floor(left / self.cell_width), 0),
+                min(math.ceil(right / self.cell_width), self.columns) - 1,
+                max(math.floor(bottom / self.cell_height), 0),
+                min(math.ceil(top / self.cell_height), self.rows) - 1)
+
+    def overlaps(self, box: Box) -> bool:
+        """Check if any marked cell overlaps the box."""
+        (first_column, last_column,
+         first_row, last_row) = self.get_cell_range(box)
+        if first_column > last_column or first_row > last_row:
+            return False
+        return bool(self.cells[first_row:last_row + 1,
+                               first_column:last_column + 1].any())
+
+    def overlaps_all(self, left: np.ndarray, bottom: np.ndarray,
+                     right: np.ndarray, top: np.ndarray) -> np.ndarray:
+        """
+        Check many boxes at once, given as arrays of their edges.
+        Returns an array that is True for each box a marked cell overlaps.
+        """
+        first_columns = np.maximum(
+            np.floor(left / self.cell_width).astype(np.int64), 0)
+        last_columns = np.minimum(
+            np.ceil(right / self.cell_width).astype(np.int64),
+            self.columns) - 1
+        first_rows = np.maximum(
+            np.floor(bottom / self.cell_height).astype(np.int64), 0)
+        last_rows = np.minimum(
+            np.ceil(top / self.cell_height).astype(np.int64), self.rows) - 1
+
+        # Look at the same cell of every box at once, going
+        # across and up as far as the biggest box reaches.
+        hits = np.zeros(len(left), dtype=bool)
+        if len(left) == 0:
+            return hits
+        most_columns = int((last_columns - first_columns).max()) + 1
+        most_rows = int((last_rows - first_rows).max()) + 1
+        for column_offset in range(most_columns):
+            columns = first_columns + column_offset
+            in_columns = columns <= last_columns
+            columns = np.minimum(columns, self.columns - 1)
+            for row_offset in range(most_rows):
+                rows = first_rows + row_offset
+                in_box = in_columns & (rows <= last_rows)
+                rows = np.minimum(rows, self.rows - 1)
+                hits |= in_box & self.cells[rows, columns]
+        return hits
+
+
+class SolidGrid(TileGrid):
+    """The cells of a level the player can't move through."""
+
+    def add_boxes(self, boxes: List[Box]):
+        """
+        Make the cells the tiles fill solid.
+        Raises ValueError if a tile doesn't fill whole cells.
+        """
+        for box in boxes:
+            left, bottom, right, top = box
+            edges = (left / self.cell_width, bottom / self.cell_height,
+                     right / self.cell_width, top / self.cell_height)
+            if any(edge != round(edge) for edge in edges):
+                raise ValueError(f"The tile at {box} doesn't fill whole "
+                                 f"cells, so it can't be in a grid.")
+            (first_column, last_column,
+             first_row, last_row) = self.get_cell_range(box)
+            self.cells[first_row:last_row + 1,
+                       first_column:last_column + 1] = True
+
+
+class BoxGrid(TileGrid):
+    """
+    Tiles that don't have to fill whole cells, like ladders.
+    The grid only finds the tiles that could be touching
+    a box, and their rectangles are checked after.
+    """
+
+    # The rectangles of the tiles.
+    boxes: List[Box] = None
+
+    def __init__(self, columns: int, rows: int,
+                 cell_width: float, cell_height: float) -> None:
+        super().__init__(columns, rows, cell_width, cell_height)
+        self.boxes = []
+
+    def add_boxes(self, boxes: List[Box]):
+        """Add tiles, marking every cell they reach into."""
+        for box in boxes:
+            self.boxes.append(box)
+            (first_column, last_column,
+             first_row, last_row) = self.get_cell_range(box)
+            self.cells[first_row:last_row + 1,
+                       first_column:last_column + 1] = True
+
+    def overlaps(self, box: Box) -> bool:
+        """Check if any tile overlaps the box."""
+        if not super().overlaps(box):
+            return False
+        left, bottom, right, top = box
+        return any(left < tile_right and tile_left < right and
+                   bottom < tile_top and tile_bottom < top
+                   for tile_left, tile_bottom, tile_right, tile_top
+                   in self.boxes)
+
+    def overlaps_all(self, left: np.ndarray, bottom: np.ndarray,
+                     right: np.ndarray, top: np.ndarray) -> np.ndarray:
+        """
+        Check many boxes at once, given as arrays of their edges.
+        Returns an array that is True for each box a tile overlaps.
+        """
+        hits = super().overlaps_all(left, bottom, right, top)
+        near = np.nonzero(hits)[0]
+        if len(near) == 0:
+            return hits
+
+        # Only the boxes near a tile are checked against every tile.
+        tiles = np.array(self.boxes, dtype=np.float64)
+        hits[near] = (
+            (left[near, None] < tiles[None, :, 2]) &
+            (tiles[None, :, 0] < right[near, None]) &
+            (bottom[near, None] < tiles[None, :, 3]) &
+            (tiles[None, :, 1] < top[near, None])
+        ).any(axis=1)
+        return hits
+
+
+class GridPhysicsEngine():
+    """
+    Moves the player and stops them at the solid cells of a level.
+    Used the same way as `arcade.PhysicsEnginePlatformer`, except the
+    level is given with `set_level()` instead of as SpriteLists.
+    """
+
+    player_sprite: arcade.Sprite = None
+    gravity_constant: float = 0.5
+
+    solid_grid: SolidGrid = None
+    ladder_grid: BoxGrid = None
+
+    # The hit box and scale the offsets were found from, and how far
+    # the edges of its rectangle are from the player's center, as a box.
+    hit_box: arcade.PointList = None
+    hit_box_scale: float = 0.0
+    box_offsets: Box = (0.0, 0.0, 0.0, 0.0)
+
+    def __init__(self, player_sprite: arcade.Sprite,
+                 gravity_constant: float = 0.5) -> None:
+        self.player_sprite = player_sprite
+        self.gravity_constant = gravity_constant
+
+    def set_level(self, solid_grid: SolidGrid, ladder_grid: BoxGrid):
+        """Give the engine the grids of the level to collide with."""
+        self.solid_grid = solid_grid
+        self.ladder_grid = ladder_grid
+
+    def get_player_box(self, x: float, y: float) -> Box:
+        """Get the rectangle of the player's hit box if they were at x, y."""
+        player = self.player_sprite
+        # The offsets are only worked out again
+        # when the hit box or the scale changes.
+        scale = player.scale
+        if player.hit_box is not self.hit_box or scale != self.hit_box_scale:
+            self.hit_box = player.hit_box
+            self.hit_box_scale = scale
+            x_values = [point[0] * scale for point in self.hit_box]
+            y_values = [point[1] * scale for point in self.hit_box]
+            self.box_offsets = (min(x_values), min(y_values),
+                                max(x_values), max(y_values))
+        left, bottom, right, top = self.box_offsets
+        return x + left, y + bottom, x + right, y + top
+
+    def collides(self, x: float, y: float) -> bool:
+        """Check if the player would be in a solid cell at x, y."""
+        return self.solid_grid.overlaps(self.get_player_box(x, y))
+
+    def is_on_ladder(self) -> bool:
+        """Check if the player is touching a ladder."""
+        return self.ladder_grid.overlaps(self.get_player_box(
+            self.player_sprite.center_x, self.player_sprite.center_y))
+
+    def can_jump(self, y_distance: float = 5) -> bool:
+        """Check if there is a floor within y_distance under the player."""
+        return self.collides(self.player_sprite.center_x,
+                             self.player_sprite.center_y - y_distance)
+
+    def update(self):
+        """Add gravity unless the player is on a ladder, then move them."""
+        if not self.is_on_ladder():
+            self.player_sprite.change_y -= self.gravity_constant
+        self.move_player()
+
+    def move_out(self, x: float, y: float) -> Tuple[float, float]:
+        """
+        Find somewhere near x, y the player isn't in a solid cell,
+        trying further away each time, the same way as arcade.
+        """
+        vary = 1
+        while True:
+            for try_x, try_y in ((x, y + vary), (x, y - vary),
+                                 (x + vary, y), (x - vary, y),
+                                 (x + vary, y + vary), (x + vary, y - vary),
+                                 (x - vary, y + vary), (x - vary, y - vary)):
+                if not self.collides(try_x, try_y):
+                    return try_x, try_y
+            vary *= 2
+
+    def move_player(self):
+        """
+        Move the player by their change, up and down first and
+        then across, stepping up small ledges on the way.
+        Each step is the same as arcade's, so the player ends
+        up in exactly the same place.
+        """
+        player = self.player_sprite
+        x = player.center_x
+        y = player.center_y
+
+        # Start from somewhere clear if the player is in a solid cell.
+        if self.collides(x, y):
+            x, y = self.move_out(x, y)
+        original_x = x
+        original_y = y
+
+        # MOVE UP AND DOWN
+        change_y = player.change_y
+        y += change_y
+        if self.collides(x, y):
+            if change_y > 0:
+                # Drop back down out of the ceiling a pixel at a time.
+                while self.collides(x, y):
+                    y -= 1
+            elif change_y < 0:
+                # Rise out of the floor a quarter pixel at a time,
+                # until the bottom is above every tile it landed in.
+                (first_column, last_column,
+                 first_row, last_row) = self.solid_grid.get_cell_range(
+                     self.get_player_box(x, y))
+                solid_rows = np.nonzero(self.solid_grid.cells[
+                    first_row:last_row + 1,
+                    first_column:last_column + 1].any(axis=1))[0]
+                floor_top = ((first_row + int(solid_rows[-1]) + 1)
+                             * self.solid_grid.cell_height)
+                while self.get_player_box(x, y)[1] < floor_top:
+                    y += 0.25
+            player.change_y = 0.0
+        y = round(y, 2)
+
+        # MOVE ACROSS
+        if player.change_x:
+            # Keep track of our current y, used in ramping up
+            almost_original_y = y
+
+            # Strip off the sign so both directions work the same.
+            direction = math.copysign(1, player.change_x)
+            cur_x_change = abs(player.change_x)
+            upper_bound = cur_x_change
+            lower_bound = 0
+            cur_y_change = 0
+
+            # Search for the furthest the player can move, stepping
+            # up onto anything the move would have hit if they can.
+            exit_loop = False
+            while not exit_loop:
+                x = original_x + cur_x_change * direction
+                hit = self.collides(x, y)
+                if hit:
+                    # Can we ramp up and not collide?
+                    cur_y_change = cur_x_change
+                    y = original_y + cur_y_change
+                    hit = self.collides(x, y)
+                    if hit:
+                        cur_y_change -= cur_x_change
+                    else:
+                        while not hit and cur_y_change > 0:
+                            cur_y_change -= 1
+                            y = almost_original_y + cur_y_change
+                            hit = self.collides(x, y)
+                        cur_y_change += 1
+                        hit = False
+
+                    if hit:
+                        upper_bound = cur_x_change - 1
+                        if upper_bound - lower_bound <= 0:
+                            cur_x_change = lower_bound
+                            exit_loop = True
+                        else:
+                            cur_x_change = (upper_bound + lower_bound) // 2
+                    else:
+                        exit_loop = True
+                else:
+                    # No collision, keep this position.
+                    lower_bound = cur_x_change
+                    if upper_bound - lower_bound <= 0:
+                        exit_loop = True
+                    else:
+                        cur_x_change = ((upper_bound + lower_bound) // 2
+                                        + (upper_bound + lower_bound) % 2)
+
+            x = original_x + cur_x_change * direction
+            y = almost_original_y + cur_y_change
+
+        player.center_x = x
+        player.center_y = y
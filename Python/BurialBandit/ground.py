@@ -0,0 +1,100 @@
+"""
+Stores what kind of ground is where in a level,
+so the footstep sounds can be picked without
+keeping the invisible sound tiles around.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+from math import floor
+import arcade
+
+# Custom property keys
+PROPERTY_GROUND_TYPE = "ground_type"
+
+# The bits Tiled uses to store flipped tiles in a tile id.
+TILE_FLIP_FLAGS = 0xE0000000
+
+
+def get_ground_types_by_id(tile_properties: Dict[int, Dict[str, Any]]
+                           ) -> Dict[int, str]:
+    """
+    Gets the ground type of every tile that has one, by its tile id.
+    """
+    return {
+        tile_id: properties[PROPERTY_GROUND_TYPE]
+        for tile_id, properties in tile_properties.items()
+        if PROPERTY_GROUND_TYPE in properties
+    }
+
+
+class GroundTypeGrid():
+    """
+    A grid with a small number for each tile in a layer, being
+    the index of that tile's ground type, or 0 for no ground type.
+    Row 0 is the bottom of the map.
+    """
+
+    # Index 0 means there is no ground type there.
+    ground_types: List[Optional[str]] = None
+    cells: bytearray = None
+
+    # The size of the grid in tiles.
+    width: int = 0
+    height: int = 0
+    # The size of a tile in game pixels.
+    cell_width: float = 0
+    cell_height: float = 0
+
+    def __init__(self, tile_ids: Sequence[Sequence[int]],
+                 tile_properties: Dict[int, Dict[str, Any]],
+                 cell_width: float, cell_height: float) -> None:
+        """
+        tile_ids: The layer's tile ids, as rows from the top down.
+        tile_properties: The custom properties of the tiles by their id.
+        """
+        self.height = len(tile_ids)
+        self.width = len(tile_ids[0]) if self.height else 0
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+
+        self.ground_types = [None]
+        self.cells = bytearray(self.width * self.height)
+
+        ground_types_by_id = get_ground_types_by_id(tile_properties)
+
+        # The rows are stored from the top down.
+        for row_index, row in enumerate(tile_ids):
+            grid_row = self.height - row_index - 1
+            for column_index, tile_id in enumerate(row):
+                ground_type = ground_types_by_id.get(
+                    int(tile_id) & ~TILE_FLIP_FLAGS)
+                if ground_type is None:
+                    continue
+
+                if ground_type not in self.ground_types:
+                    self.ground_types.append(ground_type)
+                self.cells[grid_row * self.width + column_index] = (
+                    self.ground_types.index(ground_type))
+
+    def get(self, x: float, y: float) -> Optional[str]:
+        """Gets the ground type at a position in the level."""
+        column = floor(x / self.cell_width)
+        row = floor(y / self.cell_height)
+        if 0 <= column < self.width and 0 <= row < self.height:
+            return self.ground_types[self.cells[row * self.width + column]]
+        return None
+
+    def get_under(self, sprite: arcade.Sprite) -> Optional[str]:
+        """
+        Gets the ground type where the bottom of the sprite is,
+        checking each tile along its width.
+        """
+        # Just above the bottom, so standing on
+        # the ground counts as being in the tile above it.
+        feet_y = sprite.bottom + 1
+        x = sprite.left
+        while True:
+            ground_type = self.get(x, feet_y)
+            if ground_type is not None or x >= sprite.right:
+                return ground_type
+            x = min(x + self.cell_width, sprite.right)
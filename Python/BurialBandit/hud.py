@@ -0,0 +1,95 @@
+"""
+The Heads Up Display for Burial Bandit.
+
+All the HUD text is kept in one pyglet batch, so it is drawn together
+and is only laid out again when the value it shows changes.
+"""
+
+from typing import Any, Callable, List
+import arcade
+import pyglet
+
+# The fonts the HUD uses, the same as arcade.draw_text.
+HUD_FONT_NAME = ("calibri", "arial")
+
+
+class HudText():
+    """
+    A piece of HUD text that shows a watched value.
+    The text is only changed when the value changes.
+    """
+
+    # The pyglet label the text is drawn with.
+    label: pyglet.text.Label = None
+    # Gets the value to show.
+    watch: Callable[[], Any] = None
+    # Turns the value into the text to show.
+    text_format: Callable[[Any], str] = None
+    # The value the text is showing now.
+    value: Any = None
+
+    def __init__(self, label: pyglet.text.Label,
+                 watch: Callable[[], Any],
+                 text_format: Callable[[Any], str]) -> None:
+        self.label = label
+        self.watch = watch
+        self.text_format = text_format
+
+    def update(self):
+        """Change the text if the watched value has changed."""
+        value = self.watch()
+        if value != self.value:
+            self.value = value
+            self.label.text = self.text_format(value)
+
+
+class Hud():
+    """
+    Holds all the HUD text, and draws it in one go.
+    Call `update()` before `draw()` every frame.
+    """
+
+    batch: pyglet.graphics.Batch = None
+    texts: List[HudText] = None
+
+    def __init__(self) -> None:
+        self.batch = pyglet.graphics.Batch()
+        self.texts = []
+
+    def add_text(self, watch: Callable[[], Any],
+                 text_format: Callable[[Any], str],
+                 x: float, y: float,
+                 color: arcade.Color = arcade.color.WHITE,
+                 font_size: float = 12,
+                 anchor_x: str = "left",
+                 anchor_y: str = "baseline") -> HudText:
+        """
+        Add text to the HUD that shows a value.
+
+        watch: Gets the value to show, it is checked every frame.
+        text_format: Turns the value into the text to show.
+        """
+        label = pyglet.text.Label(
+            font_name=HUD_FONT_NAME,
+            font_size=font_size,
+            color=arcade.get_four_byte_color(color),
+            x=x, y=y,
+            anchor_x=anchor_x,
+            anchor_y=anchor_y,
+            batch=self.batch
+        )
+        hud_text = HudText(label, watch, text_format)
+        hud_text.update()
+        self.texts.append(hud_text)
+        return hud_text
+
+    def update(self):
+        """Update any text that has had its value change."""
+        for hud_text in self.texts:
+            hud_text.update()
+
+    def draw(self):
+        """Draw all the HUD text with one batch."""
+        # Raw pyglet drawing needs this context helper inside arcade.
+        with arcade.get_window().ctx.pyglet_rendering():
+            self.batch.draw()
@@ -0,0 +1,318 @@
+"""
+Keeps loaded levels in memory so they don't
+have to be parsed again every time they are restarted.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from concurrent.futures import Future, ThreadPoolExecutor
+import copy
+from pathlib import Path
+import arcade
+import pytiled_parser
+
+from level_compiler import (
+    CompiledLevelData,
+    CompiledTileMap,
+    get_compiled_path,
+    load_compiled_level,
+)
+from tile_streaming import Area, StreamedTileLayer, STREAM_CHUNKS_PER_UPDATE
+
+# Layers that the player can change while playing.
+# These get a fresh SpriteList every time the level
+# is restarted, all other layers are shared.
+MUTABLE_LAYERS = [
+    "Pickups",
+]
+
+# Load levels from their compiled packages when they are up to date.
+USE_COMPILED_LEVELS = True
+
+# Compiled levels at least this many tiles wide have their tile layers
+# streamed, only making sprites for the tiles near the player.
+STREAM_MIN_COLUMNS = 512
+
+
+class CachedLevel():
+    """
+    A parsed tile map along with a pristine copy of its scene,
+    which new scenes are cloned from when the level is restarted.
+    """
+
+    tile_map: Union[arcade.TileMap, CompiledTileMap] = None
+    # The tile ids of the layers from the map file that were
+    # left out of the tile map, so no sprites were made.
+    # Each is a list of rows, from the top of the map down.
+    skipped_layers: Dict[str, Sequence[Sequence[int]]] = None
+    # The custom properties of the tiles, by their tile id.
+    tile_properties: Dict[int, Dict[str, Any]] = None
+    # The static layers that only have sprites for the tiles near
+    # the areas given to `update_streaming()`, by their name.
+    streamed_layers: Dict[str, StreamedTileLayer] = None
+
+    # The order and names of the layers in the original scene.
+    layer_names: List[str] = None
+    # The SpriteLists shared between every clone of the scene.
+    static_layers: Dict[str, arcade.SpriteList] = None
+    # The original sprites of the layers that change while playing.
+    mutable_layers: Dict[str, Tuple[arcade.Sprite, ...]] = None
+    # Whether the mutable layers use spatial hashing.
+    mutable_spatial_hash: Dict[str, bool] = None
+
+    def __init__(self, tile_map: Union[arcade.TileMap, CompiledTileMap],
+                 skipped_layers: Dict[str, Sequence[Sequence[int]]] = None,
+                 tile_properties: Dict[int, Dict[str, Any]] = None,
+                 streamed_layers: Dict[str, StreamedTileLayer] = None
+                 ) -> None:
+        self.tile_map = tile_map
+        self.skipped_layers = skipped_layers or {}
+        self.tile_properties = tile_properties or {}
+        self.streamed_layers = streamed_layers or {}
+
+        self.layer_names = []
+        self.static_layers = {}
+        self.mutable_layers = {}
+        self.mutable_spatial_hash = {}
+
+        for name, sprite_list in tile_map.sprite_lists.items():
+            self.layer_names.append(name)
+            if name in MUTABLE_LAYERS:
+                # Keep the original sprites, and take them out of the
+                # tile map's list so it doesn't get updated when they
+                # are animated or removed in one of the clones.
+                self.mutable_layers[name] = tuple(sprite_list)
+                self.mutable_spatial_hash[name] = sprite_list.use_spatial_hash
+                sprite_list.clear()
+            else:
+                self.static_layers[name] = sprite_list
+
+    def new_scene(self) -> arcade.Scene:
+        """
+        Make a new scene for the level in its starting state.
+        The static layers are shared, so only the
+        layers that can change are rebuilt.
+        """
+        scene = arcade.Scene()
+        for name in self.layer_names:
+            if name in self.static_layers:
+                sprite_list = self.static_layers[name]
+            else:
+                sprite_list = arcade.SpriteList(
+                    use_spatial_hash=self.mutable_spatial_hash[name])
+                sprite_list.extend(self.mutable_layers[name])
+            # Added straight into the name mapping, because the scene
+            # replaces empty SpriteLists with new ones.
+            scene.name_mapping[name] = sprite_list
+            scene.sprite_lists.append(sprite_list)
+        return scene
+
+    def update_streaming(
+            self, needed_areas: Sequence[Area], wanted_areas: Sequence[Area],
+            max_chunks: Optional[int] = STREAM_CHUNKS_PER_UPDATE):
+        """
+        Make sure the streamed layers have the sprites of every tile
+        in the needed areas, and load a few more of the chunks in the
+        wanted areas, letting go of the chunks far outside of them.
+
+        max_chunks: The most chunks to load ahead of time
+        in the wanted areas, or None to load them all.
+        """
+        for streamed_layer in self.streamed_layers.values():
+            streamed_layer.unload_outside(wanted_areas)
+            for area in needed_areas:
+                streamed_layer.load(area)
+
+        for area in wanted_areas:
+            for streamed_layer in self.streamed_layers.values():
+                if max_chunks is not None and max_chunks <= 0:
+                    return
+                loaded = streamed_layer.load(area, max_chunks)
+                if max_chunks is not None:
+                    max_chunks -= loaded
+
+    def release_scene(self, scene: arcade.Scene):
+        """
+        Let go of the sprites in a scene made by `new_scene()`
+        that isn't going to be used anymore. Sprites remember
+        every list they are in, so this stops old scenes
+        from building up on the shared sprites.
+        """
+        for name in self.mutable_layers:
+            scene[name].clear()
+
+
+def parse_map(map_path: str) -> pytiled_parser.TiledMap:
+    """
+    Read a tiled map file along with its tilesets, and decode
+    all the images the tilesets use into arcade's texture cache.
+
+    Nothing here uses OpenGL, so it is safe to run on another thread.
+    """
+    tiled_map = pytiled_parser.parse_map(Path(map_path))
+
+    for tileset in tiled_map.tilesets.values():
+        # Tilesets made from one big image.
+        if tileset.image is not None:
+            arcade.load_texture(tileset.image)
+        # Tilesets made from a collection of images.
+        if tileset.tiles is not None:
+            for tile in tileset.tiles.values():
+                if tile.image is not None:
+                    arcade.load_texture(tile.image)
+
+    return tiled_map
+
+
+def get_tile_properties(tiled_map: pytiled_parser.TiledMap
+                        ) -> Dict[int, Dict[str, Any]]:
+    """Get the custom properties of the map's tiles, by their tile id."""
+    tile_properties = {}
+    for first_gid, tileset in tiled_map.tilesets.items():
+        if tileset.tiles is None:
+            continue
+        for tile in tileset.tiles.values():
+            if tile.properties:
+                tile_properties[first_gid + tile.id] = tile.properties
+    return tile_properties
+
+
+def read_level(map_path: str
+               ) -> Union[CompiledLevelData, pytiled_parser.TiledMap]:
+    """
+    Read a level, from its compiled package if it has an up to
+    date one, otherwise from the map file.
+
+    Nothing here uses OpenGL, so it is safe to run on another thread.
+    """
+    if USE_COMPILED_LEVELS:
+        level_data = load_compiled_level(get_compiled_path(map_path),
+                                         map_path)
+        if level_data is not None:
+            return level_data
+    return parse_map(map_path)
+
+
+class LevelCache():
+    """
+    Loads tiled maps the first time they are used
+    and hands out the same level every time after that.
+
+    Maps can also be read ahead of time on a background thread
+    with `preload()`, leaving only the sprites to be made
+    when the level is needed.
+    """
+
+    levels: Dict[Tuple[str, float], CachedLevel] = None
+
+    # Maps being read in the background, by their path.
+    preloads: Dict[str, "Future[Union[CompiledLevelData, "
+                        "pytiled_parser.TiledMap]]"] = None
+    preload_executor: ThreadPoolExecutor = None
+
+    def __init__(self) -> None:
+        self.levels = {}
+        self.preloads = {}
+        self.preload_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="LevelPreload")
+
+    def preload(self, map_path: str):
+        """
+        Start reading a map file on a background thread,
+        so it is ready by the time `get()` is called for it.
+        """
+        already_loaded = any(
+            loaded_path == map_path for loaded_path, _ in self.levels)
+        if not already_loaded and map_path not in self.preloads:
+            self.preloads[map_path] = self.preload_executor.submit(
+                read_level, map_path)
+
+    def get(self, map_path: str, scale: float,
+            layer_options: Dict[str, Dict[str, Any]] = None,
+            skip_layers: List[str] = (),
+            always_loaded: List[str] = ()) -> CachedLevel:
+        """
+        Get the level for the map file at the given scale,
+        loading it if it hasn't been loaded before.
+
+        The layers named in `skip_layers` don't get any sprites,
+        and their tile ids are kept in `skipped_layers`.
+        The layers named in `always_loaded` are never streamed,
+        for layers that need all their sprites from the start.
+        """
+        key = (map_path, scale)
+        if key not in self.levels:
+            # Use the preloaded map if there is one,
+            # waiting for it if it hasn't finished yet.
+            if map_path in self.preloads:
+                level_data = self.preloads.pop(map_path).result()
+            else:
+                level_data = read_level(map_path)
+
+            # Making the sprites and SpriteLists needs OpenGL,
+            # so this part has to happen on the main thread.
+            if isinstance(level_data, CompiledLevelData):
+                self.levels[key] = self.make_level_from_package(
+                    level_data, scale, layer_options, skip_layers,
+                    always_loaded)
+            else:
+                self.levels[key] = self.make_level_from_map(
+                    level_data, scale, layer_options, skip_layers)
+        return self.levels[key]
+
+    def make_level_from_package(self, level_data: CompiledLevelData,
+                                scale: float,
+                                layer_options: Dict[str, Dict[str, Any]],
+                                skip_layers: List[str],
+                                always_loaded: List[str]) -> CachedLevel:
+        """
+        Make a level from a compiled package,
+        streaming its tile layers if it is wide enough.
+        """
+        stream_layers = []
+        if level_data.header["width"] >= STREAM_MIN_COLUMNS:
+            stream_layers = [
+                layer["name"] for layer in level_data.header["layers"]
+                if layer["kind"] == "tiles"
+                and layer["name"] not in MUTABLE_LAYERS
+                and layer["name"] not in always_loaded
+            ]
+
+        tile_map = CompiledTileMap(level_data, scale, layer_options,
+                                   skip_layers, stream_layers)
+        return CachedLevel(
+            tile_map,
+            {name: level_data.get_tile_ids(name)
+             for name in skip_layers
+             if level_data.has_tile_layer(name)},
+            level_data.get_tile_properties(),
+            tile_map.streamed_layers
+        )
+
+    def make_level_from_map(self, tiled_map: pytiled_parser.TiledMap,
+                            scale: float,
+                            layer_options: Dict[str, Dict[str, Any]],
+                            skip_layers: List[str]) -> CachedLevel:
+        """Make a level from a parsed map file."""
+        # Take the skipped layers out of a copy of the map.
+        skipped_layers = {
+            layer.name: layer.data for layer in tiled_map.layers
+            if layer.name in skip_layers
+        }
+        tiled_map = copy.copy(tiled_map)
+        tiled_map.layers = [
+            layer for layer in tiled_map.layers
+            if layer.name not in skipped_layers
+        ]
+
+        return CachedLevel(
+            arcade.TileMap(scaling=scale,
+                           layer_options=layer_options,
+                           tiled_map=tiled_map),
+            skipped_layers,
+            get_tile_properties(tiled_map)
+        )
+
+    def clear(self):
+        """Forget all the loaded levels."""
+        self.levels.clear()
+        self.preloads.clear()
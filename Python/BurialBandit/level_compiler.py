@@ -0,0 +1,772 @@
+"""
+Compiles the Tiled maps into a binary level package that loads
+much faster than reading the map's XML and tilesets every time.
+
+A package is a small JSON header followed by raw numpy arrays,
+each starting on a 64 byte boundary so the file can be memory mapped:
+
+- The tile ids of every tile layer, as indexes into a texture table.
+- The texture table, holding where each tile's image comes from.
+- The tile objects, like the pickups, and the shape objects
+  like the checkpoints.
+- The hit boxes of every sprite, worked out ahead of time.
+
+Run it from the BurialBandit folder with
+`python level_compiler.py [map files]`, which compiles every
+level when no maps are given. The packages are saved next
+to the maps, and are used by the game when they are up to date.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import copy
+import hashlib
+import json
+import math
+import os
+import re
+import struct
+import sys
+import warnings
+from pathlib import Path
+import arcade
+import numpy as np
+import pytiled_parser
+from arcade.tilemap.tilemap import (
+    _get_image_info_from_tileset,
+    _get_image_source,
+)
+
+from tile_streaming import StreamedTileLayer
+
+# The file extension of compiled levels.
+COMPILED_LEVEL_EXTENSION = ".bbl"
+
+# The start of every package file, to check it is one.
+PACKAGE_MAGIC = b"BBLV"
+PACKAGE_VERSION = 1
+
+# Magic, version, unused, length of the JSON header in bytes.
+HEADER_FORMAT = struct.Struct("<4sHHI")
+
+# Every array starts on a multiple of this many bytes.
+ARRAY_ALIGNMENT = 64
+
+# The hit box algorithm the game's maps are loaded with.
+HIT_BOX_ALGORITHM = "Simple"
+
+# The columns of the tile object arrays.
+OBJECT_TEXTURE = 0
+OBJECT_HIT_BOX = 1
+OBJECT_X = 2
+OBJECT_Y = 3
+OBJECT_WIDTH = 4
+OBJECT_HEIGHT = 5
+OBJECT_ROTATION = 6
+OBJECT_COLUMNS = 7
+
+# Properties of tile objects that arcade uses to set up moving platforms.
+SPRITE_FLOAT_PROPERTIES = [
+    "change_x",
+    "change_y",
+    "boundary_bottom",
+    "boundary_top",
+    "boundary_left",
+    "boundary_right",
+]
+
+# Finds the external tilesets a map uses.
+TILESET_SOURCE_PATTERN = re.compile(rb'<tileset[^>]*\ssource="([^"]+)"')
+
+
+def get_compiled_path(map_path: str) -> str:
+    """Get the path of the compiled package for a map file."""
+    return str(Path(map_path).with_suffix(COMPILED_LEVEL_EXTENSION))
+
+
+def get_source_hash(map_path: str) -> str:
+    """
+    Get a hash of a map file and the tileset files it uses,
+    which changes whenever one of them is edited.
+    """
+    source_hash = hashlib.sha256()
+    map_data = Path(map_path).read_bytes()
+    source_hash.update(map_data)
+    for tileset_source in TILESET_SOURCE_PATTERN.findall(map_data):
+        tileset_path = Path(map_path).parent / tileset_source.decode()
+        source_hash.update(tileset_path.read_bytes())
+    return source_hash.hexdigest()
+
+
+def to_json_value(value: Any) -> Any:
+    """Turn a Tiled property value into something JSON can store."""
+    if isinstance(value, Path):
+        return str(value)
+    if isinstance(value, tuple):
+        return list(value)
+    return value
+
+
+def to_json_properties(properties: Optional[Dict[str, Any]]
+                       ) -> Dict[str, Any]:
+    """Turn Tiled properties into something JSON can store."""
+    if not properties:
+        return {}
+    return {key: to_json_value(value) for key, value in properties.items()}
+
+
+# COMPILING
+class LevelCompiler():
+    """
+    Turns one parsed map into the header and arrays of a package.
+
+    The map is also loaded by arcade, and each sprite's hit box is
+    taken from it, so the compiled level collides exactly the same.
+    """
+
+    tiled_map: pytiled_parser.TiledMap = None
+    # Arcade's own version of the map, at a scale of 1.
+    reference_map: arcade.TileMap = None
+    # The folder the package is saved in, image paths are relative to it.
+    package_directory: str = None
+
+    # The textures, and their index by what they were made from.
+    textures: List[Dict[str, Any]] = None
+    texture_indexes: Dict[Tuple, int] = None
+    # The hit boxes, and their index by their points.
+    hit_boxes: List[Tuple[Tuple[float, float], ...]] = None
+    hit_box_indexes: Dict[Tuple[Tuple[float, float], ...], int] = None
+
+    layers: List[Dict[str, Any]] = None
+    arrays: Dict[str, np.ndarray] = None
+
+    def __init__(self, map_path: str, package_path: str) -> None:
+        self.tiled_map = pytiled_parser.parse_map(Path(map_path))
+        self.reference_map = arcade.TileMap(
+            tiled_map=self.tiled_map,
+            hit_box_algorithm=HIT_BOX_ALGORITHM
+        )
+        self.package_directory = os.path.dirname(
+            os.path.abspath(package_path))
+
+        self.textures = []
+        self.texture_indexes = {}
+        self.hit_boxes = []
+        self.hit_box_indexes = {}
+        self.layers = []
+        self.arrays = {}
+
+    def compile(self, source_hash: str) -> Tuple[Dict[str, Any],
+                                                 Dict[str, np.ndarray]]:
+        """Compile the map, returning the package header and arrays."""
+        self.add_layers(self.tiled_map.layers)
+
+        # The hit boxes are stored as one list of points,
+        # with the start and number of points for each.
+        points = [point for hit_box in self.hit_boxes for point in hit_box]
+        ranges = []
+        start = 0
+        for hit_box in self.hit_boxes:
+            ranges.append((start, len(hit_box)))
+            start += len(hit_box)
+        self.arrays["hit_box_points"] = np.array(
+            points, dtype=np.float64).reshape(-1, 2)
+        self.arrays["hit_box_ranges"] = np.array(
+            ranges, dtype=np.uint32).reshape(-1, 2)
+
+        tiled_map = self.tiled_map
+        header = {
+            "source_hash": source_hash,
+            "width": tiled_map.map_size.width,
+            "height": tiled_map.map_size.height,
+            "tile_width": tiled_map.tile_size.width,
+            "tile_height": tiled_map.tile_size.height,
+            "background_color": to_json_value(tiled_map.background_color),
+            "properties": to_json_properties(tiled_map.properties),
+            "textures": self.textures,
+            "layers": self.layers,
+        }
+        return header, self.arrays
+
+    def add_hit_box(self, points: Sequence[Sequence[float]]) -> int:
+        """Add a hit box, returning its index."""
+        key = tuple((float(x), float(y)) for x, y in points)
+        if key not in self.hit_box_indexes:
+            self.hit_box_indexes[key] = len(self.hit_boxes)
+            self.hit_boxes.append(key)
+        return self.hit_box_indexes[key]
+
+    def add_texture(self, tile: pytiled_parser.Tile,
+                    reference_sprite: arcade.Sprite = None,
+                    plain: bool = False) -> int:
+        """
+        Add the texture for a tile, returning its index.
+
+        plain: Leave out the animation, flips and hit box,
+        like arcade does for the frames of an animation.
+        """
+        tileset = tile.tileset
+        flips = (False, False, False) if plain else (
+            tile.flipped_horizontally,
+            tile.flipped_vertically,
+            tile.flipped_diagonally
+        )
+        key = (id(tileset), tile.id) + flips + (plain,)
+        if key in self.texture_indexes:
+            return self.texture_indexes[key]
+
+        image_file = _get_image_source(
+            tile, os.path.dirname(self.tiled_map.map_file))
+        if tile.image and (plain or tile.animation):
+            # Arcade loads all of the image for animations.
+            image_x, image_y, width, height = 0, 0, 0, 0
+        else:
+            image_x, image_y, width, height = (
+                _get_image_info_from_tileset(tile))
+
+        texture = {
+            "file": os.path.relpath(image_file, self.package_directory),
+            "x": image_x,
+            "y": image_y,
+            "width": width,
+            "height": height,
+            "flipped_horizontally": flips[0],
+            "flipped_vertically": flips[1],
+            "flipped_diagonally": flips[2],
+            "hit_box": None,
+            "properties": {},
+            "frames": None,
+        }
+        index = len(self.textures)
+        self.texture_indexes[key] = index
+        self.textures.append(texture)
+
+        if not plain:
+            properties = to_json_properties(tile.properties)
+            if tile.type:
+                properties["type"] = tile.type
+            texture["properties"] = properties
+            texture["hit_box"] = self.add_hit_box(
+                reference_sprite.texture.hit_box_points)
+
+            if tile.animation:
+                texture["frames"] = [
+                    [frame.tile_id, frame.duration,
+                     self.add_texture(self.get_frame_tile(tile, frame),
+                                      plain=True)]
+                    for frame in tile.animation
+                ]
+        return index
+
+    def get_frame_tile(self, tile: pytiled_parser.Tile,
+                       frame: pytiled_parser.tileset.Frame
+                       ) -> pytiled_parser.Tile:
+        """Get the tile for a frame of an animation."""
+        frame_tile = copy.copy(tile.tileset.tiles[frame.tile_id])
+        frame_tile.tileset = tile.tileset
+        return frame_tile
+
+    def add_layers(self, layers: List[pytiled_parser.Layer]):
+        """Add the layers to the package, the same way arcade reads them."""
+        for layer in layers:
+            if isinstance(layer, pytiled_parser.TileLayer):
+                self.add_tile_layer(layer)
+            elif isinstance(layer, pytiled_parser.ObjectLayer):
+                self.add_object_layer(layer)
+            elif isinstance(layer, pytiled_parser.LayerGroup):
+                self.add_layers(layer.layers)
+            else:
+                raise ValueError(f"Layer '{layer.name}' is a "
+                                 f"{type(layer).__name__}, which can't "
+                                 f"be compiled.")
+
+    def get_layer_info(self, layer: pytiled_parser.Layer
+                       ) -> Dict[str, Any]:
+        """Get the values every kind of layer has."""
+        return {
+            "name": layer.name,
+            "visible": layer.visible,
+            "opacity": layer.opacity,
+            "tint_color": to_json_value(layer.tint_color),
+            "properties": to_json_properties(layer.properties),
+        }
+
+    def add_tile_layer(self, layer: pytiled_parser.TileLayer):
+        """Add a grid of tiles, storing their texture indexes."""
+        reference_sprites = iter(self.reference_map.sprite_lists[layer.name])
+
+        # 0 is an empty tile, so the textures are stored one higher.
+        tile_ids = np.zeros((len(layer.data), len(layer.data[0])),
+                            dtype=np.uint32)
+        for row_index, row in enumerate(layer.data):
+            for column_index, gid in enumerate(row):
+                if gid == 0:
+                    continue
+                tile = self.reference_map._get_tile_by_gid(gid)
+                tile_ids[row_index, column_index] = 1 + self.add_texture(
+                    tile, next(reference_sprites))
+
+        # Use the smallest size that fits.
+        if tile_ids.max(initial=0) <= np.iinfo(np.uint16).max:
+            tile_ids = tile_ids.astype(np.uint16)
+
+        array_name = f"tiles/{layer.name}"
+        self.arrays[array_name] = tile_ids
+        self.layers.append({
+            **self.get_layer_info(layer),
+            "kind": "tiles",
+            "tiles": array_name,
+        })
+
+    def add_object_layer(self, layer: pytiled_parser.ObjectLayer):
+        """Add the tile objects and shapes of an object layer."""
+        reference_sprites = iter(
+            self.reference_map.sprite_lists.get(layer.name, ()))
+        reference_objects = iter(
+            self.reference_map.object_lists.get(layer.name, ()))
+        map_height_px = (self.tiled_map.map_size.height *
+                         self.tiled_map.tile_size.height)
+
+        sprites = []
+        sprite_properties = []
+        shapes = []
+        for tiled_object in layer.tiled_objects:
+            if isinstance(tiled_object, pytiled_parser.tiled_object.Tile):
+                reference_sprite = next(reference_sprites)
+                tile = self.reference_map._get_tile_by_gid(tiled_object.gid)
+                texture_index = self.add_texture(tile, reference_sprite)
+                sprites.append((
+                    texture_index,
+                    # The hit box before the object's size is set,
+                    # as setting the size scales it.
+                    self.add_hit_box(reference_sprite.texture.hit_box_points),
+                    tiled_object.coordinates.x,
+                    map_height_px - tiled_object.coordinates.y,
+                    tiled_object.size.width,
+                    tiled_object.size.height,
+                    tiled_object.rotation or 0,
+                ))
+                properties = to_json_properties(tiled_object.properties)
+                if tiled_object.type:
+                    properties["type"] = tiled_object.type
+                if tiled_object.name:
+                    properties["name"] = tiled_object.name
+                sprite_properties.append(properties)
+            elif isinstance(tiled_object, (
+                    pytiled_parser.tiled_object.Point,
+                    pytiled_parser.tiled_object.Rectangle,
+                    pytiled_parser.tiled_object.Polygon,
+                    pytiled_parser.tiled_object.Polyline,
+                    pytiled_parser.tiled_object.Ellipse)):
+                reference_object = next(reference_objects)
+                shapes.append({
+                    "shape": to_json_value(reference_object.shape),
+                    # Arcade only scales the points.
+                    "scaled": isinstance(
+                        tiled_object, pytiled_parser.tiled_object.Point),
+                    "properties": to_json_properties(
+                        reference_object.properties),
+                    "name": reference_object.name,
+                    "type": reference_object.type,
+                })
+
+        array_name = None
+        if sprites:
+            array_name = f"objects/{layer.name}"
+            self.arrays[array_name] = np.array(sprites, dtype=np.float64)
+        self.layers.append({
+            **self.get_layer_info(layer),
+            "kind": "objects",
+            "objects": array_name,
+            "object_properties": sprite_properties,
+            "shapes": shapes,
+        })
+
+
+def write_package(package_path: str, header: Dict[str, Any],
+                  arrays: Dict[str, np.ndarray]):
+    """
+    Write a package file, with each array's place in the
+    file saved in the header so it can be found again.
+    """
+    # The header has to know where the arrays go before it is
+    # written, so work out its size with placeholder offsets first.
+    array_info = {
+        name: {"dtype": array.dtype.str, "shape": list(array.shape),
+               "offset": 0}
+        for name, array in arrays.items()
+    }
+    header = {**header, "arrays": array_info}
+
+    def align(position: int) -> int:
+        return -(-position // ARRAY_ALIGNMENT) * ARRAY_ALIGNMENT
+
+    # The offsets change the length of the header, so
+    # keep placing the arrays until the header stops growing.
+    header_length = -1
+    header_bytes = b""
+    while len(header_bytes) != header_length:
+        header_length = len(header_bytes)
+        position = align(HEADER_FORMAT.size + header_length)
+        for name, array in arrays.items():
+            array_info[name]["offset"] = position
+            position = align(position + array.nbytes)
+        header_bytes = json.dumps(header).encode()
+
+    with open(package_path, "wb") as package_file:
+        package_file.write(HEADER_FORMAT.pack(
+            PACKAGE_MAGIC, PACKAGE_VERSION, 0, len(header_bytes)))
+        package_file.write(header_bytes)
+        for name, array in arrays.items():
+            package_file.seek(array_info[name]["offset"])
+            package_file.write(np.ascontiguousarray(array).tobytes())
+        # Pad the end, so empty arrays still start inside the file.
+        package_file.truncate(position)
+
+
+def compile_level(map_path: str, package_path: str = None) -> str:
+    """Compile a map file into a package, returning the package's path."""
+    if package_path is None:
+        package_path = get_compiled_path(map_path)
+    compiler = LevelCompiler(map_path, package_path)
+    header, arrays = compiler.compile(get_source_hash(map_path))
+    write_package(package_path, header, arrays)
+    return package_path
+# END COMPILING
+
+
+# LOADING
+def read_package(package_path: str) -> Tuple[Dict[str, Any],
+                                             Dict[str, np.ndarray]]:
+    """
+    Read a package file's header, and memory map its arrays
+    so only the parts that get used are read from the disk.
+    """
+    with open(package_path, "rb") as package_file:
+        magic, version, _, header_length = HEADER_FORMAT.unpack(
+            package_file.read(HEADER_FORMAT.size))
+        if magic != PACKAGE_MAGIC or version != PACKAGE_VERSION:
+            raise ValueError(f"{package_path} is not a version "
+                             f"{PACKAGE_VERSION} level package")
+        header = json.loads(package_file.read(header_length))
+
+    data = np.memmap(package_path, dtype=np.uint8, mode="r")
+    arrays = {}
+    for name, info in header["arrays"].items():
+        dtype = np.dtype(info["dtype"])
+        start = info["offset"]
+        end = start + math.prod(info["shape"]) * dtype.itemsize
+        arrays[name] = data[start:end].view(dtype).reshape(info["shape"])
+    return header, arrays
+
+
+def get_image_file(package_path: str, texture: Dict[str, Any]) -> str:
+    """Get the path of the image a texture in the table is cut from."""
+    return os.path.join(os.path.dirname(os.path.abspath(package_path)),
+                        texture["file"])
+
+
+def read_package_images(package_path: str) -> List[str]:
+    """
+    Get every image file a package's textures are cut from,
+    or nothing if there isn't a package.
+    """
+    if not os.path.exists(package_path):
+        return []
+    header, _ = read_package(package_path)
+    return sorted({get_image_file(package_path, texture)
+                   for texture in header["textures"]})
+
+
+class CompiledLevelData():
+    """
+    A package that has been read, with its textures loaded.
+    Nothing here uses OpenGL, so it can be read on another thread.
+    """
+
+    header: Dict[str, Any] = None
+    arrays: Dict[str, np.ndarray] = None
+    # The texture table's textures.
+    textures: List[arcade.Texture] = None
+    # The hit boxes, ready to give to sprites.
+    hit_boxes: List[List[Tuple[float, float]]] = None
+
+    def __init__(self, package_path: str) -> None:
+        self.header, self.arrays = read_package(package_path)
+
+        # The hit boxes come from the package,
+        # so they don't need working out again.
+        self.textures = [
+            arcade.load_texture(
+                get_image_file(package_path, texture),
+                texture["x"], texture["y"],
+                texture["width"], texture["height"],
+                flipped_horizontally=texture["flipped_horizontally"],
+                flipped_vertically=texture["flipped_vertically"],
+                flipped_diagonally=texture["flipped_diagonally"],
+                hit_box_algorithm="None"
+            )
+            for texture in self.header["textures"]
+        ]
+
+        points = self.arrays["hit_box_points"].tolist()
+        self.hit_boxes = [
+            [tuple(point) for point in points[start:start + count]]
+            for start, count in self.arrays["hit_box_ranges"].tolist()
+        ]
+
+    def has_tile_layer(self, layer_name: str) -> bool:
+        """Check if the level has a layer of tiles with the name."""
+        return f"tiles/{layer_name}" in self.arrays
+
+    def get_tile_ids(self, layer_name: str) -> np.ndarray:
+        """
+        Get the tile ids of a layer of tiles, from the top row down.
+        The ids are one higher than the index in the texture table,
+        with 0 being an empty tile.
+        """
+        return self.arrays[f"tiles/{layer_name}"]
+
+    def get_tile_properties(self) -> Dict[int, Dict[str, Any]]:
+        """Get the custom properties of the tiles, by their tile id."""
+        return {
+            index + 1: texture["properties"]
+            for index, texture in enumerate(self.header["textures"])
+            if texture["properties"]
+        }
+
+
+def load_compiled_level(package_path: str,
+                        map_path: str = None) -> Optional[CompiledLevelData]:
+    """
+    Read a package, returning None if there isn't one
+    or it is older than the map it was compiled from.
+    """
+    if not os.path.exists(package_path):
+        return None
+    level_data = CompiledLevelData(package_path)
+    if (map_path is not None and
+            level_data.header["source_hash"] != get_source_hash(map_path)):
+        warnings.warn(f"{package_path} is out of date, "
+                      f"run level_compiler.py to update it.")
+        return None
+    return level_data
+
+
+class CompiledTileMap():
+    """
+    A level made from a compiled package. It has the parts
+    of `arcade.TileMap` that the game uses.
+    """
+
+    width: int = 0
+    height: int = 0
+    tile_width: int = 0
+    tile_height: int = 0
+    background_color: arcade.Color = None
+    properties: Dict[str, Any] = None
+    scaling: float = 1.0
+
+    sprite_lists: Dict[str, arcade.SpriteList] = None
+    object_lists: Dict[str, List[arcade.TiledObject]] = None
+    # The tile layers that only have sprites near the player,
+    # their SpriteLists are in `sprite_lists` too.
+    streamed_layers: Dict[str, StreamedTileLayer] = None
+
+    def __init__(self, level_data: CompiledLevelData, scaling: float = 1.0,
+                 layer_options: Dict[str, Dict[str, Any]] = None,
+                 skip_layers: Sequence[str] = (),
+                 stream_layers: Sequence[str] = ()) -> None:
+        """
+        stream_layers: The tile layers to stream with
+        `StreamedTileLayer`, instead of making all their sprites.
+        """
+        header = level_data.header
+        self.width = header["width"]
+        self.height = header["height"]
+        self.tile_width = header["tile_width"]
+        self.tile_height = header["tile_height"]
+        if header["background_color"] is not None:
+            self.background_color = tuple(header["background_color"])
+        self.properties = header["properties"]
+        self.scaling = scaling
+
+        self.sprite_lists = {}
+        self.object_lists = {}
+        self.streamed_layers = {}
+
+        layer_options = layer_options or {}
+        for layer in header["layers"]:
+            if layer["name"] in skip_layers:
+                continue
+            use_spatial_hash = layer_options.get(
+                layer["name"], {}).get("use_spatial_hash")
+            if layer["kind"] == "tiles" and layer["name"] in stream_layers:
+                streamed_layer = self.make_streamed_layer(
+                    level_data, layer, use_spatial_hash)
+                self.streamed_layers[layer["name"]] = streamed_layer
+                self.sprite_lists[layer["name"]] = streamed_layer.sprite_list
+            elif layer["kind"] == "tiles":
+                self.sprite_lists[layer["name"]] = self.make_tile_layer(
+                    level_data, layer, use_spatial_hash)
+            else:
+                self.make_object_layer(level_data, layer, use_spatial_hash)
+
+    def make_sprite(self, level_data: CompiledLevelData,
+                    texture_index: int, **kwargs) -> arcade.Sprite:
+        """Make a sprite with a texture from the texture table."""
+        texture_info = level_data.header["textures"][texture_index]
+        if texture_info["frames"]:
+            sprite = arcade.AnimatedTimeBasedSprite(scale=self.scaling,
+                                                    **kwargs)
+            sprite.frames = [
+                arcade.AnimationKeyframe(tile_id, duration,
+                                         level_data.textures[frame_texture])
+                for tile_id, duration, frame_texture in texture_info["frames"]
+            ]
+            sprite.texture = sprite.frames[0].texture
+        else:
+            sprite = arcade.Sprite(
+                texture=level_data.textures[texture_index],
+                scale=self.scaling, **kwargs)
+
+        if texture_info["properties"]:
+            sprite.properties.update(texture_info["properties"])
+        return sprite
+
+    def make_tile_sprite(self, level_data: CompiledLevelData,
+                         layer: Dict[str, Any], row: int, column: int,
+                         tile_id: int) -> arcade.Sprite:
+        """Make the sprite for a tile, with row 0 at the top of the map."""
+        texture_index = tile_id - 1
+        sprite = self.make_sprite(level_data, texture_index)
+        sprite.hit_box = level_data.hit_boxes[
+            level_data.header["textures"][texture_index]["hit_box"]]
+        tile_width = self.tile_width * self.scaling
+        tile_height = self.tile_height * self.scaling
+        sprite.position = (
+            column * tile_width + sprite.width / 2,
+            (self.height - row - 1) * tile_height + sprite.height / 2
+        )
+        self.apply_layer_style(sprite, layer)
+        return sprite
+
+    def make_tile_layer(self, level_data: CompiledLevelData,
+                        layer: Dict[str, Any],
+                        use_spatial_hash: Optional[bool]
+                        ) -> arcade.SpriteList:
+        """Make the sprites for a layer of tiles."""
+        sprite_list = arcade.SpriteList(use_spatial_hash=use_spatial_hash)
+        tile_ids = level_data.arrays[layer["tiles"]]
+
+        # Every tile that isn't empty, row by row from the top.
+        rows, columns = np.nonzero(tile_ids)
+        for row, column, tile_id in zip(rows.tolist(), columns.tolist(),
+                                        tile_ids[rows, columns].tolist()):
+            sprite_list.visible = layer["visible"]
+            sprite_list.append(self.make_tile_sprite(
+                level_data, layer, row, column, tile_id))
+        return sprite_list
+
+    def make_streamed_layer(self, level_data: CompiledLevelData,
+                            layer: Dict[str, Any],
+                            use_spatial_hash: Optional[bool]
+                            ) -> StreamedTileLayer:
+        """
+        Make a layer of tiles that only makes the sprites
+        of its tiles when `StreamedTileLayer.update()` asks.
+        """
+        sprite_list = arcade.SpriteList(use_spatial_hash=use_spatial_hash)
+        sprite_list.visible = layer["visible"]
+        tile_ids = level_data.arrays[layer["tiles"]]
+        tile_width = self.tile_width * self.scaling
+        tile_height = self.tile_height * self.scaling
+
+        # How far the biggest tile reaches past its own place in the map.
+        overhang = 0
+        for tile_id in np.unique(tile_ids).tolist():
+            if tile_id != 0:
+                texture = level_data.textures[tile_id - 1]
+                overhang = max(overhang,
+                               texture.width * self.scaling - tile_width,
+                               texture.height * self.scaling - tile_height)
+
+        def make_sprite(row: int, column: int,
+                        tile_id: int) -> arcade.Sprite:
+            return self.make_tile_sprite(level_data, layer,
+                                         row, column, tile_id)
+
+        return StreamedTileLayer(sprite_list, tile_ids, make_sprite,
+                                 tile_width, tile_height, overhang)
+
+    def make_object_layer(self, level_data: CompiledLevelData,
+                          layer: Dict[str, Any],
+                          use_spatial_hash: Optional[bool]):
+        """Make the sprites and shapes of an object layer."""
+        scaling = self.scaling
+        if layer["objects"] is not None:
+            sprite_list = arcade.SpriteList(use_spatial_hash=use_spatial_hash)
+            objects = level_data.arrays[layer["objects"]].tolist()
+            for tile_object, properties in zip(objects,
+                                               layer["object_properties"]):
+                sprite = self.make_sprite(
+                    level_data, int(tile_object[OBJECT_TEXTURE]))
+                sprite.hit_box = level_data.hit_boxes[
+                    int(tile_object[OBJECT_HIT_BOX])]
+                sprite.width = width = tile_object[OBJECT_WIDTH] * scaling
+                sprite.height = height = tile_object[OBJECT_HEIGHT] * scaling
+
+                # Turned into radians and back like arcade,
+                # so the angle is exactly the same.
+                angle = 0
+                if tile_object[OBJECT_ROTATION]:
+                    angle = math.degrees(
+                        -math.radians(tile_object[OBJECT_ROTATION]))
+                rotated_center_x, rotated_center_y = arcade.rotate_point(
+                    width / 2, height / 2, 0, 0, angle)
+                sprite.position = (
+                    tile_object[OBJECT_X] * scaling + rotated_center_x,
+                    tile_object[OBJECT_Y] * scaling + rotated_center_y
+                )
+                sprite.angle = angle
+
+                self.apply_layer_style(sprite, layer)
+                for key in SPRITE_FLOAT_PROPERTIES:
+                    if key in properties:
+                        setattr(sprite, key, float(properties[key]))
+                sprite.properties.update(properties)
+
+                sprite_list.visible = layer["visible"]
+                sprite_list.append(sprite)
+            self.sprite_lists[layer["name"]] = sprite_list
+
+        if layer["shapes"]:
+            self.object_lists[layer["name"]] = [
+                arcade.TiledObject(
+                    scale_shape(shape["shape"], scaling)
+                    if shape["scaled"] else shape["shape"],
+                    shape["properties"], shape["name"], shape["type"])
+                for shape in layer["shapes"]
+            ]
+
+    def apply_layer_style(self, sprite: arcade.Sprite,
+                          layer: Dict[str, Any]):
+        """Tint and fade a sprite the same way as its layer."""
+        if layer["tint_color"]:
+            sprite.color = tuple(layer["tint_color"])
+        if layer["opacity"]:
+            sprite.alpha = int(layer["opacity"] * 255)
+
+
+def scale_shape(shape: List[Any], scaling: float) -> List[Any]:
+    """Scale a point or list of points."""
+    if shape and isinstance(shape[0], list):
+        return [scale_shape(point, scaling) for point in shape]
+    return [value * scaling for value in shape]
+# END LOADING
+
+
+if __name__ == "__main__":
+    import simulation
+
+    for map_file in sys.argv[1:] or simulation.LEVELS:
+        print(f"{map_file} -> {compile_level(map_file)}")
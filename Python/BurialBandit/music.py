@@ -0,0 +1,82 @@
+"""
+Plays the music for Burial Bandit.
+
+Music is streamed from its files a little at a time, instead of
+being decoded into memory like the short sound effects are.
+The music player lasts for as long as the game is open,
+so the music carries on when a level restarts.
+"""
+
+from typing import Dict, Optional, Tuple
+import pyglet
+
+# The music tracks by their name.
+MUSIC_MANIFEST: Dict[str, str] = {
+    # Looping game soundtrack
+    'through_the_forest': 'assets/Audio/madmakingmistery_ttf.wav',
+
+    # End sequence
+    'end_intro': 'assets/Audio/EndSequence_Intro.mp3',
+    'end_loop': 'assets/Audio/EndSequence_Looping.mp3',
+}
+
+
+class MusicPlayer():
+    """
+    Plays one piece of music at a time. A piece of music is a track
+    that loops, with an optional intro track that plays once before it.
+    """
+
+    # The files of the tracks by their name.
+    tracks: Dict[str, str] = None
+    # The pyglet player for the music playing now.
+    player: pyglet.media.Player = None
+    # The intro and loop names of the music playing now.
+    playing: Tuple[Optional[str], str] = None
+
+    def __init__(self, tracks: Dict[str, str] = None) -> None:
+        self.tracks = tracks or MUSIC_MANIFEST
+
+    def open_track(self, name: str) -> pyglet.media.StreamingSource:
+        """
+        Open a track to be streamed from its file.
+        A streamed track can only be played once,
+        so it is opened again each time it plays.
+        """
+        return pyglet.media.load(self.tracks[name], streaming=True)
+
+    def play(self, loop: str, intro: str = None, volume: float = 1.0):
+        """
+        Play a track on loop, after the intro if there is one.
+        Music that is already playing carries on instead of starting over.
+        """
+        if self.playing == (intro, loop):
+            return
+        self.stop()
+
+        player = pyglet.media.Player()
+        player.volume = volume
+        if intro is not None:
+            player.queue(self.open_track(intro))
+            # The player moves on to the loop when the intro ends,
+            # and the loop needs to keep playing from then on.
+            player.push_handlers(on_player_next_source=self.on_intro_end)
+        else:
+            player.loop = True
+        player.queue(self.open_track(loop))
+        player.play()
+
+        self.player = player
+        self.playing = (intro, loop)
+
+    def on_intro_end(self):
+        """Start looping the track after the intro."""
+        self.player.loop = True
+
+    def stop(self):
+        """Stop the music playing now."""
+        if self.player is not None:
+            self.player.pause()
+            self.player.delete()
+        self.player = None
+        self.playing = None
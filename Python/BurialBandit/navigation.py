@@ -0,0 +1,562 @@
+"""
+Works out where the player can get to in a level, by walking,
+jumping, falling and climbing, so keys and exits that can't be
+reached are found without playing the level by hand.
+
+The level is turned into a navigation graph once. Its nodes are the
+places the player can stand or hang on a ladder, a quarter of a tile
+apart, and its edges are short moves between them, like walking a
+little or jumping to the right. Every move is played through the
+physics engine with the game's speeds and gravity, and moves that
+touch something deadly or fall out of the level are left out. The
+edges remember how many ticks the move took and which keys or exits
+it touched on the way.
+
+Building a graph takes a few seconds, so it is saved next to the map
+and only built again when the map or its tilesets change. After that,
+finding what can be reached or the quickest route takes milliseconds.
+
+Only moves that hold the same keys all the way are tried, so the
+graph can miss places that need steering in the air, but anything
+it says can be reached really can be.
+
+Run it from the BurialBandit folder with
+`python navigation.py [level indexes]`, which checks every level
+when no levels are given.
+"""
+
+from typing import Any, Dict, List, Optional, Set, Tuple
+from collections import deque
+import heapq
+import json
+import math
+import os
+import sys
+import time
+from pathlib import Path
+
+from end_sequence import LAYER_NAME_END_TRIGGER
+from inputs import Inputs
+from level_compiler import get_source_hash
+from simulation import (
+    GameSimulation,
+    LEVELS,
+    MAP_SCALE,
+    FINAL_MAP_INDEX,
+    GRAVITY,
+    PLAYER_MOVEMENT_SPEED,
+    PLAYER_JUMP_SPEED,
+    LAYER_NAME_CHECKPOINTS,
+    LAYER_NAME_DONT_TOUCH,
+    LAYER_NAME_NEXT_LEVEL,
+    LAYER_NAME_PICKUPS,
+    TRIGGER_LAYERS,
+)
+
+# The file extension of saved navigation graphs.
+NAVIGATION_EXTENSION = ".bbn"
+NAVIGATION_VERSION = 1
+
+# How many nodes across each tile can have, so the player can
+# stop between things like spikes and ladders closer than a tile.
+NODE_COLUMNS_PER_TILE = 4
+
+# The longest a single move can take before it is given up on,
+# like a jump onto a ladder that never lands.
+MOVE_MAX_TICKS = 300
+
+# The moves the player can make from each node, by their name,
+# with the keys held as left, right, up, down. Walking holds the keys
+# for one node column, climbing for one tile, and jumping until the
+# player stops.
+MOVES: Dict[str, Tuple[bool, bool, bool, bool]] = {
+    "walk left": (True, False, False, False),
+    "walk right": (False, True, False, False),
+    "jump": (False, False, True, False),
+    "jump left": (True, False, True, False),
+    "jump right": (False, True, True, False),
+    "climb up": (False, False, True, False),
+    "climb down": (False, False, False, True),
+}
+WALKING_MOVES = ["walk left", "walk right"]
+CLIMBING_MOVES = ["climb up", "climb down"]
+
+# The triggers the edges remember touching. Keys
+# are named by their layer and their index in it.
+ROUTE_TRIGGER_LAYERS = [
+    layer_name for layer_name in TRIGGER_LAYERS
+    if layer_name != LAYER_NAME_DONT_TOUCH
+]
+
+# A node, and the move and ticks it takes to get to another node.
+Edge = Tuple[int, str, int]
+
+
+def get_navigation_path(map_path: str) -> str:
+    """Get the path of the saved navigation graph for a map file."""
+    return str(Path(map_path).with_suffix(NAVIGATION_EXTENSION))
+
+
+def get_key_trigger(index: int) -> str:
+    """Get the name edges use for touching the key at an index."""
+    return f"{LAYER_NAME_PICKUPS} {index}"
+
+
+def get_physics_settings(simulation: GameSimulation) -> Dict[str, Any]:
+    """
+    Get the settings the navigation graph of the simulation's level
+    is built with, which need to match for a saved one to be used.
+    """
+    return {
+        "map_scale": MAP_SCALE[simulation.current_level_index],
+        "gravity": GRAVITY,
+        "movement_speed": PLAYER_MOVEMENT_SPEED,
+        "jump_speed": PLAYER_JUMP_SPEED,
+        # The player's hit box, from their center.
+        "player_box": list(
+            simulation.physics_engine.get_player_box(0.0, 0.0)),
+    }
+
+
+class NavigationGraph():
+    """
+    The places the player can stop in a level, and the moves between
+    them. Nodes are numbered in the order they were found, with the
+    ones at the checkpoints first.
+    """
+
+    source_hash: str = ""
+    physics: Dict[str, Any] = None
+    # The size of the cells the nodes are in.
+    node_width: float = 0
+    cell_height: float = 0
+
+    # Where the player stops at each node.
+    positions: List[Tuple[float, float]] = None
+    # The node of each cell, as (column, row), that has one.
+    cell_nodes: Dict[Tuple[int, int], int] = None
+    # The moves out of each node.
+    edges: List[List[Edge]] = None
+    # The triggers touched by each edge, by (from node, to node, move).
+    edge_triggers: Dict[Tuple[int, int, str], List[str]] = None
+    # The node of each checkpoint, or None when the player falls
+    # out of the level from there.
+    checkpoint_nodes: List[Optional[int]] = None
+
+    def __init__(self, source_hash: str, physics: Dict[str, Any],
+                 node_width: float, cell_height: float) -> None:
+        self.source_hash = source_hash
+        self.physics = physics
+        self.node_width = node_width
+        self.cell_height = cell_height
+        self.positions = []
+        self.cell_nodes = {}
+        self.edges = []
+        self.edge_triggers = {}
+        self.checkpoint_nodes = []
+
+    def get_cell(self, x: float, bottom: float) -> Tuple[int, int]:
+        """Get the node cell of the player, from their x and feet."""
+        return (math.floor(x / self.node_width),
+                math.floor((bottom + 0.5) / self.cell_height))
+
+    def add_node(self, cell: Tuple[int, int], x: float, y: float
+                 ) -> Tuple[int, bool]:
+        """
+        Get the node of a cell, adding it at x, y if it is new.
+        Returns the node and whether it was added.
+        """
+        if cell in self.cell_nodes:
+            return self.cell_nodes[cell], False
+        node = len(self.positions)
+        self.positions.append((x, y))
+        self.cell_nodes[cell] = node
+        self.edges.append([])
+        return node, True
+
+    def add_edge(self, from_node: int, to_node: int, move: str,
+                 ticks: int, triggers: List[str]):
+        """Add a move from one node to another."""
+        self.edges[from_node].append((to_node, move, ticks))
+        if triggers:
+            self.edge_triggers[(from_node, to_node, move)] = triggers
+
+    def find_node(self, x: float, y: float) -> Optional[int]:
+        """
+        Find the nearest node to the player's center,
+        or None if there isn't one within a few tiles.
+        """
+        column = math.floor(x / self.node_width)
+        row = math.floor(y / self.cell_height)
+        # The cells are found from the feet, which are below the center.
+        nearby_nodes = [
+            self.cell_nodes[(near_column, near_row)]
+            for near_column in range(column - 2 * NODE_COLUMNS_PER_TILE,
+                                     column + 2 * NODE_COLUMNS_PER_TILE + 1)
+            for near_row in range(row - 4, row + 2)
+            if (near_column, near_row) in self.cell_nodes
+        ]
+        return min(nearby_nodes, default=None,
+                   key=lambda node: math.hypot(self.positions[node][0] - x,
+                                               self.positions[node][1] - y))
+
+    def find_costs(self, start_node: int
+                   ) -> Tuple[Dict[int, int], Dict[int, Tuple[int, str]]]:
+        """
+        Find the fewest ticks it takes to get to every node that can be
+        reached from the start node, and the node and move each one is
+        best reached from.
+        """
+        costs = {start_node: 0}
+        previous: Dict[int, Tuple[int, str]] = {}
+        queue = [(0, start_node)]
+        while queue:
+            cost, node = heapq.heappop(queue)
+            if cost > costs[node]:
+                continue
+            for to_node, move, ticks in self.edges[node]:
+                to_cost = cost + ticks
+                if to_cost < costs.get(to_node, math.inf):
+                    costs[to_node] = to_cost
+                    previous[to_node] = (node, move)
+                    heapq.heappush(queue, (to_cost, to_node))
+        return costs, previous
+
+    def find_reachable(self, start_node: int) -> Set[int]:
+        """Find every node that can be reached from the start node."""
+        reached = {start_node}
+        queue = deque([start_node])
+        while queue:
+            for to_node, _, _ in self.edges[queue.popleft()]:
+                if to_node not in reached:
+                    reached.add(to_node)
+                    queue.append(to_node)
+        return reached
+
+    def find_reachable_triggers(self, start_node: int) -> Set[str]:
+        """Find every trigger that can be touched from the start node."""
+        reached = self.find_reachable(start_node)
+        return {
+            trigger
+            for (from_node, _, _), triggers in self.edge_triggers.items()
+            if from_node in reached
+            for trigger in triggers
+        }
+
+    def get_route(self, previous: Dict[int, Tuple[int, str]],
+                  end_node: int) -> List[Tuple[str, int]]:
+        """
+        Follow the best moves back from the end node,
+        returning the moves in order with the node each leads to.
+        """
+        route = []
+        while end_node in previous:
+            from_node, move = previous[end_node]
+            route.append((move, end_node))
+            end_node = from_node
+        route.reverse()
+        return route
+
+    def find_route(self, start_node: int, end_node: int
+                   ) -> Optional[List[Tuple[str, int]]]:
+        """
+        Find the quickest moves from the start node to the end node,
+        with the node each leads to, or None if it can't be reached.
+        """
+        costs, previous = self.find_costs(start_node)
+        if end_node not in costs:
+            return None
+        return self.get_route(previous, end_node)
+
+    def find_route_to_trigger(self, start_node: int, trigger: str
+                              ) -> Optional[List[Tuple[str, int]]]:
+        """
+        Find the quickest moves from the start node to touching a
+        trigger, like a key or the exit, or None if it can't be reached.
+        """
+        costs, previous = self.find_costs(start_node)
+        best_cost = math.inf
+        best_edge = None
+        for (from_node, to_node, move), triggers in (
+                self.edge_triggers.items()):
+            if trigger in triggers and from_node in costs:
+                ticks = next(edge_ticks for edge_node, edge_move, edge_ticks
+                             in self.edges[from_node]
+                             if edge_node == to_node and edge_move == move)
+                if costs[from_node] + ticks < best_cost:
+                    best_cost = costs[from_node] + ticks
+                    best_edge = (from_node, to_node, move)
+        if best_edge is None:
+            return None
+        from_node, to_node, move = best_edge
+        return self.get_route(previous, from_node) + [(move, to_node)]
+
+    def save(self, file_path: str):
+        """Write the graph to a JSON file."""
+        with open(file_path, "w") as graph_file:
+            json.dump({
+                "version": NAVIGATION_VERSION,
+                "source_hash": self.source_hash,
+                "physics": self.physics,
+                "node_width": self.node_width,
+                "cell_height": self.cell_height,
+                "nodes": [[column, row, *self.positions[node]]
+                          for (column, row), node in
+                          sorted(self.cell_nodes.items(),
+                                 key=lambda item: item[1])],
+                "edges": [[from_node, to_node, move, ticks,
+                           self.edge_triggers.get(
+                               (from_node, to_node, move), [])]
+                          for from_node, edges in enumerate(self.edges)
+                          for to_node, move, ticks in edges],
+                "checkpoint_nodes": self.checkpoint_nodes,
+            }, graph_file)
+
+    @classmethod
+    def load(cls, file_path: str) -> Optional["NavigationGraph"]:
+        """
+        Read a graph from a file made by `save()`,
+        returning None if there isn't one or it is an old version.
+        """
+        if not os.path.exists(file_path):
+            return None
+        with open(file_path) as graph_file:
+            data = json.load(graph_file)
+        if data.get("version") != NAVIGATION_VERSION:
+            return None
+
+        graph = cls(data["source_hash"], data["physics"],
+                    data["node_width"], data["cell_height"])
+        for column, row, x, y in data["nodes"]:
+            graph.add_node((column, row), x, y)
+        for from_node, to_node, move, ticks, triggers in data["edges"]:
+            graph.add_edge(from_node, to_node, move, ticks, triggers)
+        graph.checkpoint_nodes = data["checkpoint_nodes"]
+        return graph
+
+
+class NavigationBuilder():
+    """
+    Builds the navigation graph of the level loaded in a simulation,
+    trying every move from every node the player can get to.
+    The simulation's player is moved around to do this, so reset
+    the level before playing it again.
+    """
+
+    simulation: GameSimulation = None
+    graph: NavigationGraph = None
+    # The index of each key in the Pickups layer, by the key's id.
+    key_indexes: Dict[int, int] = None
+    # How many ticks walking a node column or climbing a tile takes.
+    walk_ticks: int = 0
+    climb_ticks: int = 0
+
+    def __init__(self, simulation: GameSimulation,
+                 source_hash: str) -> None:
+        """
+        simulation: A booted simulation with the level loaded.
+        source_hash: The hash of the map file and its tilesets.
+        """
+        self.simulation = simulation
+        map_scale = MAP_SCALE[simulation.current_level_index]
+        cell_width = simulation.tile_map.tile_width * map_scale
+        cell_height = simulation.tile_map.tile_height * map_scale
+        node_width = cell_width / NODE_COLUMNS_PER_TILE
+        self.graph = NavigationGraph(source_hash,
+                                     get_physics_settings(simulation),
+                                     node_width, cell_height)
+        self.key_indexes = {
+            id(key): index
+            for index, key in enumerate(simulation.scene[LAYER_NAME_PICKUPS])
+        }
+        self.walk_ticks = math.ceil(node_width / PLAYER_MOVEMENT_SPEED)
+        self.climb_ticks = math.ceil(cell_height / PLAYER_MOVEMENT_SPEED)
+
+    def build(self) -> NavigationGraph:
+        """Find every node the player can get to, and the moves between."""
+        graph = self.graph
+        queue = deque()
+        for checkpoint in self.simulation.tile_map.object_lists[
+                LAYER_NAME_CHECKPOINTS]:
+            # Let the player fall to where they stop at the checkpoint.
+            stop = self.try_move(*checkpoint.shape, None)
+            node = None
+            if stop is not None:
+                cell, x, y, _, _ = stop
+                node, added = graph.add_node(cell, x, y)
+                if added:
+                    queue.append(node)
+            graph.checkpoint_nodes.append(node)
+
+        while queue:
+            node = queue.popleft()
+            on_ladder = self.is_on_ladder(*graph.positions[node])
+            for move in MOVES:
+                if move in CLIMBING_MOVES and not on_ladder:
+                    continue
+                stop = self.try_move(*graph.positions[node], move)
+                if stop is None:
+                    continue
+                cell, x, y, ticks, triggers = stop
+                to_node, added = graph.add_node(cell, x, y)
+                if added:
+                    queue.append(to_node)
+                if to_node != node or triggers:
+                    graph.add_edge(node, to_node, move, ticks, triggers)
+        return graph
+
+    def is_on_ladder(self, x: float, y: float) -> bool:
+        """Check if the player would be on a ladder at x, y."""
+        player = self.simulation.player_sprite
+        player.center_x = x
+        player.center_y = y
+        return self.simulation.physics_engine.is_on_ladder()
+
+    def is_stopped(self) -> bool:
+        """Check if the player has stopped on the ground or a ladder."""
+        engine = self.simulation.physics_engine
+        return (self.simulation.player_sprite.change_y == 0 and
+                (engine.can_jump(y_distance=1) or engine.is_on_ladder()))
+
+    def try_move(self, x: float, y: float, move: Optional[str]
+                 ) -> Optional[Tuple[Tuple[int, int], float, float, int,
+                                     List[str]]]:
+        """
+        Play a move from x, y through the physics engine until the
+        player stops, with no keys held if the move is None.
+        Returns the cell and position they stop at, the ticks it took
+        and the triggers they touched, or None if they died or fell
+        out of the level.
+        """
+        simulation = self.simulation
+        player = simulation.player_sprite
+        player.center_x = x
+        player.center_y = y
+        player.change_x = 0
+        player.change_y = 0
+
+        # Press the move's keys, the same way as the window.
+        simulation.inputs = Inputs()
+        if move is not None:
+            (simulation.inputs.left_pressed, simulation.inputs.right_pressed,
+             simulation.inputs.up_pressed,
+             simulation.inputs.down_pressed) = MOVES[move]
+            simulation.process_keychange()
+        if move in WALKING_MOVES:
+            release_tick = self.walk_ticks
+        elif move in CLIMBING_MOVES:
+            release_tick = self.climb_ticks
+        else:
+            release_tick = None
+
+        triggers: List[str] = []
+        for tick in range(1, MOVE_MAX_TICKS + 1):
+            simulation.stop_player_at_ends()
+            simulation.physics_engine.update()
+
+            touching = simulation.query_triggers()
+            if touching[LAYER_NAME_DONT_TOUCH]:
+                return None
+            for key in touching[LAYER_NAME_PICKUPS]:
+                trigger = get_key_trigger(self.key_indexes[id(key)])
+                if trigger not in triggers:
+                    triggers.append(trigger)
+            for layer_name in ROUTE_TRIGGER_LAYERS:
+                if (layer_name != LAYER_NAME_PICKUPS and
+                        touching[layer_name] and layer_name not in triggers):
+                    triggers.append(layer_name)
+            if player.top < 0:
+                return None
+
+            if tick == release_tick:
+                simulation.inputs = Inputs()
+                simulation.process_keychange()
+            if (release_tick is None or tick >= release_tick) and (
+                    self.is_stopped()):
+                if move is not None and move.startswith("jump"):
+                    # Let go of the keys, so the next move starts still.
+                    simulation.inputs = Inputs()
+                    simulation.process_keychange()
+                bottom = simulation.physics_engine.get_player_box(
+                    player.center_x, player.center_y)[1]
+                return (self.graph.get_cell(player.center_x, bottom),
+                        player.center_x, player.center_y, tick, triggers)
+        return None
+
+
+def load_navigation_graph(simulation: GameSimulation) -> NavigationGraph:
+    """
+    Get the navigation graph of the level loaded in a simulation
+    that uses grid physics, building and saving it if there isn't
+    an up to date one next to the map.
+    """
+    map_path = LEVELS[simulation.current_level_index]
+    graph_path = get_navigation_path(map_path)
+    source_hash = get_source_hash(map_path)
+    physics = get_physics_settings(simulation)
+
+    graph = NavigationGraph.load(graph_path)
+    if (graph is None or graph.source_hash != source_hash or
+            graph.physics != physics):
+        graph = NavigationBuilder(simulation, source_hash).build()
+        graph.save(graph_path)
+        # The player was moved around to build the graph.
+        simulation.reset_level()
+    return graph
+
+
+def check_level(level_index: int) -> bool:
+    """
+    Print how many keys and exits can be reached from the start
+    of a level, and how long finding them takes.
+    Returns True if everything can be reached.
+    """
+    simulation = GameSimulation()
+    simulation.use_grid_physics = True
+    simulation.boot()
+    simulation.current_level_index = level_index
+    simulation.reset_level()
+
+    start_time = time.perf_counter()
+    graph = load_navigation_graph(simulation)
+    load_time = time.perf_counter() - start_time
+    edge_count = sum(len(edges) for edges in graph.edges)
+    print(f"{LEVELS[level_index]}: {len(graph.positions)} nodes, "
+          f"{edge_count} moves, loaded in {load_time * 1000:.0f} ms")
+
+    start_node = graph.checkpoint_nodes[0]
+    if start_node is None:
+        print("  The player falls out of the level from the start")
+        return False
+
+    start_time = time.perf_counter()
+    reachable = graph.find_reachable_triggers(start_node)
+    query_time = time.perf_counter() - start_time
+    wanted = [get_key_trigger(index) for index in
+              range(len(simulation.scene[LAYER_NAME_PICKUPS]))]
+    # The final level is finished at its end trigger, not an exit.
+    if level_index == FINAL_MAP_INDEX:
+        goal_layer = LAYER_NAME_END_TRIGGER
+    else:
+        goal_layer = LAYER_NAME_NEXT_LEVEL
+    # Only check the goal when the layer has something to touch.
+    if simulation.scene.name_mapping.get(goal_layer):
+        wanted.append(goal_layer)
+    print(f"  Found what can be reached in {query_time * 1000:.1f} ms")
+
+    all_reached = True
+    for trigger in wanted:
+        if trigger not in reachable:
+            all_reached = False
+            print(f"  {trigger}: can't be reached")
+        else:
+            route = graph.find_route_to_trigger(start_node, trigger)
+            print(f"  {trigger}: {len(route)} moves away")
+    return all_reached
+
+
+if __name__ == "__main__":
+    level_indexes = ([int(argument) for argument in sys.argv[1:]] or
+                     list(range(len(LEVELS))))
+    results = [check_level(level_index) for level_index in level_indexes]
+    sys.exit(0 if all(results) else 1)
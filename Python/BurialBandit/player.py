@@ -3,11 +3,11 @@ The player character for Burial Bandit
 including animations and sound effects.
 """
 
-from typing import List, Dict
-from os.path import join
-from math import floor
+from typing import Optional, Tuple
 import arcade
-from pyglet.media import Player
+
+from sprite_animation import FrameTable, compile_frame_tables
+from audio import Voice, VoicePool
 
 # ANIMATION_FRAMERATE = 8
 
@@ -31,78 +31,82 @@ ANIMATIONS_METADATA = {
 ANIM_IDLE = "idle"
 ANIM_RUNNING = "running"
 
-# Custom property keys
-PROPERTY_GROUND_TYPE = "ground_type"
+# The animations in the order of their state ids. The ids
+# are used each frame instead of comparing the names.
+ANIMATION_STATES = (ANIM_IDLE, ANIM_RUNNING)
+STATE_IDLE = ANIMATION_STATES.index(ANIM_IDLE)
+STATE_RUNNING = ANIMATION_STATES.index(ANIM_RUNNING)
 
 # Name the values that represent left and right facing.
 RIGHT_FACING = 0
 LEFT_FACING = 1
 
 
-def load_image_sequence(folder: str, number_of_frames: int,
-                        start_frame: int = 1,
-                        file_extension=".png") -> List[List[arcade.Sprite]]:
-    """
-    Loads a sequence of images as texture pairs into a list
-    to be used for animation.
-    The images must be consecutively named e.g. 1.png, 2.png, 3.png, ...
-    """
-    image_sequence: List[List[arcade.Sprite]] = []
-    for frame_no in range(start_frame, number_of_frames + 1):
-        # Generate filepath for the next image to import.
-        filepath = join(folder, str(frame_no) + file_extension)
-
-        # Import the next image in the sequence
-        # and append it to the list.
-        image_sequence.append(
-            arcade.load_texture_pair(filepath)
-        )
-
-    return image_sequence
-
-
 class PlayerCharacter(arcade.Sprite):
     """The player's character."""
 
+    # The fields changed every frame are kept in slots,
+    # so reading and setting them is quick.
+    __slots__ = (
+        "jumping", "climbing", "is_on_ladder", "facing_direction",
+        "current_frame", "sequence_frame", "current_animation",
+        "frame_tables", "voices", "surface_sfx_voice",
+        "previous_ground_type",
+    )
+
     # Track player state
-    jumping = False
-    climbing = False
-    is_on_ladder = False
-    facing_direction = RIGHT_FACING
+    jumping: bool
+    climbing: bool
+    is_on_ladder: bool
+    facing_direction: int
 
     # Increases every frame proportional to delta time.
-    current_frame = 0.0
+    current_frame: float
     # Current frame index
-    sequence_frame = 0
-    # The animation that is played
-    current_animation = ANIM_IDLE
-    # The animation played the previous frame.
-    # Used to determine if the animation has changed,
-    # and to reset the frame if so.
-    previous_animation = ANIM_IDLE
-    animations = {}
+    sequence_frame: int
+    # The state id of the animation that is played.
+    current_animation: int
+    # The frame table of each animation by its state id.
+    frame_tables: Tuple[FrameTable, ...]
 
     # Audio
-    sounds = None
-    surface_sfx_player: Player = None
-    previous_ground_type: str = None
+    voices: VoicePool
+    surface_sfx_voice: Optional[Voice]
+    previous_ground_type: Optional[str]
 
     def __init__(self,
                  character_scaling: int = 1,
-                 sound_library: Dict[str, arcade.Sound] = {}):
+                 voices: VoicePool = None):
         # Initialise the parent
         super().__init__(scale=character_scaling)
 
-        # Save sounds
-        self.sounds = sound_library
+        # Save the voices the sound effects play on,
+        # None when there is no audio.
+        self.voices = voices
+        self.surface_sfx_voice = None
+        self.previous_ground_type = None
+
+        self.jumping = False
+        self.climbing = False
+        self.is_on_ladder = False
 
         # LOAD ANIMATIONS
-        for anim_name, anim_data in ANIMATIONS_METADATA.items():
-            self.animations[anim_name] = load_image_sequence(
-                anim_data['folder'], anim_data['length'])
+        # The images are shared by every player, so they
+        # are only loaded the first time one is made.
+        self.frame_tables = compile_frame_tables(ANIMATIONS_METADATA,
+                                                 ANIMATION_STATES)
 
         # Set initial sprite
-        self.texture = self.animations[ANIM_IDLE][0][self.facing_direction]
+        self.facing_direction = RIGHT_FACING
+        self.start_animation(STATE_IDLE)
+        self.texture = self.frame_tables[STATE_IDLE].textures[
+            self.facing_direction][0]
+
+    def start_animation(self, state: int):
+        """Play an animation from its first frame."""
+        self.current_animation = state
+        self.current_frame = 0.0
+        self.sequence_frame = 0
 
     def animation_selection(self):
         """
@@ -111,17 +115,14 @@ class PlayerCharacter(arcade.Sprite):
 
         # Idle
         if self.change_x == 0:
-            self.current_animation = ANIM_IDLE
+            state = STATE_IDLE
         # Running
         else:
-            self.current_animation = ANIM_RUNNING
+            state = STATE_RUNNING
 
         # If the animation has changed, reset the frame to zero
-        if self.current_animation != self.previous_animation:
-            self.current_frame = 0.0
-            self.sequence_frame = 0
-
-        self.previous_animation = self.current_animation
+        if state != self.current_animation:
+            self.start_animation(state)
 
     def update_animation(self, delta_time: float = 1 / 60):
         """
@@ -139,59 +140,67 @@ class PlayerCharacter(arcade.Sprite):
 
         # Select the animation
         self.animation_selection()
-
-        # Get animation attributes
-        animation_frames = (ANIMATIONS_METADATA
-                            [self.current_animation]['length'] - 1)
-        wait_frames = ANIMATIONS_METADATA[self.current_animation]['wait']
-        framerate = ANIMATIONS_METADATA[self.current_animation]['framerate']
+        table = self.frame_tables[self.current_animation]
 
         # Progress the animation frame unless
         # it's the last one in the animation.
-        seq_frame = floor(self.current_frame)
-        if seq_frame < animation_frames:
+        # The frame is never negative, so int() rounds it down.
+        current_frame = self.current_frame
+        seq_frame = int(current_frame)
+        if seq_frame < table.shown_frames:
             self.sequence_frame = seq_frame
 
         # When the time for the full animation and
         # the wait time has passed, restart the animation.
-        if self.current_frame >= animation_frames + wait_frames:
-            self.current_frame = 0.0
+        if current_frame >= table.cycle_frames:
+            current_frame = 0.0
             self.sequence_frame = 0
 
-        # Play current animation frame.
-        self.texture = (self.animations
-                        [self.current_animation]
-                        [self.sequence_frame]
-                        [self.facing_direction])
+        # Play current animation frame. The texture is only
+        # set when it changes, as setting it updates the SpriteLists.
+        texture = table.textures[self.facing_direction][self.sequence_frame]
+        if texture is not self._texture:
+            self.texture = texture
         # Progress to the next frame
-        self.current_frame += delta_time * framerate
+        self.current_frame = current_frame + delta_time * table.framerate
 
-    def update_sfx(self, sound_layer: arcade.SpriteList):
+    def update_sfx(self, ground_type: Optional[str]):
         """
         Play a sound effect corresponding
         to the surface the player is walking on.
+
+        ground_type: The kind of ground the player is standing on,
+        or None if it doesn't make a sound.
         """
-        # Find the tiles that the player is standing on.
-        tiles_touching = arcade.check_for_collision_with_list(
-            self, sound_layer
-        )
-
-        if len(tiles_touching) == 0 or self.change_x == 0:
-            if self.surface_sfx_player is not None:
-                arcade.stop_sound(self.surface_sfx_player)
-            self.previous_ground_type = None
+        if ground_type is None or self.change_x == 0:
+            self.stop_sfx()
         else:
-            ground_type: str = (tiles_touching[0]
-                                .properties[PROPERTY_GROUND_TYPE])
             if ground_type != self.previous_ground_type:
-                if self.surface_sfx_player is not None:
-                    arcade.stop_sound(self.surface_sfx_player)
-                self.surface_sfx_player = (
-                    self.sounds[f"{ground_type}_surface"].play(volume=0.7,
-                                                               loop=True)
-                )
+                if self.surface_sfx_voice is not None:
+                    self.surface_sfx_voice.stop()
+                self.surface_sfx_voice = self.voices.play(
+                    f"{ground_type}_surface", volume=0.7, loop=True)
             self.previous_ground_type = ground_type
 
     def stop_sfx(self):
         """Stop playing player sound effects."""
-        arcade.stop_sound(self.surface_sfx_player)
+        if self.surface_sfx_voice is not None:
+            self.surface_sfx_voice.stop()
+            self.surface_sfx_voice = None
+        self.previous_ground_type = None
+
+    def reset(self):
+        """
+        Put the player back into the state they
+        start a level in, so they can be reused.
+        """
+        self.stop_sfx()
+
+        self.change_x = 0
+        self.change_y = 0
+
+        # Start the idle animation facing right.
+        self.facing_direction = RIGHT_FACING
+        self.start_animation(STATE_IDLE)
+        self.texture = self.frame_tables[STATE_IDLE].textures[
+            self.facing_direction][0]
@@ -0,0 +1,144 @@
+"""
+Times each part of a frame to help find what is slowing the game down.
+
+The times for the last few thousand frames are kept in ring buffers,
+so the percentiles can be shown in game and saved to a CSV file.
+"""
+
+from typing import Dict, List, Tuple
+from collections import deque
+from contextlib import nullcontext
+import csv
+import time
+
+# How many frames of times are kept.
+PROFILE_HISTORY_FRAMES = 3600
+
+# The name of the time for the whole frame.
+PHASE_FRAME = "frame"
+
+# Used in place of a timer when the profiler is turned off,
+# so timing a phase costs next to nothing.
+NULL_PHASE = nullcontext()
+
+
+class PhaseTimer():
+    """Times one phase of a frame, adding it to the profiler."""
+
+    profiler: "FrameProfiler" = None
+    name: str = None
+    start_time: float = 0.0
+
+    def __init__(self, profiler: "FrameProfiler", name: str) -> None:
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.add_time(self.name,
+                               time.perf_counter() - self.start_time)
+
+
+class FrameProfiler():
+    """
+    Records how long each named phase of the frame takes.
+
+    Wrap each phase in `with profiler.phase("name"):`
+    and call `end_frame()` once the frame has been drawn.
+    """
+
+    enabled: bool = False
+
+    # The phase names in the order they were first seen.
+    phase_names: List[str] = None
+    # The times of the phases in the current frame, in seconds.
+    current_frame: Dict[str, float] = None
+    # The times of the phases in each of the last frames.
+    frames: "deque[Dict[str, float]]" = None
+    # Timers are reused, so timing a phase doesn't make new objects.
+    timers: Dict[str, PhaseTimer] = None
+
+    # When the last frame ended.
+    last_frame_time: float = None
+
+    def __init__(self, enabled: bool = True,
+                 history_frames: int = PROFILE_HISTORY_FRAMES) -> None:
+        self.enabled = enabled
+        self.phase_names = [PHASE_FRAME]
+        self.current_frame = {}
+        self.frames = deque(maxlen=history_frames)
+        self.timers = {}
+
+    def phase(self, name: str):
+        """
+        Get a context manager that times the code inside it as
+        part of this frame. Phases that run more than once in a frame
+        have their times added together.
+        """
+        if not self.enabled:
+            return NULL_PHASE
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers[name] = PhaseTimer(self, name)
+        return timer
+
+    def add_time(self, name: str, seconds: float):
+        """Add time to a phase of the current frame."""
+        if name not in self.current_frame:
+            if name not in self.phase_names:
+                self.phase_names.append(name)
+            self.current_frame[name] = seconds
+        else:
+            self.current_frame[name] += seconds
+
+    def end_frame(self):
+        """
+        Finish the current frame, saving its times.
+        The frame time is the time since the last frame ended.
+        """
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self.last_frame_time is not None:
+            self.current_frame[PHASE_FRAME] = now - self.last_frame_time
+            self.frames.append(self.current_frame)
+        self.last_frame_time = now
+        self.current_frame = {}
+
+    def percentiles(self, name: str) -> Tuple[float, float, float]:
+        """
+        Get the 50th, 95th and 99th percentile times of a phase,
+        in seconds, over the frames that are kept.
+        Frames where the phase didn't run count as zero.
+        """
+        times = sorted(frame.get(name, 0.0) for frame in self.frames)
+        if not times:
+            return (0.0, 0.0, 0.0)
+        last_index = len(times) - 1
+        return (times[round(last_index * 0.50)],
+                times[round(last_index * 0.95)],
+                times[round(last_index * 0.99)])
+
+    def summary(self) -> List[str]:
+        """Get a line for each phase with its percentiles in ms."""
+        lines = [f"{'phase':<16}{'p50':>8}{'p95':>8}{'p99':>8}"]
+        for name in self.phase_names:
+            p50, p95, p99 = self.percentiles(name)
+            lines.append(f"{name:<16}{p50 * 1000:>8.2f}"
+                         f"{p95 * 1000:>8.2f}{p99 * 1000:>8.2f}")
+        return lines
+
+    def save_csv(self, file_path: str):
+        """
+        Save the times of every frame that is kept to a CSV file,
+        one row per frame and one column per phase in ms.
+        """
+        with open(file_path, "w", newline="") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(self.phase_names)
+            for frame in self.frames:
+                writer.writerow(f"{frame.get(name, 0.0) * 1000:.4f}"
+                                for name in self.phase_names)
@@ -0,0 +1,199 @@
+"""
+Draws the scene, only drawing the parts of the
+tile layers that can be seen by the camera.
+
+Each static tile layer is split into square chunks when the level
+is loaded, so drawing costs the same however wide the level is.
+Layers can also be baked, drawing each chunk once into a texture
+so it is drawn as one sprite instead of a sprite for every tile.
+"""
+
+from typing import Dict, List, Tuple
+import math
+import arcade
+import arcade.gl
+import PIL.Image
+
+# The width and height of a chunk in tiles.
+CHUNK_SIZE_TILES = 16
+
+# How far past the edges of the screen chunks are still drawn,
+# so the camera shake doesn't show chunks popping in.
+CULL_MARGIN = 64
+
+# The starting size of the texture atlas the baked chunks go in.
+# It grows if there isn't enough room.
+BAKED_ATLAS_SIZE = (1024, 1024)
+
+
+class ChunkedLayer():
+    """
+    A tile layer split into square chunks, each with its own SpriteList.
+    The sprites are also left in the original SpriteList.
+    """
+
+    # The width and height of a chunk in game px.
+    chunk_size: float = 0
+    # The chunks by their (column, row).
+    chunks: Dict[Tuple[int, int], arcade.SpriteList] = None
+    # How far the sprites can reach out of their chunk, as
+    # sprites are put in the chunk their center is in.
+    overhang: float = 0
+
+    def __init__(self, sprite_list: arcade.SpriteList,
+                 chunk_size: float) -> None:
+        self.chunk_size = chunk_size
+        self.chunks = {}
+        self.overhang = 0
+
+        for sprite in sprite_list:
+            chunk_key = (int(sprite.center_x // chunk_size),
+                         int(sprite.center_y // chunk_size))
+            chunk = self.chunks.get(chunk_key)
+            if chunk is None:
+                chunk = self.chunks[chunk_key] = arcade.SpriteList()
+            chunk.append(sprite)
+
+            self.overhang = max(self.overhang,
+                                sprite.width / 2, sprite.height / 2)
+
+    def get_visible(self, left: float, bottom: float,
+                    right: float, top: float) -> List[arcade.SpriteList]:
+        """Get the chunks with sprites that reach into the rectangle."""
+        chunk_size = self.chunk_size
+        first_column = int((left - self.overhang) // chunk_size)
+        last_column = int((right + self.overhang) // chunk_size)
+        first_row = int((bottom - self.overhang) // chunk_size)
+        last_row = int((top + self.overhang) // chunk_size)
+
+        visible = []
+        for column in range(first_column, last_column + 1):
+            for row in range(first_row, last_row + 1):
+                chunk = self.chunks.get((column, row))
+                if chunk is not None:
+                    visible.append(chunk)
+        return visible
+
+    def bake(self, texture_scale: float, name: str,
+             atlas: arcade.TextureAtlas) -> arcade.SpriteList:
+        """
+        Draw each chunk into a texture, and return a SpriteList with a
+        sprite for each one, to be drawn in place of the layer.
+        Needs the window, as it draws with OpenGL.
+
+        texture_scale: How many game px each texture pixel covers.
+        Using the map scale keeps the tiles' original pixels.
+        name: Used to give the textures unique names.
+        """
+        ctx = arcade.get_window().ctx
+        chunk_size = self.chunk_size
+        texture_size = round(chunk_size / texture_scale)
+        framebuffer = ctx.framebuffer(color_attachments=[
+            ctx.texture((texture_size, texture_size), components=4)
+        ])
+
+        # Sprites reach out of their own chunk, so
+        # the cells around the chunks are baked too.
+        reach = math.ceil(self.overhang / chunk_size)
+        cells = {
+            (column + x_offset, row + y_offset)
+            for column, row in self.chunks
+            for x_offset in range(-reach, reach + 1)
+            for y_offset in range(-reach, reach + 1)
+        }
+
+        baked = arcade.SpriteList(atlas=atlas)
+        previous_projection = ctx.projection_2d
+        for column, row in sorted(cells):
+            left = column * chunk_size
+            bottom = row * chunk_size
+            right = left + chunk_size
+            top = bottom + chunk_size
+
+            with framebuffer.activate():
+                framebuffer.clear()
+                ctx.projection_2d = (left, right, bottom, top)
+                for chunk in self.get_visible(left, bottom, right, top):
+                    chunk.draw(filter=arcade.gl.NEAREST)
+                pixels = framebuffer.read(components=4)
+
+            # OpenGL's rows go from the bottom up.
+            image = PIL.Image.frombytes(
+                "RGBA", (texture_size, texture_size), bytes(pixels)
+            ).transpose(PIL.Image.FLIP_TOP_BOTTOM)
+            # Skip cells with nothing in them.
+            if image.getbbox() is None:
+                continue
+
+            texture = arcade.Texture(f"{name} {column},{row}", image,
+                                     hit_box_algorithm="None")
+            baked.append(arcade.Sprite(texture=texture,
+                                       scale=texture_scale,
+                                       center_x=left + chunk_size / 2,
+                                       center_y=bottom + chunk_size / 2))
+        ctx.projection_2d = previous_projection
+        return baked
+
+
+class LevelChunks():
+    """
+    The chunked layers for one level. The layers are found by
+    their SpriteList, so the scene's order can be kept when drawing.
+    """
+
+    layers: Dict[arcade.SpriteList, ChunkedLayer] = None
+    # The layers drawn from baked textures, by their SpriteList.
+    baked_layers: Dict[arcade.SpriteList, arcade.SpriteList] = None
+    # Holds the baked textures for this level.
+    baked_atlas: arcade.TextureAtlas = None
+
+    def __init__(self, sprite_lists: List[arcade.SpriteList],
+                 chunk_size: float) -> None:
+        self.layers = {
+            sprite_list: ChunkedLayer(sprite_list, chunk_size)
+            for sprite_list in sprite_lists
+        }
+        self.baked_layers = {}
+
+    def bake(self, sprite_lists: Dict[str, arcade.SpriteList],
+             texture_scale: float):
+        """
+        Bake the named layers into textures, so they are drawn
+        from a few large sprites. Only bake layers that never change.
+        """
+        if self.baked_atlas is None:
+            # The level's own atlas, so the baked
+            # textures don't fill up the shared one.
+            self.baked_atlas = arcade.TextureAtlas(BAKED_ATLAS_SIZE)
+        for name, sprite_list in sprite_lists.items():
+            self.baked_layers[sprite_list] = self.layers[sprite_list].bake(
+                texture_scale, f"baked {id(self)} {name}", self.baked_atlas)
+
+
+def draw_scene(scene: arcade.Scene, level_chunks: LevelChunks,
+               camera: arcade.Camera, margin: float = CULL_MARGIN,
+               **kwargs):
+    """
+    Draw every SpriteList in the scene in order, like `Scene.draw()`.
+    The chunked layers only draw the chunks the camera can see,
+    the baked layers draw their textures and
+    the other layers are drawn whole.
+    """
+    left = camera.position.x - margin
+    bottom = camera.position.y - margin
+    right = camera.position.x + camera.viewport_width + margin
+    top = camera.position.y + camera.viewport_height + margin
+
+    for sprite_list in scene.sprite_lists:
+        baked_layer = level_chunks.baked_layers.get(sprite_list)
+        if baked_layer is not None:
+            baked_layer.draw(**kwargs)
+            continue
+
+        chunked_layer = level_chunks.layers.get(sprite_list)
+        if chunked_layer is None:
+            sprite_list.draw(**kwargs)
+        else:
+            for chunk in chunked_layer.get_visible(left, bottom,
+                                                   right, top):
+                chunk.draw(**kwargs)
@@ -0,0 +1,281 @@
+"""
+Records the player's inputs into a small binary file
+and plays them back through the headless simulation.
+
+A replay saves the inputs every time they change along
+with the tick they changed on, and where the player ended up.
+Playing it back checks the game still ends up in the same place,
+so a captured run can be used as a regression test and benchmark.
+
+Run it from the BurialBandit folder with
+`python replay.py <replay file> [repeats]`, or with
+`python replay.py --compare-physics <replay file>` to play it with
+both physics engines and check they move the player the same way.
+"""
+
+from typing import List, Tuple
+import struct
+import sys
+import time
+
+from inputs import Inputs
+from simulation import GameSimulation
+
+# The start of every replay file, to check it is one.
+REPLAY_MAGIC = b"BBRP"
+REPLAY_VERSION = 1
+
+# Magic, version, level index, number of ticks, number of input changes.
+HEADER_FORMAT = struct.Struct("<4sBBII")
+# The tick the inputs changed on, and the inputs packed into bits.
+INPUT_FORMAT = struct.Struct("<IB")
+# Where the player ended up: x, y, level index, lives, keys picked up.
+RESULT_FORMAT = struct.Struct("<ddBBB")
+
+# The order the inputs are packed into bits.
+INPUT_FIELDS = [
+    "left_pressed",
+    "right_pressed",
+    "up_pressed",
+    "down_pressed",
+    "jump_needs_reset",
+]
+
+# How close the replayed position has to be to the recorded one.
+POSITION_TOLERANCE = 0.001
+
+
+def pack_inputs(inputs: Inputs) -> int:
+    """Pack the inputs into one byte, one bit for each."""
+    bits = 0
+    for bit, field in enumerate(INPUT_FIELDS):
+        if getattr(inputs, field):
+            bits |= 1 << bit
+    return bits
+
+
+def unpack_inputs(bits: int, inputs: Inputs):
+    """Set the inputs from a byte made by `pack_inputs()`."""
+    for bit, field in enumerate(INPUT_FIELDS):
+        setattr(inputs, field, bool(bits & (1 << bit)))
+
+
+class ReplayResult():
+    """Where the player ended up at the end of a replay."""
+
+    center_x: float = 0.0
+    center_y: float = 0.0
+    level_index: int = 0
+    lives: int = 0
+    keys_picked_up: int = 0
+
+    def __init__(self, simulation: GameSimulation = None) -> None:
+        if simulation is not None:
+            self.center_x = simulation.player_sprite.center_x
+            self.center_y = simulation.player_sprite.center_y
+            self.level_index = simulation.current_level_index
+            self.lives = simulation.lives
+            self.keys_picked_up = simulation.keys_picked_up
+
+    def matches(self, other: "ReplayResult") -> bool:
+        """Check if two results are the same."""
+        return (
+            abs(self.center_x - other.center_x) <= POSITION_TOLERANCE and
+            abs(self.center_y - other.center_y) <= POSITION_TOLERANCE and
+            self.level_index == other.level_index and
+            self.lives == other.lives and
+            self.keys_picked_up == other.keys_picked_up
+        )
+
+    def __str__(self) -> str:
+        return (f"level {self.level_index} at "
+                f"({self.center_x:.1f}, {self.center_y:.1f}) "
+                f"with {self.lives} lives and {self.keys_picked_up} keys")
+
+
+class Replay():
+    """The inputs of one play, and where the player ended up."""
+
+    # The level the play started on.
+    level_index: int = 0
+    # How many ticks the play lasted.
+    ticks: int = 0
+    # Each change to the inputs, as (tick, packed inputs).
+    inputs: List[Tuple[int, int]] = None
+    # Where the player was when the recording finished.
+    result: ReplayResult = None
+
+    def __init__(self, level_index: int = 0) -> None:
+        self.level_index = level_index
+        self.inputs = []
+        self.result = ReplayResult()
+
+    def save(self, file_path: str):
+        """Write the replay to a file."""
+        with open(file_path, "wb") as replay_file:
+            replay_file.write(HEADER_FORMAT.pack(
+                REPLAY_MAGIC, REPLAY_VERSION,
+                self.level_index, self.ticks, len(self.inputs)
+            ))
+            for tick, bits in self.inputs:
+                replay_file.write(INPUT_FORMAT.pack(tick, bits))
+            replay_file.write(RESULT_FORMAT.pack(
+                self.result.center_x, self.result.center_y,
+                self.result.level_index, self.result.lives,
+                self.result.keys_picked_up
+            ))
+
+    @classmethod
+    def load(cls, file_path: str) -> "Replay":
+        """Read a replay from a file made by `save()`."""
+        with open(file_path, "rb") as replay_file:
+            data = replay_file.read()
+
+        (magic, version, level_index, ticks,
+         input_count) = HEADER_FORMAT.unpack_from(data)
+        if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+            raise ValueError(f"{file_path} is not a version "
+                             f"{REPLAY_VERSION} replay file")
+
+        replay = cls(level_index)
+        replay.ticks = ticks
+        offset = HEADER_FORMAT.size
+        for _ in range(input_count):
+            replay.inputs.append(INPUT_FORMAT.unpack_from(data, offset))
+            offset += INPUT_FORMAT.size
+
+        (replay.result.center_x, replay.result.center_y,
+         replay.result.level_index, replay.result.lives,
+         replay.result.keys_picked_up) = RESULT_FORMAT.unpack_from(
+             data, offset)
+        return replay
+
+
+class ReplayRecorder():
+    """
+    Records the inputs of a game as it is played.
+    Call `start()` once the level is loaded, `record()` after
+    every change to the inputs and `finish()` at the end.
+    """
+
+    replay: Replay = None
+    # The simulation tick the recording started on.
+    start_tick: int = 0
+
+    def start(self, simulation: GameSimulation):
+        """Start a new recording from the simulation's current level."""
+        self.replay = Replay(simulation.current_level_index)
+        self.start_tick = simulation.tick
+
+    def record(self, simulation: GameSimulation):
+        """
+        Save the simulation's inputs. Call this every time the
+        keys change, before the inputs are processed.
+        """
+        bits = pack_inputs(simulation.inputs)
+        tick = simulation.tick - self.start_tick
+        self.replay.inputs.append((tick, bits))
+
+    def finish(self, simulation: GameSimulation) -> Replay:
+        """Stop recording and save where the player ended up."""
+        self.replay.ticks = simulation.tick - self.start_tick
+        self.replay.result = ReplayResult(simulation)
+        return self.replay
+
+
+def play_replay(simulation: GameSimulation, replay: Replay,
+                trace: List[Tuple[float, float]] = None) -> ReplayResult:
+    """
+    Play the replay's inputs back through a booted simulation
+    on a fixed time step, and return where the player ended up.
+
+    trace: If given, the player's position after each tick is added to it.
+    """
+    simulation.current_level_index = replay.level_index
+    simulation.reset_level()
+
+    input_index = 0
+    for tick in range(replay.ticks):
+        # Apply all the inputs that changed before this tick,
+        # the same way the window does when a key is pressed.
+        while (input_index < len(replay.inputs) and
+               replay.inputs[input_index][0] <= tick):
+            unpack_inputs(replay.inputs[input_index][1], simulation.inputs)
+            simulation.process_keychange()
+            input_index += 1
+        simulation.step()
+        if trace is not None:
+            trace.append((simulation.player_sprite.center_x,
+                          simulation.player_sprite.center_y))
+
+    return ReplayResult(simulation)
+
+
+def benchmark_replay(file_path: str, repeats: int = 1) -> bool:
+    """
+    Play a replay file a number of times, printing how fast it
+    ran and if it matched the recording. Returns True if it matched.
+    """
+    replay = Replay.load(file_path)
+    simulation = GameSimulation()
+    simulation.boot()
+
+    all_matched = True
+    for repeat in range(repeats):
+        start_time = time.perf_counter()
+        result = play_replay(simulation, replay)
+        run_time = time.perf_counter() - start_time
+
+        matched = result.matches(replay.result)
+        all_matched = all_matched and matched
+        print(f"Replay {repeat + 1}: {replay.ticks} ticks in "
+              f"{run_time:.2f} s ({replay.ticks / run_time:.0f} ticks "
+              f"per second), {'matched' if matched else 'DID NOT MATCH'}")
+        if not matched:
+            print(f"  Recorded: {replay.result}")
+            print(f"  Replayed: {result}")
+    return all_matched
+
+
+def compare_physics_engines(file_path: str) -> bool:
+    """
+    Play a replay file with arcade's physics engine and the grid
+    physics engine, checking the player is in the same place after
+    every tick. Returns True if they always were.
+    """
+    replay = Replay.load(file_path)
+    traces = {}
+    run_times = {}
+    for use_grid_physics in (False, True):
+        simulation = GameSimulation()
+        simulation.use_grid_physics = use_grid_physics
+        simulation.boot()
+
+        trace: List[Tuple[float, float]] = []
+        start_time = time.perf_counter()
+        play_replay(simulation, replay, trace)
+        run_times[use_grid_physics] = time.perf_counter() - start_time
+        traces[use_grid_physics] = trace
+
+    print(f"{replay.ticks} ticks in {run_times[False]:.2f} s with arcade "
+          f"physics, {run_times[True]:.2f} s with grid physics")
+    for tick, (arcade_position, grid_position) in enumerate(
+            zip(traces[False], traces[True])):
+        if arcade_position != grid_position:
+            print(f"  Moved differently on tick {tick}: "
+                  f"{arcade_position} with arcade physics, "
+                  f"{grid_position} with grid physics")
+            return False
+    print("  Moved the same on every tick")
+    return True
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python replay.py <replay file> [repeats]")
+        print("       python replay.py --compare-physics <replay file>")
+        sys.exit(2)
+    if sys.argv[1] == "--compare-physics":
+        sys.exit(0 if compare_physics_engines(sys.argv[2]) else 1)
+    replay_repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    sys.exit(0 if benchmark_replay(sys.argv[1], replay_repeats) else 1)
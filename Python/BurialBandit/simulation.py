@@ -0,0 +1,644 @@
+"""
+The game rules for Burial Bandit, kept apart from the window,
+drawing and sound so they can be run headless at any speed.
+
+Running this file steps every level without a window
+and prints how many frames per second it managed.
+"""
+
+from typing import Dict, List, Tuple
+import time
+import arcade
+
+# Internal modules
+import player
+from inputs import Inputs
+from audio import VoicePool
+from level_cache import LevelCache, CachedLevel
+from tile_streaming import Area
+from checkpoints import CheckpointIndex
+from triggers import TriggerIndex
+from ground import GroundTypeGrid
+from grid_physics import (
+    BoxGrid,
+    GridPhysicsEngine,
+    SolidGrid,
+    get_layer_boxes,
+)
+from profiler import FrameProfiler
+from end_sequence import LAYER_NAME_END_TRIGGER
+
+# The time that passes in one step of the simulation.
+SIMULATION_DELTA_TIME = 1 / 60
+
+# How many steps each level is run for by the soak test.
+SOAK_TEST_STEPS = 5000
+
+# Physics
+GRAVITY = 0.5
+
+# Collide with grids made from the Platforms and Ladders layers,
+# instead of arcade's physics engine colliding with their sprites.
+# Both move the player in exactly the same way.
+USE_GRID_PHYSICS = True
+
+# Movement speed
+PLAYER_MOVEMENT_SPEED = 7
+PLAYER_JUMP_SPEED = 13
+
+# How far above the ground the player can still jump from.
+PLAYER_JUMP_GROUND_DISTANCE = 10
+
+# The number of lives the player
+# has at the start of the game.
+PLAYER_INITIAL_LIVES = 3
+
+# Player size
+PLAYER_SCALING = 5
+
+# How close you need to be to a checkpoint to activate it.
+CHECKPOINT_TRIGGER_DISTANCE = 64
+
+# The number of pixels distance from the absolute ends
+# of the map that the player will be stopped at.
+PLAYER_X_STOP_BUFFER = 64
+
+# How far around the player the streamed tile layers
+# always have sprites, covering anything they can touch.
+STREAM_NEEDED_DISTANCE = 256
+# How far around the player the streamed tile layers have sprites
+# made ahead of time, a few chunks each step, so they are ready
+# before the camera shows them.
+STREAM_WANTED_DISTANCE = 1024
+
+# LEVELS
+LEVELS = [
+    'maps/1_TownLevel.tmx',
+    'maps/2_JungleLevel.tmx',
+    'maps/3_CaveLevel.tmx',
+]
+
+# Map scale values by level
+MAP_SCALE = [
+    3,
+    5,
+    4,
+]
+
+# The first map that is opened (usually the start).
+MAP_START_INDEX = 0
+
+# Used to enable the End scene logic.
+FINAL_MAP_INDEX = 2
+
+# Layer Names from the tiled project
+LAYER_NAME_PLATFORMS = "Platforms"
+LAYER_NAME_PICKUPS = "Pickups"
+LAYER_NAME_FOREGROUND = "Foreground"
+LAYER_NAME_BACKGROUND = "Background"
+LAYER_NAME_DONT_TOUCH = "Don't Touch"
+LAYER_NAME_NEXT_LEVEL = "Next Level"
+LAYER_NAME_LADDERS = "Ladders"
+LAYER_NAME_CHECKPOINTS = "Checkpoints"
+LAYER_NAME_SOUND = "Sound"
+
+# The layers the player sets off by touching them.
+TRIGGER_LAYERS = [
+    LAYER_NAME_DONT_TOUCH,
+    LAYER_NAME_PICKUPS,
+    LAYER_NAME_NEXT_LEVEL,
+    LAYER_NAME_END_TRIGGER,
+]
+
+
+class GameSimulation():
+    """
+    Runs the rules of the game: moving the player, lives, keys,
+    checkpoints and changing levels, with no window, OpenGL
+    or audio needed.
+
+    The game window builds on this, adding the drawing and sound.
+    Without it, call `setup()` and then `step()` with a fixed
+    time step to play the game as fast as the computer can.
+    """
+
+    # Keeps every level that has been loaded,
+    # so restarting doesn't read the map file again.
+    level_cache: LevelCache = None
+    # The cached level that is being played.
+    level: CachedLevel = None
+
+    # Tiled map data
+    tile_map: arcade.TileMap = None
+    # The arcade scene for all data from the tiled map.
+    scene: arcade.Scene = None
+    physics_engine = None
+    # Which physics engine `boot()` makes, USE_GRID_PHYSICS by default.
+    use_grid_physics: bool = USE_GRID_PHYSICS
+
+    # Plays the sound effects, None when there is no audio.
+    voices: VoicePool = None
+
+    # Holds the player Sprite object
+    player_sprite: player.PlayerCharacter = None
+
+    # Holds the current input values
+    inputs: Inputs = None
+
+    # Level index
+    current_level_index: int = MAP_START_INDEX
+
+    # Current checkpoint
+    player_checkpoint_pos: arcade.Point = None
+    player_checkpoint_index: int = 0
+    # Finds the checkpoints near the player.
+    checkpoint_index: CheckpointIndex = None
+    # Finds the trigger tiles the player is touching.
+    trigger_index: TriggerIndex = None
+    # The kind of ground in each tile, for the footstep sounds.
+    ground_grid: GroundTypeGrid = None
+    # The platforms and ladders for the grid physics engine.
+    solid_grid: SolidGrid = None
+    ladder_grid: BoxGrid = None
+
+    # Map width in game px
+    map_width_px = 0
+
+    # The number of steps run since the game started.
+    tick: int = 0
+    # The trigger tiles the player touched in the last step.
+    triggers: Dict[str, List[arcade.Sprite]] = None
+
+    # GAMEPLAY
+    # Keys
+    keys_picked_up: int = 0
+    keys_to_pick_up: int = 0
+
+    # Lives
+    lives: int = 0
+
+    # Times each part of the step, turned off unless it is replaced.
+    profiler: FrameProfiler = FrameProfiler(enabled=False)
+
+    # End sequence
+    end_sequence_active: bool = False
+    # Set when the player escapes at the end of the final level.
+    end_reached: bool = False
+
+    def setup(self):
+        """
+        Set up the game here. Call this function once to start the game,
+        and `reset_level()` to restart the current level.
+        """
+        self.boot()
+        self.reset_level()
+
+    def boot(self):
+        """
+        Load everything that lasts for the whole time the game is open,
+        so it doesn't have to be done again when a level restarts.
+        """
+        self.level_cache = LevelCache()
+
+        # CREATE PLAYER CHARACTER
+        # Make the player character object, it
+        # gets placed in each level as it is reset.
+        self.player_sprite = player.PlayerCharacter(PLAYER_SCALING,
+                                                    self.voices)
+
+        # Create the physics engine to let the player move.
+        # The walls and ladders are set when a level is loaded.
+        if self.use_grid_physics:
+            self.physics_engine = GridPhysicsEngine(
+                self.player_sprite,
+                gravity_constant=GRAVITY
+            )
+        else:
+            self.physics_engine = arcade.PhysicsEnginePlatformer(
+                self.player_sprite,
+                gravity_constant=GRAVITY
+            )
+        # END CREATE PLAYER CHARACTER
+
+    def reset_level(self):
+        """
+        Start the current level from the beginning.
+        Only rebuilds the things that belong to the level,
+        so it is quick enough to use for every restart.
+        """
+        # INPUT SYSTEM
+        self.inputs = Inputs()
+
+        # MAP LOAD
+        # The path to the map file
+        map_name = LEVELS[self.current_level_index]
+
+        # Configure map layers to optimise performance.
+        # The trigger layers don't need spatial hashing,
+        # because they are looked up in the trigger index.
+        layer_options = {
+            LAYER_NAME_PLATFORMS: {
+                "use_spatial_hash": True,
+            },
+            LAYER_NAME_LADDERS: {
+                "use_spatial_hash": True,
+            },
+        }
+
+        # Let go of the previous scene before making the new one.
+        previous_level = self.level
+        if previous_level is not None:
+            previous_level.release_scene(self.scene)
+
+        # Load tiled map, only reading the file
+        # the first time the level is played.
+        # The sound layer is never drawn, so it
+        # is kept as tile data instead of sprites.
+        # The trigger layers are indexed as the level
+        # loads, so they always have all their sprites.
+        self.level = self.level_cache.get(
+            map_name,
+            MAP_SCALE[self.current_level_index],
+            layer_options,
+            skip_layers=[LAYER_NAME_SOUND],
+            always_loaded=TRIGGER_LAYERS
+            )
+        self.tile_map = self.level.tile_map
+
+        # Make a fresh copy of the level's arcade scene
+        # with SpriteLists for each layer.
+        self.scene = self.level.new_scene()
+
+        # Start reading the next level in the background
+        # while this one is played, so it is ready to go.
+        if len(LEVELS)-1 > self.current_level_index:
+            self.level_cache.preload(LEVELS[self.current_level_index + 1])
+
+        # Get the player start location from the tiled map file.
+        # This is done by just going to the first checkpoint.
+        self.player_checkpoint_index = 0
+        self.player_checkpoint_pos = (self.tile_map.object_lists
+                                      [LAYER_NAME_CHECKPOINTS]
+                                      [self.player_checkpoint_index].shape)
+
+        self.map_width_px = (
+            self.tile_map.width *
+            self.tile_map.tile_width *
+            MAP_SCALE[self.current_level_index])
+        # END MAP LOAD
+
+        # LEVEL INDEXES
+        # These only change with the level, so they
+        # aren't rebuilt when the same level restarts.
+        if self.level is not previous_level:
+            self.checkpoint_index = CheckpointIndex(
+                self.tile_map.object_lists[LAYER_NAME_CHECKPOINTS],
+                CHECKPOINT_TRIGGER_DISTANCE
+            )
+            # The scene is fresh here, so it
+            # still has all of its pickups.
+            self.trigger_index = TriggerIndex({
+                layer_name: self.scene[layer_name]
+                for layer_name in TRIGGER_LAYERS
+                if layer_name in self.scene.name_mapping
+            })
+            map_scale = MAP_SCALE[self.current_level_index]
+            self.ground_grid = GroundTypeGrid(
+                self.level.skipped_layers[LAYER_NAME_SOUND],
+                self.level.tile_properties,
+                self.tile_map.tile_width * map_scale,
+                self.tile_map.tile_height * map_scale
+            )
+            if self.use_grid_physics:
+                self.make_physics_grids()
+        # END LEVEL INDEXES
+
+        # PLACE PLAYER CHARACTER
+        # Place the player at the start of the level.
+        self.player_sprite.reset()
+        self.player_sprite.center_x = self.player_checkpoint_pos[0]
+        self.player_sprite.center_y = self.player_checkpoint_pos[1]
+        # Load all the streamed tiles around the start at once.
+        self.level.update_streaming(*self.get_stream_areas(),
+                                    max_chunks=None)
+
+        # Give the physics engine the new level to collide with.
+        if self.use_grid_physics:
+            self.physics_engine.set_level(self.solid_grid, self.ladder_grid)
+        else:
+            self.physics_engine.walls = [self.scene[LAYER_NAME_PLATFORMS]]
+            self.physics_engine.ladders = [self.scene[LAYER_NAME_LADDERS]]
+        # END PLACE PLAYER CHARACTER
+
+        # GAMEPLAY VALUES
+        # Set Keys picked up to none.
+        self.keys_picked_up = 0
+        # Get the number of keys placed on the pickup layer.
+        self.keys_to_pick_up = len(self.scene[LAYER_NAME_PICKUPS])
+
+        # Set lives to the max value
+        self.lives = PLAYER_INITIAL_LIVES
+
+        self.end_sequence_active = False
+        self.end_reached = False
+        # END GAMEPLAY VALUES
+
+    def make_physics_grids(self):
+        """
+        Make the grids of the platforms and ladders
+        the grid physics engine collides with.
+        """
+        grid_size = self.get_grid_size()
+        self.solid_grid = SolidGrid(*grid_size)
+        self.solid_grid.add_boxes(get_layer_boxes(
+            self.scene[LAYER_NAME_PLATFORMS],
+            self.level.streamed_layers.get(LAYER_NAME_PLATFORMS)
+        ))
+        self.ladder_grid = BoxGrid(*grid_size)
+        self.ladder_grid.add_boxes(get_layer_boxes(
+            self.scene[LAYER_NAME_LADDERS],
+            self.level.streamed_layers.get(LAYER_NAME_LADDERS)
+        ))
+
+    def get_grid_size(self) -> Tuple[int, int, float, float]:
+        """
+        Get the columns, rows, cell width and cell height
+        of a grid with a cell for each tile of the level.
+        """
+        map_scale = MAP_SCALE[self.current_level_index]
+        return (self.tile_map.width, self.tile_map.height,
+                self.tile_map.tile_width * map_scale,
+                self.tile_map.tile_height * map_scale)
+
+    def step(self, delta_time: float = SIMULATION_DELTA_TIME):
+        """
+        Move the game on by one step of the rules.
+
+        delta_time: Time passed since the last step.
+        """
+        self.tick += 1
+        profiler = self.profiler
+
+        # Make the sprites of the streamed layers near the player,
+        # before the physics engine looks for them.
+        with profiler.phase("streaming"):
+            self.level.update_streaming(*self.get_stream_areas())
+
+        with profiler.phase("physics"):
+            self.stop_player_at_ends()
+
+            # Move the player with the physics engine.
+            self.physics_engine.update()
+
+        # Find all the trigger tiles the player is touching at once.
+        with profiler.phase("triggers"):
+            self.triggers = self.query_triggers()
+
+        # Update player animation. The player's hit box comes from
+        # the animation frame, so this is part of the game rules.
+        with profiler.phase("animation"):
+            self.player_sprite.update_animation(delta_time)
+
+        # Check if the player hits something deadly.
+        with profiler.phase("deadly"):
+            if self.check_for_deadly_surfaces(
+                    self.triggers[LAYER_NAME_DONT_TOUCH]):
+                # The player has moved, so look
+                # again from where they are now.
+                self.triggers = self.query_triggers()
+
+        # Check if the player picked up a key.
+        with profiler.phase("pickups"):
+            self.check_for_pickup_collision(
+                self.triggers[LAYER_NAME_PICKUPS])
+
+        with profiler.phase("next level"):
+            if self.check_for_next_level(
+                    self.triggers[LAYER_NAME_NEXT_LEVEL]):
+                self.triggers = self.query_triggers()
+
+        with profiler.phase("checkpoints"):
+            self.update_checkpoints()
+
+        with profiler.phase("end trigger"):
+            self.check_for_end(self.triggers[LAYER_NAME_END_TRIGGER])
+
+    def get_area_around_player(self, distance: float) -> Area:
+        """Get the area within a distance of the player."""
+        return (self.player_sprite.center_x - distance,
+                self.player_sprite.center_y - distance,
+                self.player_sprite.center_x + distance,
+                self.player_sprite.center_y + distance)
+
+    def get_stream_areas(self) -> Tuple[List[Area], List[Area]]:
+        """
+        Get the areas the streamed tile layers need to have sprites in
+        right now, and the areas they want to have sprites in soon.
+        """
+        return ([self.get_area_around_player(STREAM_NEEDED_DISTANCE)],
+                [self.get_area_around_player(STREAM_WANTED_DISTANCE)])
+
+    def query_triggers(self) -> Dict[str, List[arcade.Sprite]]:
+        """
+        Get the trigger tiles the player is touching, by layer name.
+        Every trigger layer has an entry, even if it isn't in this level.
+        """
+        triggers = self.trigger_index.query(self.player_sprite)
+        for layer_name in TRIGGER_LAYERS:
+            triggers.setdefault(layer_name, [])
+
+        # Pickups that have already been collected are still in the
+        # index, so only keep the ones still in the current scene.
+        pickups_left = self.scene[LAYER_NAME_PICKUPS]
+        triggers[LAYER_NAME_PICKUPS] = [
+            pickup for pickup in triggers[LAYER_NAME_PICKUPS]
+            if pickups_left in pickup.sprite_lists
+        ]
+        return triggers
+
+    def check_for_deadly_surfaces(self,
+                                  deadly_hit_list: List[arcade.Sprite]
+                                  ) -> bool:
+        """
+        Check if the player hits something damaging.
+        Returns True if the player was moved because of it.
+        """
+        if deadly_hit_list:
+            # Take a life
+            self.lives -= 1
+
+            # If the player has lives remaining.
+            if self.lives > 0:
+                # Send player back to checkpoint
+                self.player_sprite.change_x = 0
+                self.player_sprite.change_y = 0
+                self.player_sprite.center_x = self.player_checkpoint_pos[0]
+                self.player_sprite.center_y = self.player_checkpoint_pos[1]
+            # If the player is out of lives.
+            else:
+                # Restart the level.
+                self.reset_level()
+            return True
+        return False
+
+    def check_for_pickup_collision(self,
+                                   pickup_hit_list: List[arcade.Sprite]):
+        """Collect keys when the player walks into them."""
+
+        # Start end sequence
+        if (len(pickup_hit_list) > 0 and
+                self.current_level_index == FINAL_MAP_INDEX):
+            self.start_end_sequence()
+
+        # Loop through each key we hit (if any) and remove it
+        for pickup in pickup_hit_list:
+            # Remove the coin, only from this scene so
+            # it comes back when the level restarts.
+            self.scene[LAYER_NAME_PICKUPS].remove(pickup)
+            # Add to the key counter
+            self.keys_picked_up += 1
+
+    def check_for_next_level(self,
+                             next_level_hit_list: List[arcade.Sprite]
+                             ) -> bool:
+        """When the player reaches the end of the level,
+        load the next one. Returns True if it was loaded."""
+
+        if (next_level_hit_list and
+                self.keys_picked_up >= self.keys_to_pick_up):
+            self.keys_picked_up = 0
+            self.player_sprite.stop_sfx()
+            if len(LEVELS)-1 > self.current_level_index:
+                self.current_level_index += 1
+            self.reset_level()
+            return True
+        return False
+
+    def check_for_end(self, end_trigger_hit_list: List[arcade.Sprite]):
+        """
+        Finish the end sequence when the player
+        makes it out to the end trigger.
+        """
+        if self.end_sequence_active and end_trigger_hit_list:
+            self.finish_end_sequence()
+
+    def start_end_sequence(self):
+        """Start the action sequence at the end of the final level."""
+        self.end_sequence_active = True
+
+    def finish_end_sequence(self):
+        """End the action sequence, as the player has escaped."""
+        self.end_sequence_active = False
+        self.end_reached = True
+
+    def update_checkpoints(self):
+        """
+        When the player comes within proximity of one of the
+        checkpoints and it is of a higher index then the previous
+        one they activated, that will become their new checkpoint.
+        """
+        # Only checkpoints near the player that are further
+        # progressed than the current one are looked at.
+        reached_checkpoint = self.checkpoint_index.find(
+            self.player_sprite.center_x, self.player_sprite.center_y,
+            self.player_checkpoint_index
+        )
+        if reached_checkpoint is not None:
+            # Set the checkpoint location to
+            # the newly reached checkpoint.
+            (self.player_checkpoint_index,
+             self.player_checkpoint_pos) = reached_checkpoint
+
+    def stop_player_at_ends(self):
+        """
+        Stop the player walking off the ends of the level.
+        Call this before the physics update.
+        """
+        # Where the player will be on the next
+        # physics update if the change goes ahead.
+        anticipated_position = (self.player_sprite.center_x +
+                                self.player_sprite.change_x)
+        # Stop the player at the left side of the map.
+        if (self.inputs.left_pressed and
+                anticipated_position <= PLAYER_X_STOP_BUFFER):
+            self.player_sprite.change_x = 0
+        # Stop the player on the right side of the map.
+        elif (self.inputs.right_pressed and anticipated_position >=
+              self.map_width_px - PLAYER_X_STOP_BUFFER):
+            self.player_sprite.change_x = 0
+
+    def process_keychange(self):
+        """
+        Updates the input's impact on gameplay.
+        """
+        # Process jumping and moving up/down ladders.
+        if self.inputs.up_pressed and not self.inputs.down_pressed:
+            if self.physics_engine.is_on_ladder():
+                self.player_sprite.change_y = PLAYER_MOVEMENT_SPEED
+            elif (
+                self.physics_engine.can_jump(
+                    y_distance=PLAYER_JUMP_GROUND_DISTANCE)
+                and not self.inputs.jump_needs_reset
+            ):
+                self.player_sprite.change_y = PLAYER_JUMP_SPEED
+                self.inputs.jump_needs_reset = True
+                # arcade.play_sound(self.jump_sound)
+        elif self.inputs.down_pressed and not self.inputs.up_pressed:
+            if self.physics_engine.is_on_ladder():
+                self.player_sprite.change_y = -PLAYER_MOVEMENT_SPEED
+
+        # Cancel out movement on ladders when
+        # both up and down are pressed.
+        if self.physics_engine.is_on_ladder():
+            if not self.inputs.up_pressed and not self.inputs.down_pressed:
+                self.player_sprite.change_y = 0
+            elif self.inputs.up_pressed and self.inputs.down_pressed:
+                self.player_sprite.change_y = 0
+
+        # Walking laft and right.
+        if self.inputs.right_pressed and not self.inputs.left_pressed:
+            self.player_sprite.change_x = PLAYER_MOVEMENT_SPEED
+        elif self.inputs.left_pressed and not self.inputs.right_pressed:
+            self.player_sprite.change_x = -PLAYER_MOVEMENT_SPEED
+        else:
+            self.player_sprite.change_x = 0
+
+    def simulate(self, steps: int,
+                 delta_time: float = SIMULATION_DELTA_TIME):
+        """Run a number of fixed time steps one after another."""
+        for _ in range(steps):
+            self.step(delta_time)
+
+
+def soak_test(steps: int = SOAK_TEST_STEPS):
+    """
+    Run every level headless with the player running right
+    and jumping whenever they can, printing how fast it went.
+    """
+    simulation = GameSimulation()
+    simulation.boot()
+
+    for level_index, map_name in enumerate(LEVELS):
+        simulation.current_level_index = level_index
+        simulation.reset_level()
+
+        simulation.inputs.right_pressed = True
+        simulation.inputs.up_pressed = True
+
+        start_time = time.perf_counter()
+        for _ in range(steps):
+            # Let go of jump and press it again so it can be reused.
+            simulation.inputs.jump_needs_reset = False
+            simulation.process_keychange()
+            simulation.step()
+        run_time = time.perf_counter() - start_time
+
+        print(f"{map_name}: {steps / run_time:.0f} steps per second, "
+              f"ended on level {simulation.current_level_index} "
+              f"with {simulation.lives} lives at "
+              f"({simulation.player_sprite.center_x:.0f}, "
+              f"{simulation.player_sprite.center_y:.0f})")
+
+
+if __name__ == "__main__":
+    soak_test()
@@ -0,0 +1,59 @@
+"""
+Compiles the animations of characters into frame tables.
+
+The animation metadata is looked up once when the animations are
+loaded, so moving a character's animation on each frame is only
+a few number comparisons and tuple lookups. Any sprite with
+the same kind of metadata as the player can use them.
+"""
+
+from typing import Any, Dict, Sequence, Tuple
+import arcade
+
+from textures import get_image_sequence
+
+
+class FrameTable():
+    """The frames and timing of one animation state."""
+
+    __slots__ = ("textures", "shown_frames", "cycle_frames", "framerate")
+
+    # The textures of each frame, facing right and facing left.
+    textures: Tuple[Tuple[arcade.Texture, ...], Tuple[arcade.Texture, ...]]
+    # How many frames are shown before it holds on the last one.
+    shown_frames: int
+    # How many frames long the animation is, with its wait,
+    # before it starts again.
+    cycle_frames: int
+    # How many frames it moves on each second.
+    framerate: float
+
+    def __init__(self, folder: str, length: int, wait: int,
+                 framerate: float) -> None:
+        """
+        folder: Where the numbered frame images are.
+        length: How many frame images there are.
+        wait: How many frames to hold the last one for.
+        framerate: How many frames to move on each second.
+        """
+        sequence = get_image_sequence(folder, length)
+        self.textures = (tuple(pair[0] for pair in sequence),
+                         tuple(pair[1] for pair in sequence))
+        self.shown_frames = length - 1
+        self.cycle_frames = self.shown_frames + wait
+        self.framerate = framerate
+
+
+def compile_frame_tables(metadata: Dict[str, Dict[str, Any]],
+                         states: Sequence[str]) -> Tuple[FrameTable, ...]:
+    """
+    Make the frame table of each animation, in the order of the
+    states, so they can be looked up by a state's index.
+
+    metadata: The folder, length, wait and framerate of each animation.
+    """
+    return tuple(FrameTable(metadata[state]['folder'],
+                            metadata[state]['length'],
+                            metadata[state]['wait'],
+                            metadata[state]['framerate'])
+                 for state in states)
@@ -0,0 +1,94 @@
+"""
+Loads the game's textures once and shares
+them between everything that uses them.
+"""
+
+from typing import Dict, List, Tuple
+from os import listdir
+from os.path import join
+import arcade
+
+# The folder holding a sub folder of frames for each player animation.
+ANIMATIONS_FOLDER = "assets/Archeologist-Character/Animations"
+
+# Image sequences that have already been loaded,
+# stored by the arguments they were loaded with.
+image_sequences: Dict[Tuple[str, int, int, str],
+                      List[List[arcade.Texture]]] = {}
+
+# The atlas holding every frame of the player animations.
+animation_atlas: arcade.TextureAtlas = None
+
+
+def load_image_sequence(folder: str, number_of_frames: int,
+                        start_frame: int = 1,
+                        file_extension=".png") -> List[List[arcade.Texture]]:
+    """
+    Loads a sequence of images as texture pairs into a list
+    to be used for animation.
+    The images must be consecutively named e.g. 1.png, 2.png, 3.png, ...
+    """
+    image_sequence: List[List[arcade.Texture]] = []
+    for frame_no in range(start_frame, number_of_frames + 1):
+        # Generate filepath for the next image to import.
+        filepath = join(folder, str(frame_no) + file_extension)
+
+        # Import the next image in the sequence
+        # and append it to the list.
+        image_sequence.append(
+            arcade.load_texture_pair(filepath)
+        )
+
+    return image_sequence
+
+
+def get_image_sequence(folder: str, number_of_frames: int,
+                       start_frame: int = 1,
+                       file_extension=".png") -> List[List[arcade.Texture]]:
+    """
+    Gets a sequence of texture pairs the same way as
+    `load_image_sequence()`, but only loads it the first time.
+    Every call after that gets the same list, so don't change it.
+    """
+    key = (folder, number_of_frames, start_frame, file_extension)
+    if key not in image_sequences:
+        image_sequences[key] = load_image_sequence(
+            folder, number_of_frames, start_frame, file_extension)
+    return image_sequences[key]
+
+
+def load_folder_textures(folder: str,
+                         file_extension=".png") -> List[arcade.Texture]:
+    """
+    Loads every image in a folder, along with a mirrored copy
+    of it, as textures into a flat list.
+    """
+    folder_textures: List[arcade.Texture] = []
+    for file_name in sorted(listdir(folder)):
+        if file_name.endswith(file_extension):
+            folder_textures.extend(
+                arcade.load_texture_pair(join(folder, file_name))
+            )
+    return folder_textures
+
+
+def get_animation_atlas() -> arcade.TextureAtlas:
+    """
+    Gets the texture atlas holding every frame of every player
+    animation, making it the first time it is needed.
+    SpriteLists using it never have to add textures to
+    their atlas when an animation changes frames.
+
+    Needs the game window to be open.
+    """
+    global animation_atlas
+
+    if animation_atlas is None:
+        atlas_textures: List[arcade.Texture] = []
+        for animation_folder in sorted(listdir(ANIMATIONS_FOLDER)):
+            atlas_textures.extend(load_folder_textures(
+                join(ANIMATIONS_FOLDER, animation_folder)))
+
+        animation_atlas = arcade.TextureAtlas.create_from_texture_sequence(
+            atlas_textures)
+    return animation_atlas
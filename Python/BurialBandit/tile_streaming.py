@@ -0,0 +1,177 @@
+"""
+Streams the sprites of very wide tile layers in and out as the game moves.
+
+The tile ids stay in the memory mapped level package, and sprites are
+only made for the chunks of a layer near the player and the camera,
+so the memory a level uses doesn't grow with how wide it is.
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+import math
+import arcade
+import numpy as np
+
+# The width and height of a streamed chunk in tiles. Smaller than
+# the drawing chunks, so each one is quick to make.
+STREAM_CHUNK_TILES = 8
+
+# Chunks are only let go once they are this many chunks away from
+# the area, so walking back and forth over the edge of a chunk
+# doesn't keep making and throwing away its sprites.
+STREAM_UNLOAD_CHUNKS = 1
+
+# How many chunks can be loaded ahead of time in one update.
+# Making a chunk's sprites takes a few ms, so loading a whole row
+# of them at once when the player walks into it would stutter.
+STREAM_CHUNKS_PER_UPDATE = 1
+
+# The left, bottom, right and top of an area in game px.
+Area = Tuple[float, float, float, float]
+
+
+class StreamedTileLayer():
+    """
+    A tile layer that only has sprites for the chunks near an area.
+    Its SpriteList is used like any other layer's, by the scene
+    and the physics engine, with the sprites added by `load()`
+    and removed by `unload_outside()`.
+    """
+
+    # The layer's SpriteList, holding the sprites of the loaded chunks.
+    sprite_list: arcade.SpriteList = None
+    # The tile ids of the layer, as rows from the top down, 0 is empty.
+    tile_ids: np.ndarray = None
+    # Makes the sprite for the tile at a row and column with a tile id.
+    make_sprite: Callable[[int, int, int], arcade.Sprite] = None
+
+    # The size of the map in tiles.
+    rows: int = 0
+    columns: int = 0
+    chunk_tiles: int = STREAM_CHUNK_TILES
+    # The width and height of a chunk in game px.
+    chunk_width: float = 0
+    chunk_height: float = 0
+    # How far the tiles can reach out of their chunk, as
+    # tiles bigger than the map's tiles reach up and to the right.
+    overhang: float = 0
+
+    # The sprites of each loaded chunk by its (column, row),
+    # with row 0 at the bottom of the map.
+    loaded: Dict[Tuple[int, int], List[arcade.Sprite]] = None
+    # Chunk ranges that are known to be fully loaded, so
+    # the area staying in the same chunks costs nothing.
+    loaded_ranges: Set[Tuple[int, int, int, int]] = None
+    # The chunk ranges chunks were last unloaded outside of.
+    kept_ranges: List[Tuple[int, int, int, int]] = None
+
+    def __init__(self, sprite_list: arcade.SpriteList,
+                 tile_ids: np.ndarray,
+                 make_sprite: Callable[[int, int, int], arcade.Sprite],
+                 tile_width: float, tile_height: float,
+                 overhang: float = 0,
+                 chunk_tiles: int = STREAM_CHUNK_TILES) -> None:
+        """
+        tile_width, tile_height: The size of the map's tiles in game px.
+        """
+        self.sprite_list = sprite_list
+        self.tile_ids = tile_ids
+        self.make_sprite = make_sprite
+        self.rows, self.columns = tile_ids.shape
+        self.chunk_tiles = chunk_tiles
+        self.chunk_width = chunk_tiles * tile_width
+        self.chunk_height = chunk_tiles * tile_height
+        self.overhang = overhang
+        self.loaded = {}
+        self.loaded_ranges = set()
+
+    def get_chunk_range(self, area: Area) -> Tuple[int, int, int, int]:
+        """
+        Get the first and last columns and rows of
+        the chunks with tiles that reach into the area.
+        """
+        left, bottom, right, top = area
+        return (math.floor((left - self.overhang) / self.chunk_width),
+                math.floor(right / self.chunk_width),
+                math.floor((bottom - self.overhang) / self.chunk_height),
+                math.floor(top / self.chunk_height))
+
+    def load(self, area: Area, max_chunks: Optional[int] = None) -> int:
+        """
+        Load the chunks with tiles that reach into the area, nearest
+        to its middle first, and return how many were loaded.
+
+        max_chunks: The most chunks to load, or None to load them all.
+        """
+        chunk_range = self.get_chunk_range(area)
+        if chunk_range in self.loaded_ranges:
+            return 0
+        first_column, last_column, first_row, last_row = chunk_range
+        chunk_columns = -(-self.columns // self.chunk_tiles)
+        chunk_rows = -(-self.rows // self.chunk_tiles)
+        missing = [
+            (column, row)
+            for column in range(max(first_column, 0),
+                                min(last_column, chunk_columns - 1) + 1)
+            for row in range(max(first_row, 0),
+                             min(last_row, chunk_rows - 1) + 1)
+            if (column, row) not in self.loaded
+        ]
+        if max_chunks is not None and len(missing) > max_chunks:
+            middle_column = (first_column + last_column) / 2
+            middle_row = (first_row + last_row) / 2
+            missing.sort(key=lambda chunk: (abs(chunk[0] - middle_column)
+                                            + abs(chunk[1] - middle_row)))
+            missing = missing[:max_chunks]
+        else:
+            self.loaded_ranges.add(chunk_range)
+
+        for chunk in missing:
+            self.load_chunk(chunk)
+        return len(missing)
+
+    def unload_outside(self, areas: Sequence[Area]):
+        """Let go of the chunks far from all of the areas."""
+        chunk_ranges = [self.get_chunk_range(area) for area in areas]
+        # Nothing new can be far away if the areas are in the same chunks.
+        if chunk_ranges == self.kept_ranges:
+            return
+        self.kept_ranges = chunk_ranges
+        for chunk in list(self.loaded):
+            column, row = chunk
+            if not any(
+                    first_column - STREAM_UNLOAD_CHUNKS <= column
+                    <= last_column + STREAM_UNLOAD_CHUNKS and
+                    first_row - STREAM_UNLOAD_CHUNKS <= row
+                    <= last_row + STREAM_UNLOAD_CHUNKS
+                    for first_column, last_column, first_row, last_row
+                    in chunk_ranges):
+                self.unload_chunk(chunk)
+
+    def load_chunk(self, chunk: Tuple[int, int]):
+        """Make the sprites of a chunk and add them to the SpriteList."""
+        column, row = chunk
+        chunk_tiles = self.chunk_tiles
+        first_column = column * chunk_tiles
+        # The array's rows go from the top down,
+        # but the chunk rows go from the bottom up.
+        last_row = self.rows - row * chunk_tiles
+        first_row = max(last_row - chunk_tiles, 0)
+
+        tile_ids = self.tile_ids[first_row:last_row,
+                                 first_column:first_column + chunk_tiles]
+        sprites = []
+        rows, columns = np.nonzero(tile_ids)
+        for tile_row, tile_column, tile_id in zip(
+                rows.tolist(), columns.tolist(),
+                tile_ids[rows, columns].tolist()):
+            sprite = self.make_sprite(first_row + tile_row,
+                                      first_column + tile_column, tile_id)
+            self.sprite_list.append(sprite)
+            sprites.append(sprite)
+        self.loaded[chunk] = sprites
+
+    def unload_chunk(self, chunk: Tuple[int, int]):
+        """Take the sprites of a chunk out of the SpriteList."""
+        self.loaded_ranges.clear()
+        for sprite in self.loaded.pop(chunk):
+            self.sprite_list.remove(sprite)
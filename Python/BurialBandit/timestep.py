@@ -0,0 +1,64 @@
+"""
+Runs the game rules on a fixed time step, however fast the window draws.
+
+Real time from each frame is saved up, and the simulation is stepped
+once for every whole step of it, so the game plays at the same speed
+on a fast computer and a slow one. What is left over says how far
+the next step is along, so the sprites can be drawn between where
+they were and where they are, and look smooth at any frame rate.
+"""
+
+# The most steps run for one frame. When a frame took longer than
+# this many steps, the rest of the time is dropped and the game slows
+# down, instead of each frame taking longer to catch up than the last.
+MAX_STEPS_PER_FRAME = 5
+
+
+class FixedTimestep():
+    """
+    Turns the time between frames into whole simulation steps.
+    Call `advance()` each frame with the time that passed,
+    run the steps it returns, then draw with `alpha`.
+    """
+
+    # The time one step of the simulation covers.
+    step_time: float = 1 / 60
+    max_steps: int = MAX_STEPS_PER_FRAME
+    # Time that has passed and not been stepped yet.
+    accumulator: float = 0.0
+    # How much time has been dropped by the catch-up cap, in total.
+    dropped_time: float = 0.0
+
+    def __init__(self, step_time: float,
+                 max_steps: int = MAX_STEPS_PER_FRAME) -> None:
+        self.step_time = step_time
+        self.max_steps = max_steps
+
+    def advance(self, delta_time: float) -> int:
+        """
+        Add the time since the last frame,
+        and return how many steps to run for it.
+        """
+        self.accumulator += delta_time
+        steps = int(self.accumulator / self.step_time)
+        if steps > self.max_steps:
+            # Too far behind to catch up, so only keep
+            # how far along the step after the last one is.
+            dropped_steps = steps - self.max_steps
+            self.dropped_time += dropped_steps * self.step_time
+            steps = self.max_steps
+            self.accumulator -= dropped_steps * self.step_time
+        self.accumulator -= steps * self.step_time
+        return steps
+
+    @property
+    def alpha(self) -> float:
+        """
+        How far the time is from the last step to the next one,
+        from 0 to 1, for drawing between the two.
+        """
+        return min(max(self.accumulator / self.step_time, 0.0), 1.0)
+
+    def reset(self):
+        """Forget the saved up time, like after loading a level."""
+        self.accumulator = 0.0
@@ -0,0 +1,70 @@
+"""
+Finds every trigger tile the player is touching,
+from all the trigger layers at once.
+"""
+
+from typing import Dict, List, Tuple
+from math import floor
+import arcade
+
+# The size of the grid cells trigger tiles are sorted into.
+TRIGGER_CELL_SIZE = 128
+
+
+class TriggerIndex():
+    """
+    Sorts the tiles from several layers into one grid, so the
+    tiles of every kind that overlap the player can be found
+    with a single lookup instead of one per layer.
+    """
+
+    cell_size: float = TRIGGER_CELL_SIZE
+    layer_names: List[str] = None
+    # Each cell holds the (layer name, tile) pairs that overlap it.
+    cells: Dict[Tuple[int, int], List[Tuple[str, arcade.Sprite]]] = None
+
+    def __init__(self, layers: Dict[str, arcade.SpriteList],
+                 cell_size: float = TRIGGER_CELL_SIZE) -> None:
+        self.cell_size = cell_size
+        self.layer_names = list(layers)
+        self.cells = {}
+
+        for layer_name, sprite_list in layers.items():
+            for sprite in sprite_list:
+                for cell in self.get_cells(sprite):
+                    self.cells.setdefault(cell, []).append(
+                        (layer_name, sprite))
+
+    def get_cells(self, sprite: arcade.Sprite) -> List[Tuple[int, int]]:
+        """Gets all the grid cells a sprite overlaps."""
+        min_x = floor(sprite.left / self.cell_size)
+        max_x = floor(sprite.right / self.cell_size)
+        min_y = floor(sprite.bottom / self.cell_size)
+        max_y = floor(sprite.top / self.cell_size)
+        return [(cell_x, cell_y)
+                for cell_x in range(min_x, max_x + 1)
+                for cell_y in range(min_y, max_y + 1)]
+
+    def query(self, sprite: arcade.Sprite) -> Dict[str, List[arcade.Sprite]]:
+        """
+        Find the tiles the sprite is touching, sorted by the
+        name of the layer they came from. Every layer in the
+        index has an entry, even if nothing was hit on it.
+        """
+        hits: Dict[str, List[arcade.Sprite]] = {
+            layer_name: [] for layer_name in self.layer_names
+        }
+        # Big tiles can be in more than one cell,
+        # so keep track of the ones already checked.
+        checked = set()
+
+        for cell in self.get_cells(sprite):
+            for layer_name, tile in self.cells.get(cell, ()):
+                if tile in checked:
+                    continue
+                checked.add(tile)
+
+                if arcade.check_for_collision(sprite, tile):
+                    hits[layer_name].append(tile)
+
+        return hits
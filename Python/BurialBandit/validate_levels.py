@@ -0,0 +1,224 @@
+"""
+Checks every level in LEVELS can be played before it ships,
+spreading the checks over a pool of processes, one for each core.
+
+Each level is loaded at its map scale with the headless simulation,
+then checked for the layers the game needs, and for Sound tiles
+with a ground type that has no footstep sound. Any replay files
+given are played back, checking they still end where they were
+recorded. The results are written as a JSON report.
+
+Run it from the BurialBandit folder with
+`python validate_levels.py [--report <json file>] [--workers <count>]
+[replay files...]`. It exits with 1 if any check failed.
+"""
+
+from typing import Any, Dict, List
+from concurrent.futures import ProcessPoolExecutor
+import json
+import os
+import sys
+import time
+import traceback
+
+from assets import SOUND_MANIFEST
+from end_sequence import LAYER_NAME_END_TRIGGER
+from ground import TILE_FLIP_FLAGS, get_ground_types_by_id
+from replay import Replay, play_replay
+from simulation import (
+    GameSimulation,
+    LEVELS,
+    MAP_SCALE,
+    FINAL_MAP_INDEX,
+    LAYER_NAME_PLATFORMS,
+    LAYER_NAME_PICKUPS,
+    LAYER_NAME_CHECKPOINTS,
+    LAYER_NAME_SOUND,
+    LAYER_NAME_NEXT_LEVEL,
+)
+
+# The layers every level has to have.
+REQUIRED_LAYERS = [
+    LAYER_NAME_PLATFORMS,
+    LAYER_NAME_PICKUPS,
+    LAYER_NAME_CHECKPOINTS,
+    LAYER_NAME_SOUND,
+    LAYER_NAME_NEXT_LEVEL,
+]
+# The layers only the final level has to have.
+FINAL_LEVEL_LAYERS = [
+    LAYER_NAME_END_TRIGGER,
+]
+
+# The footstep sound of a ground type is its name with this on the end.
+SURFACE_SOUND_SUFFIX = "_surface"
+
+
+def get_surface_sounds() -> List[str]:
+    """
+    Get the ground types that have a footstep sound
+    in the sound manifest with a file on disk.
+    """
+    return [
+        name[:-len(SURFACE_SOUND_SUFFIX)]
+        for name, (file_name, _) in SOUND_MANIFEST.items()
+        if name.endswith(SURFACE_SOUND_SUFFIX) and os.path.isfile(file_name)
+    ]
+
+
+def validate_level(level_index: int) -> Dict[str, Any]:
+    """
+    Load one level with a headless simulation and check it has
+    every layer it needs, and a footstep sound for every Sound tile.
+    Returns the job's part of the report.
+    """
+    start_time = time.perf_counter()
+    result = {
+        "job": "level",
+        "name": LEVELS[level_index],
+        "level_index": level_index,
+        "map_scale": MAP_SCALE[level_index],
+        "errors": [],
+    }
+    errors = result["errors"]
+
+    try:
+        simulation = GameSimulation()
+        simulation.boot()
+        simulation.current_level_index = level_index
+        simulation.reset_level()
+    except Exception:
+        errors.append("Could not load the level:\n" + traceback.format_exc())
+    else:
+        level = simulation.level
+
+        # LAYERS
+        # Tile layers have sprites or were skipped,
+        # and object layers are kept by the tile map.
+        layer_names = (set(level.layer_names) |
+                       set(level.skipped_layers) |
+                       set(simulation.tile_map.object_lists))
+        required_layers = list(REQUIRED_LAYERS)
+        if level_index == FINAL_MAP_INDEX:
+            required_layers += FINAL_LEVEL_LAYERS
+        for layer_name in required_layers:
+            if layer_name not in layer_names:
+                errors.append(f"Missing the {layer_name} layer")
+        # END LAYERS
+
+        # SOUND TILES
+        surface_sounds = get_surface_sounds()
+        ground_types_by_id = get_ground_types_by_id(level.tile_properties)
+        sound_tiles = 0
+        missing_ground_types = set()
+        unknown_ground_types = set()
+        for row in level.skipped_layers.get(LAYER_NAME_SOUND, ()):
+            for tile_id in row:
+                tile_id = int(tile_id) & ~TILE_FLIP_FLAGS
+                if tile_id == 0:
+                    continue
+                sound_tiles += 1
+                ground_type = ground_types_by_id.get(tile_id)
+                if ground_type is None:
+                    missing_ground_types.add(tile_id)
+                elif ground_type not in surface_sounds:
+                    unknown_ground_types.add(ground_type)
+
+        result["sound_tiles"] = sound_tiles
+        for tile_id in sorted(missing_ground_types):
+            errors.append(f"Sound tile {tile_id} has no ground_type")
+        for ground_type in sorted(unknown_ground_types):
+            errors.append(f"No {ground_type}{SURFACE_SOUND_SUFFIX} sound "
+                          f"for the {ground_type} Sound tiles")
+        # END SOUND TILES
+
+    result["passed"] = not errors
+    result["seconds"] = time.perf_counter() - start_time
+    return result
+
+
+def validate_replay(file_path: str) -> Dict[str, Any]:
+    """
+    Play a replay file back with a headless simulation and check it
+    still ends where it was recorded. Returns the job's part of the report.
+    """
+    start_time = time.perf_counter()
+    result = {
+        "job": "replay",
+        "name": file_path,
+        "errors": [],
+    }
+    errors = result["errors"]
+
+    try:
+        replay = Replay.load(file_path)
+        simulation = GameSimulation()
+        simulation.boot()
+        replayed = play_replay(simulation, replay)
+    except Exception:
+        errors.append("Could not play the replay:\n" +
+                      traceback.format_exc())
+    else:
+        result["level_index"] = replay.level_index
+        result["ticks"] = replay.ticks
+        result["recorded"] = str(replay.result)
+        result["replayed"] = str(replayed)
+        if not replayed.matches(replay.result):
+            errors.append("Did not end where it was recorded")
+
+    result["passed"] = not errors
+    result["seconds"] = time.perf_counter() - start_time
+    return result
+
+
+def validate_levels(replay_paths: List[str] = (),
+                    workers: int = None) -> Dict[str, Any]:
+    """
+    Run the checks of every level and replay on a pool of processes,
+    and return the report of them all.
+
+    workers: How many processes to use, one per core if None.
+    """
+    workers = workers or os.cpu_count()
+    start_time = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        jobs = [executor.submit(validate_level, level_index)
+                for level_index in range(len(LEVELS))]
+        jobs += [executor.submit(validate_replay, file_path)
+                 for file_path in replay_paths]
+        results = [job.result() for job in jobs]
+
+    return {
+        "passed": all(result["passed"] for result in results),
+        "workers": workers,
+        "seconds": time.perf_counter() - start_time,
+        "jobs": results,
+    }
+
+
+if __name__ == "__main__":
+    report_path = None
+    worker_count = None
+    replay_files = []
+    arguments = iter(sys.argv[1:])
+    for argument in arguments:
+        if argument == "--report":
+            report_path = next(arguments)
+        elif argument == "--workers":
+            worker_count = int(next(arguments))
+        else:
+            replay_files.append(argument)
+
+    report = validate_levels(replay_files, worker_count)
+    report_text = json.dumps(report, indent=2)
+    if report_path is None:
+        print(report_text)
+    else:
+        with open(report_path, "w") as report_file:
+            report_file.write(report_text)
+        for job_result in report["jobs"]:
+            print(f"{job_result['job']} {job_result['name']}: "
+                  f"{'passed' if job_result['passed'] else 'FAILED'}")
+            for error in job_result["errors"]:
+                print(f"  {error}")
+    sys.exit(0 if report["passed"] else 1)